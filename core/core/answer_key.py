@@ -0,0 +1,108 @@
+"""
+Compact answer keys with bulk scoring.
+
+The correct choice of every question is stored as one 16-bit integer in a
+dense slot order, and an answer sheet is encoded into the same layout, so
+scoring a sheet is a single element-wise comparison. Thousands of sheets are
+scored at once as one int16 matrix when NumPy is installed; without it the
+same result is computed in pure Python.
+"""
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, see score_many()
+    np = None
+
+# Slot value for "no correct answer" in a key and "not answered" in a sheet.
+NO_CHOICE = -1
+# Highest option index a slot can hold (array typecode 'h')
+MAX_CHOICE = 2 ** 15 - 1
+
+CORRECT = "correct"
+WRONG = "wrong"
+QUESTION_NOT_FOUND = "question_not_found"
+NO_CORRECT_ANSWER = "question_has_no_correct_answer"
+
+
+class AnswerKey:
+    """
+    Answer key built from (question_id, correct_choice) pairs, where a choice
+    is a non-negative integer (option index) or None when the question has no
+    correct answer. A choice above MAX_CHOICE can never be answered correctly,
+    so it is stored as no correct answer.
+    """
+
+    def __init__(self, pairs):
+        question_ids = array('q')
+        choices = array('h')
+        for q_id, choice in pairs:
+            question_ids.append(q_id)
+            choices.append(choice if choice is not None and 0 <= choice <= MAX_CHOICE else NO_CHOICE)
+        self.question_ids = question_ids
+        self.choices = choices
+        self.slots = {q_id: slot for slot, q_id in enumerate(question_ids)}
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def __contains__(self, q_id):
+        return q_id in self.slots
+
+    def subset(self, question_ids):
+        """
+        Key of just `question_ids`, e.g. the questions one examinee was served.
+        Ids missing from this key are left out.
+        """
+        pairs = []
+        for q_id in question_ids:
+            slot = self.slots.get(q_id)
+            if slot is not None:
+                choice = self.choices[slot]
+                pairs.append((q_id, None if choice == NO_CHOICE else choice))
+        return AnswerKey(pairs)
+
+    def outcome(self, q_id, choice):
+        """
+        Outcome of a single answer: CORRECT, WRONG, QUESTION_NOT_FOUND or NO_CORRECT_ANSWER.
+        """
+        slot = self.slots.get(q_id)
+        if slot is None:
+            return QUESTION_NOT_FOUND
+        correct = self.choices[slot]
+        if correct == NO_CHOICE:
+            return NO_CORRECT_ANSWER
+        return CORRECT if choice == correct else WRONG
+
+    def encode(self, answers):
+        """
+        Encode (question_id, choice) pairs into a sheet aligned with the key.
+        Unknown questions and out-of-range choices are left unanswered; callers
+        reject duplicate question ids, since only the last answer would count.
+        """
+        sheet = array('h', [NO_CHOICE]) * len(self)
+        for q_id, choice in answers:
+            slot = self.slots.get(q_id)
+            if slot is not None and isinstance(choice, int) and 0 <= choice <= MAX_CHOICE:
+                sheet[slot] = choice
+        return sheet
+
+    def score(self, sheet):
+        return self.score_many([sheet])[0]
+
+    def score_many(self, sheets):
+        """
+        Number of correct answers on each encoded sheet.
+        """
+        if not sheets:
+            return []
+        if np is not None:
+            key = np.frombuffer(self.choices, dtype=np.int16)
+            matrix = np.frombuffer(b"".join(sheet.tobytes() for sheet in sheets), dtype=np.int16)
+            matrix = matrix.reshape(len(sheets), len(key))
+            return ((matrix == key) & (key != NO_CHOICE)).sum(axis=1).tolist()
+        key = self.choices
+        return [
+            sum(1 for answer, correct in zip(sheet, key) if answer == correct != NO_CHOICE)
+            for sheet in sheets
+        ]
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.CACHE_SHARED:
+        return []
+    return [Warning(
+        "The cache is local to each process, so features that keep data in it "
+        "(core.shared_cache) refuse to run.",
+        hint="Set REDIS_URL, or CACHE_SHARED=True if a single process serves the site.",
+        id="core.W001",
+    )]
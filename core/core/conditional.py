@@ -0,0 +1,92 @@
+"""
+Conditional GET and compressed bodies for cached JSON payloads.
+
+`payload_response()` compresses the body only when the client accepts it,
+per response: bodies are assembled per examinee from fragments cached once
+per bank, so caching a compressed copy of each would store thousands of
+near-identical blobs. Each encoding gets its own strong ETag (`<etag>`,
+`<etag>-gzip`, `<etag>-br`), and a request whose If-None-Match names any of
+them is answered with 304 before the payload is even built, so a client pays
+for compression once per version. Brotli is used when the optional `brotli`
+package is installed.
+"""
+import gzip
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is always available
+    brotli = None
+
+# Preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+# Compression runs on the request path: favour speed over the last few percent
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def compress(payload, coding):
+    """
+    `payload` compressed with `coding` ('gzip' or 'br').
+    """
+    if coding == 'br':
+        return brotli.compress(payload, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the gzip bytes identical across workers
+    return gzip.compress(payload, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _finish(response, etag):
+    response['ETag'] = quote_etag(etag)
+    # Authenticated content: clients and proxies may store it but must revalidate
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def not_modified(request, etag):
+    """
+    A 304 response if the client already has `etag` in any encoding, else None.
+    """
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return None
+    known = {quote_etag(etag)} | {quote_etag(f"{etag}-{coding}") for coding in ('br', 'gzip')}
+    # Proxies that recompress mark the tag weak; the content is still the same
+    tags = {tag.removeprefix('W/') for tag in parse_etags(header)}
+    if '*' in tags or tags & known:
+        return _finish(HttpResponseNotModified(), etag)
+    return None
+
+
+def payload_response(request, etag, payload, content_type="application/json"):
+    """
+    Serve `payload` in the best encoding the client accepts. `payload` may be
+    the raw bytes or a callable returning them, so it is only built when needed.
+    """
+    body = payload() if callable(payload) else payload
+    accepted = _accepted_encodings(request)
+    for coding in ENCODINGS:
+        if coding in accepted:
+            response = HttpResponse(compress(body, coding), content_type=content_type)
+            response['Content-Encoding'] = coding
+            return _finish(response, f"{etag}-{coding}")
+    return _finish(HttpResponse(body, content_type=content_type), etag)
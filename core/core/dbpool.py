@@ -0,0 +1,53 @@
+"""
+Database connection reuse statistics for this process (see DB_POOL in
+core.settings).
+
+With DB_POOL the numbers come from psycopg_pool's own counters: pool size,
+idle connections, requests that had to wait and the total time spent waiting.
+Without it each worker thread keeps one persistent connection, so only its
+settings and the current thread's connection are reported.
+"""
+import time
+
+from django.db import connections
+
+
+def _pool(connection):
+    # Only the PostgreSQL backend has a pool, and only with OPTIONS["pool"]
+    return getattr(connection, "pool", None)
+
+
+def stats(alias="default"):
+    connection = connections[alias]
+    settings_dict = connection.settings_dict
+    pool = _pool(connection)
+    if pool:
+        counters = pool.get_stats()
+        requests = counters.get("requests_num", 0)
+        waited = counters.get("requests_wait_ms", 0)
+        return {
+            "mode": "pool",
+            "health_checks": settings_dict["CONN_HEALTH_CHECKS"],
+            "avg_wait_ms": waited / requests if requests else 0.0,
+            **counters,
+        }
+
+    max_age = settings_dict["CONN_MAX_AGE"]
+    result = {
+        "mode": "persistent" if max_age != 0 else "per-request",
+        "health_checks": settings_dict["CONN_HEALTH_CHECKS"],
+        "conn_max_age": max_age,  # None keeps connections until they fail
+        "connected": connection.connection is not None,
+    }
+    if connection.connection is not None and connection.close_at is not None:
+        result["expires_in"] = max(connection.close_at - time.monotonic(), 0.0)
+    return result
+
+
+def reset(alias="default"):
+    """
+    Zero the pool's cumulative counters; the gauges (size, idle) are unaffected.
+    """
+    pool = _pool(connections[alias])
+    if pool:
+        pool.pop_stats()
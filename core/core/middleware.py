@@ -0,0 +1,82 @@
+"""
+Opt-in request profiling.
+
+ServerTimingMiddleware is enabled with SERVER_TIMING=True. When it is off,
+it raises MiddlewareNotUsed, so Django drops it at startup and requests pay
+nothing. When it is on, every response gets a Server-Timing header and is
+added to the per-route aggregates in core.timing. The header has these parts:
+- db: query count and time
+- view: the view itself, serializers and DB included
+- render: DRF's JSON rendering
+- total, which also covers the other middleware
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import timing
+
+
+class _RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_ended = self.render_ended = None
+        self.db_time = 0.0
+        self.db_queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "SERVER_TIMING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = request._server_timer = _RequestTimer()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        ended = time.perf_counter()
+
+        total = ended - timer.started
+        view = render = 0.0
+        if timer.view_started is not None:
+            # DRF responses are rendered after process_template_response, plain
+            # HttpResponses come back from the view already built
+            view_ended = timer.view_ended or ended
+            view = view_ended - timer.view_started
+            if timer.view_ended and timer.render_ended:
+                render = timer.render_ended - timer.view_ended
+
+        response["Server-Timing"] = ", ".join((
+            f'db;desc="{timer.db_queries} queries";dur={timer.db_time * 1000:.1f}',
+            f"view;dur={view * 1000:.1f}",
+            f"render;dur={render * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ))
+
+        match = request.resolver_match
+        route = match.route if match else "<unresolved>"
+        url_name = match.view_name if match else None
+        timing.record(route, url_name, total, view, render, timer.db_time, timer.db_queries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._server_timer.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timer = request._server_timer
+        timer.view_ended = time.perf_counter()
+        # Ends the render part before the response goes back through the other middleware
+        response.add_post_render_callback(lambda response: setattr(timer, 'render_ended', time.perf_counter()))
+        return response
@@ -0,0 +1,82 @@
+"""
+MinHash signatures and LSH banding for near-duplicate text detection.
+
+A text becomes a set of shingles (overlapping word pairs). Its signature holds,
+for each of `num_perm` seeded hash functions, the smallest hash of any shingle;
+the share of positions where two signatures agree estimates the Jaccard
+similarity of their shingle sets. Cutting a signature into `bands` of `rows`
+values and hashing each band puts similar texts in a common bucket with high
+probability, so candidates come from bucket collisions instead of comparing
+every pair. Texts about (1 / bands) ** (1 / rows) similar collide half the time.
+"""
+import hashlib
+import random
+import re
+import struct
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=2):
+    """
+    Set of `size`-word shingles of the lowercased text; shorter texts give one
+    shingle of all their words.
+    """
+    words = _WORD.findall(str(text).lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, bands=32, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # The seed fixes the hash functions: stored signatures are only
+        # comparable with ones made by the same parameters
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_perm)]
+        self._format = f"<{num_perm}I"
+
+    @property
+    def threshold(self):
+        return (1 / self.bands) ** (1 / self.rows)
+
+    def signature(self, shingle_set):
+        """
+        List of `num_perm` 32-bit minimums, or None for an empty set.
+        """
+        if not shingle_set:
+            return None
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") for s in shingle_set]
+        return [min((a * h + b) % _PRIME for h in hashes) & _MASK for a, b in self.params]
+
+    def buckets(self, signature):
+        """
+        One signed 64-bit bucket key per band; the band number is hashed in,
+        so equal keys in different bands don't collide.
+        """
+        keys = []
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<H{self.rows}I", band, *values), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+
+    def pack(self, signature):
+        return struct.pack(self._format, *signature)
+
+    def unpack(self, data):
+        return list(struct.unpack(self._format, bytes(data)))
+
+
+def similarity(a, b):
+    """
+    Estimated Jaccard similarity of the sets behind two signatures.
+    """
+    return sum(x == y for x, y in zip(a, b)) / len(a)
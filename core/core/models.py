@@ -0,0 +1,14 @@
+from django.db import models
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter of a core.versioned_cache namespace. It lives in the
+    database rather than the cache so a bump reaches every worker, whatever
+    the cache backend.
+    """
+    namespace = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
@@ -49,9 +49,12 @@ INSTALLED_APPS = [
     "corsheaders",
     "questions", 
     "quiz",
+    "results",
+    "core",
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ServerTimingMiddleware",  # Removed at startup unless SERVER_TIMING
     "corsheaders.middleware.CorsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  
     "django.middleware.security.SecurityMiddleware",
@@ -97,9 +100,59 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': os.getenv('DB_SSLMODE', 'require'),
         },
+        # Check a reused connection (or one taken from the pool) before use
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection reuse, instead of a new TLS connection per request.
+# DB_POOL=True uses psycopg's connection pool (psycopg[pool] >= 3, which
+# requirements.txt installs as the PostgreSQL driver); otherwise each worker keeps
+# its connection for DB_CONN_MAX_AGE seconds. Pool and wait statistics: /api/admin/db-pool/ (core.dbpool).
+# On Vercel (which sets VERCEL) every warm function instance would hold its own
+# idle Postgres connection, so connections are closed after each request there
+# unless DB_CONN_MAX_AGE says otherwise.
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+if DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # Required with a pool
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before failing
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        # Idle connections above min_size are closed after this many seconds
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 0 if os.getenv('VERCEL') else 60))
+
+
+# Cache
+# Set REDIS_URL in production so every worker shares the same cache;
+# the local-memory fallback is per process.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            # The default of 300 entries would evict OTPs and ranking counters
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Whether every process sees the same cache. OTPs and unflushed exam drafts keep
+# their only copy in the cache, so they refuse to work without a shared one
+# (core.shared_cache).
+# CACHE_SHARED=True vouches for the local-memory cache when a single process
+# serves the site (runserver, one gunicorn worker).
+CACHE_SHARED = bool(os.getenv('REDIS_URL')) or os.getenv('CACHE_SHARED', 'False').lower() == 'true'
 
 
 # Password validation
@@ -124,15 +177,17 @@ AUTH_PASSWORD_VALIDATORS = [
 CORS_ALLOW_ALL_ORIGINS = True
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
+    # Sliding-window counters on the shared cache (core.throttling)
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'core.throttling.AnonSlidingThrottle',
+        'core.throttling.UserSlidingThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
-        'user': '1000/hour'
+        'user': '1000/hour',
+        'otp': '5/hour',  # Per target email, on the endpoints that send OTPs
     }
 }
 
@@ -171,9 +226,65 @@ SIMPLE_JWT = {
 }
 AUTH_USER_MODEL = "users.User"
 
+# Seconds a slim user snapshot is trusted by users.authentication.CachedJWTAuthentication
+USER_SNAPSHOT_TTL = int(os.getenv('USER_SNAPSHOT_TTL', 60))
+
+# Seconds between rebuilds of the in-process refresh token blacklist filter
+# (users.tokens); 0 checks the blacklist table on every refresh
+TOKEN_BLACKLIST_FILTER_SECONDS = int(os.getenv('TOKEN_BLACKLIST_FILTER_SECONDS', 30))
+
+# Login admission control (users.admission): password hashes running at once per
+# process, logins allowed to wait for one, and how long they wait before a 429
+LOGIN_HASH_CONCURRENCY = int(os.getenv('LOGIN_HASH_CONCURRENCY', os.cpu_count() or 2))
+LOGIN_HASH_QUEUE_DEPTH = int(os.getenv('LOGIN_HASH_QUEUE_DEPTH', 32))
+LOGIN_HASH_WAIT_SECONDS = float(os.getenv('LOGIN_HASH_WAIT_SECONDS', 5))
+# Password hashes running at once across every process, enforced through the
+# shared cache (CACHE_SHARED); without one only the per-process limit applies.
+# This is the limit that matters on Vercel, where an instance serves one request
+# at a time. 0 turns it off.
+LOGIN_HASH_SHARED_CONCURRENCY = int(os.getenv('LOGIN_HASH_SHARED_CONCURRENCY', 16))
+
+# One-time passwords (users.otp)
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', 600))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', 5))
+
+# Seconds an autosaved draft stays in the cache without changes (results.drafts);
+# must outlast the exam, since flush_drafts only writes drafts that are still there
+DRAFT_TTL_SECONDS = int(os.getenv('DRAFT_TTL_SECONDS', 6 * 60 * 60))
+
+# Highest mark tracked by the leaderboard ranking (users.ranking), and seconds
+# before its cached tree is rebuilt from the users table; with the
+# local-memory cache this is how long other workers' ranks can lag
+RANKING_MAX_MARKS = int(os.getenv('RANKING_MAX_MARKS', 1000))
+RANKING_TTL_SECONDS = int(os.getenv('RANKING_TTL_SECONDS', 300))
+
+# Estimated Jaccard similarity at which a question is flagged as a near-duplicate
+# of another (questions.similarity)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.7))
+
+# Server-Timing headers and per-route timing stats (core.middleware); off by default
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False').lower() == 'true'
+SERVER_TIMING_FLUSH_SECONDS = int(os.getenv('SERVER_TIMING_FLUSH_SECONDS', 10))
+
+# Identifies the current exam; per-examinee question order is seeded from it.
+EXAM_ID = os.getenv('EXAM_ID', 'preli')
+
+# Exam sessions (results.sessions): questions drawn per examinee (0 serves the
+# whole bank), seconds allowed from the first question download, and grace for
+# submissions in flight at the deadline. EXAM_SECTIONS="math:10,logic:5" draws
+# that many per QuizQuestion.section instead of EXAM_QUESTION_COUNT overall.
+EXAM_QUESTION_COUNT = int(os.getenv('EXAM_QUESTION_COUNT', 0))
+EXAM_DURATION_SECONDS = int(os.getenv('EXAM_DURATION_SECONDS', 60 * 60))
+EXAM_GRACE_SECONDS = int(os.getenv('EXAM_GRACE_SECONDS', 30))
+EXAM_SECTIONS = {
+    section.strip(): int(count)
+    for section, _, count in (item.rpartition(':') for item in os.getenv('EXAM_SECTIONS', '').split(','))
+    if section.strip()
+}
+
 
 # Email Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
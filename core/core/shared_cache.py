@@ -0,0 +1,31 @@
+"""
+Guard for data whose only copy lives in the Django cache.
+
+The local-memory cache is private to each process, so with several workers
+an entry written by one is missing on the others. Features that store data
+there, rather than caching what the database holds, call
+require_shared_cache() and fail loudly instead of misbehaving at random.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.connection import ConnectionProxy
+
+
+def require_shared_cache(feature):
+    if not settings.CACHE_SHARED:
+        raise ImproperlyConfigured(
+            f"{feature} live in the cache, which every worker must share: set REDIS_URL, "
+            "or CACHE_SHARED=True if a single process serves the site."
+        )
+
+
+def cache_backend(cache):
+    """
+    The cache object behind `cache`. django.core.cache.cache and DRF's throttle
+    cache are ConnectionProxy objects, which fail isinstance() checks against
+    backend classes.
+    """
+    if isinstance(cache, ConnectionProxy):
+        return caches[cache._alias]
+    return cache
@@ -0,0 +1,152 @@
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from . import answer_key, conditional, dbpool, timing
+from .answer_key import (
+    CORRECT, MAX_CHOICE, NO_CORRECT_ANSWER, QUESTION_NOT_FOUND, WRONG, AnswerKey,
+)
+
+
+class AnswerKeyTests(SimpleTestCase):
+    def setUp(self):
+        # q1: 0, q2: 3, q3: no correct answer, q4: option 200, q5: out of range
+        self.key = AnswerKey([(1, 0), (2, 3), (3, None), (4, 200), (5, MAX_CHOICE + 1)])
+
+    def sheets(self):
+        return [
+            self.key.encode([(1, 0), (2, 3), (3, 0), (4, 200), (5, MAX_CHOICE + 1)]),
+            self.key.encode([(1, 1), (2, 3), (99, 0)]),
+            self.key.encode([]),
+            self.key.encode([(1, "0"), (2, -1), (4, 200)]),
+        ]
+
+    def test_outcome(self):
+        self.assertEqual(self.key.outcome(1, 0), CORRECT)
+        self.assertEqual(self.key.outcome(1, 1), WRONG)
+        self.assertEqual(self.key.outcome(3, 0), NO_CORRECT_ANSWER)
+        self.assertEqual(self.key.outcome(4, 200), CORRECT)
+        self.assertEqual(self.key.outcome(5, MAX_CHOICE + 1), NO_CORRECT_ANSWER)
+        self.assertEqual(self.key.outcome(99, 0), QUESTION_NOT_FOUND)
+
+    def test_score_many_with_numpy(self):
+        if answer_key.np is None:
+            self.skipTest("NumPy is not installed")
+        self.assertEqual(self.key.score_many(self.sheets()), [3, 1, 0, 1])
+
+    def test_score_many_in_pure_python(self):
+        with mock.patch.object(answer_key, "np", None):
+            self.assertEqual(self.key.score_many(self.sheets()), [3, 1, 0, 1])
+            self.assertEqual(self.key.score(self.sheets()[0]), 3)
+
+    def test_subset(self):
+        subset = self.key.subset([2, 3, 99])
+
+        self.assertEqual(len(subset), 2)
+        self.assertNotIn(1, subset)
+        self.assertEqual(subset.outcome(2, 3), CORRECT)
+        self.assertEqual(subset.outcome(3, 0), NO_CORRECT_ANSWER)
+        self.assertEqual(subset.score(subset.encode([(1, 0), (2, 3)])), 1)
+
+
+class ConditionalTests(SimpleTestCase):
+    PAYLOAD = b'{"questions":[' + b",".join(b'{"id":%d,"text":"Question"}' % i for i in range(50)) + b']}'
+
+    def get(self, **headers):
+        return RequestFactory().get("/", **headers)
+
+    def test_compresses_only_when_accepted(self):
+        build = mock.Mock(return_value=self.PAYLOAD)
+
+        plain = conditional.payload_response(self.get(), "v1", build)
+        refused = conditional.payload_response(self.get(HTTP_ACCEPT_ENCODING="gzip;q=0"), "v1", build)
+        with mock.patch.object(conditional, "ENCODINGS", ("gzip",)):
+            zipped = conditional.payload_response(self.get(HTTP_ACCEPT_ENCODING="gzip, deflate"), "v1", build)
+
+        self.assertEqual(plain.content, self.PAYLOAD)
+        self.assertEqual(plain["ETag"], '"v1"')
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertEqual(zipped["ETag"], '"v1-gzip"')
+        self.assertEqual(gzip.decompress(zipped.content), self.PAYLOAD)
+        self.assertIn("Accept-Encoding", zipped["Vary"])
+
+    def test_not_modified_for_any_encoding(self):
+        self.assertEqual(conditional.not_modified(self.get(HTTP_IF_NONE_MATCH='W/"v1-gzip"'), "v1").status_code, 304)
+        self.assertEqual(conditional.not_modified(self.get(HTTP_IF_NONE_MATCH='"v1"'), "v1").status_code, 304)
+        self.assertIsNone(conditional.not_modified(self.get(HTTP_IF_NONE_MATCH='"v0-gzip"'), "v1"))
+        self.assertIsNone(conditional.not_modified(self.get(), "v1"))
+
+
+@mock.patch.object(timing, "_start_flusher")
+class TimingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        timing.reset()
+
+    def test_record_never_touches_the_cache(self, _):
+        with mock.patch.object(timing, "cache") as mocked_cache:
+            timing.record("api/a/", "a", 0.004, 0.003, 0.001, 0.002, 1)
+
+        self.assertEqual(mocked_cache.mock_calls, [])
+
+    def test_stats_aggregate_flushed_requests(self, _):
+        for total in (0.004, 0.02, 0.3, 0.008):
+            timing.record("api/a/", "a", total, total / 2, 0.001, 0.001, 2)
+
+        [row] = timing.stats()
+
+        self.assertEqual(row["route"], "api/a/")
+        self.assertEqual(row["requests"], 4)
+        self.assertAlmostEqual(row["avg_total_ms"], 83.0)
+        self.assertEqual(row["avg_db_queries"], 2)
+        self.assertEqual((row["p50_ms"], row["p95_ms"]), (10, 500))
+
+    def test_routes_flushed_concurrently_are_all_kept(self, _):
+        def worker(n):
+            timing.record(f"api/{n}/", str(n), 0.001, 0.001, 0.0, 0.0, 0)
+            timing.flush()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(16)))
+
+        self.assertEqual(sorted(row["url_name"] for row in timing.stats()), sorted(str(n) for n in range(16)))
+        timing.reset()
+        self.assertEqual(timing.stats(), [])
+
+
+class DatabasePoolStatsTests(TestCase):
+    def test_persistent_and_per_request_connections(self):
+        connection.ensure_connection()
+
+        with mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 60}):
+            persistent = dbpool.stats()
+        with mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 0}):
+            per_request = dbpool.stats()
+
+        self.assertEqual(persistent["mode"], "persistent")
+        self.assertEqual(persistent["conn_max_age"], 60)
+        self.assertTrue(persistent["connected"])
+        self.assertEqual(per_request["mode"], "per-request")
+        dbpool.reset()  # No pool: nothing to reset
+
+    def test_view_is_admin_only(self):
+        user = get_user_model().objects.create_user(
+            email="admin@diu.edu.bd", password=None, full_name="Admin",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.assertEqual(client.get("/api/admin/db-pool/").status_code, 403)
+        user.is_staff = True
+        response = client.get("/api/admin/db-pool/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response.data["mode"], ("persistent", "per-request"))
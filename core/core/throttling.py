@@ -0,0 +1,192 @@
+"""
+Sliding-window rate limiting on the shared cache.
+
+DRF's SimpleRateThrottle keeps a timestamp list per client, rewrites it on
+every check, and lives in whatever cache the process has, so N workers with
+LocMem allow N times the configured rate. These throttles use the
+sliding-window counter approximation instead: one integer per client per fixed
+window, with the previous window weighted by how much of it still overlaps
+the sliding window:
+
+    estimated = previous * (1 - elapsed / duration) + current
+
+With Redis (REDIS_URL) the read-check-increment is a single Lua script, so a
+check is one atomic round trip shared by every worker. Any other cache gets
+LocalSlidingWindow, a lock-protected stand-in that is exact within one process
+and is what the tests use.
+
+`throttled` applies the same DEFAULT_THROTTLE_CLASSES to the native async
+views, which DRF's request cycle never sees.
+"""
+import math
+import threading
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import AnonRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+from .shared_cache import cache_backend
+
+# KEYS: current window, previous window
+# ARGV: limit, weight of the previous window, TTL of the current window
+SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {1, current, previous}
+"""
+
+
+class RedisSlidingWindow:
+    def __init__(self, cache):
+        self.cache = cache
+        self._script = None
+
+    def hit(self, current_key, previous_key, limit, weight, ttl):
+        """
+        Count one request unless the window is full. Returns (allowed, current, previous).
+        """
+        client = self.cache._cache.get_client(current_key, write=True)
+        if self._script is None:
+            self._script = client.register_script(SLIDING_WINDOW_LUA)
+        allowed, current, previous = self._script(
+            keys=[self.cache.make_and_validate_key(current_key), self.cache.make_and_validate_key(previous_key)],
+            args=[limit, repr(weight), ttl],
+            client=client,
+        )
+        return bool(allowed), int(current), int(previous)
+
+
+class LocalSlidingWindow:
+    """
+    Same contract on the Django cache API. Atomic within this process only.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def hit(self, current_key, previous_key, limit, weight, ttl):
+        with self._lock:
+            counts = self.cache.get_many([current_key, previous_key])
+            current = counts.get(current_key, 0)
+            previous = counts.get(previous_key, 0)
+            if previous * weight + current >= limit:
+                return False, current, previous
+            current += 1
+            self.cache.set(current_key, current, ttl)
+            return True, current, previous
+
+
+_backends = {}
+
+
+def backend_for(cache):
+    # Chosen on each call, as the backend behind a proxy follows the settings
+    backend_class = RedisSlidingWindow if isinstance(cache_backend(cache), RedisCache) else LocalSlidingWindow
+    backend = _backends.get((id(cache), backend_class))
+    if backend is None:
+        backend = _backends[(id(cache), backend_class)] = backend_class(cache)
+    return backend
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle with the sliding-window counter described above. Mix it
+    in before a throttle that provides get_cache_key().
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        window = int(now // self.duration)
+        self.elapsed = now - window * self.duration
+        weight = 1 - self.elapsed / self.duration
+        allowed, self.current, self.previous = backend_for(self.cache).hit(
+            f"{self.key}:{window}", f"{self.key}:{window - 1}",
+            self.num_requests, weight, self.duration * 2,
+        )
+        return allowed
+
+    def wait(self):
+        """
+        Seconds until `previous * weight + current < limit` holds again,
+        assuming no new requests.
+        """
+        remaining = self.duration - self.elapsed
+        if self.current >= self.num_requests:
+            # Not in this window: after the rollover this window's count becomes
+            # the previous one, and current * (1 - t / duration) < limit once
+            # t > duration * (1 - limit / current)
+            return remaining + self.duration * (1 - self.num_requests / self.current)
+        # previous * (1 - t / duration) + current < limit
+        needed = self.duration * (1 - (self.num_requests - self.current) / self.previous)
+        return max(needed - self.elapsed, 0.0)
+
+
+class AnonSlidingThrottle(SlidingWindowThrottle, AnonRateThrottle):
+    scope = 'anon'
+
+
+class UserSlidingThrottle(SlidingWindowThrottle, UserRateThrottle):
+    scope = 'user'
+
+
+class OtpThrottle(SlidingWindowThrottle):
+    """
+    Strict 'otp' scope for endpoints that send an OTP, keyed by the target email
+    (falling back to the client IP) so one inbox can't be flooded from many IPs.
+    """
+    scope = 'otp'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        ident = str(email).strip().lower() if email else self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+def check_throttles(request):
+    """
+    APIView.check_throttles() for a plain Django view whose request.user is
+    set: a 429 response like DRF's, or None when the request may proceed.
+    """
+    durations = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            durations.append(throttle.wait())
+    if not durations:
+        return None
+    wait = max((duration for duration in durations if duration is not None), default=None)
+    response = JsonResponse({"detail": str(Throttled(wait).detail)}, status=429)
+    if wait is not None:
+        response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def throttled(view):
+    """
+    Async view decorator running check_throttles(); place it under jwt_required.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        response = await sync_to_async(check_throttles)(request)
+        if response is not None:
+            return response
+        return await view(request, *args, **kwargs)
+    return wrapper
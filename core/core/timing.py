@@ -0,0 +1,181 @@
+"""
+Per-route request timing aggregates for core.middleware.ServerTimingMiddleware.
+
+Each process adds its requests to local counters, and a background thread
+flushes them to the cache with cache.incr every SERVER_TIMING_FLUSH_SECONDS
+(stats() also flushes the serving process first), so the request path never
+waits on the cache. Besides the sums, the total time of each request is
+counted in a fixed latency histogram, which is enough to estimate p50/p95/p99
+across all workers.
+
+Routes are registered in numbered slots: cache.add claims a route once, an
+atomic increment hands it the next slot, so workers discovering routes at the
+same time never overwrite each other's.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+ROUTE_COUNT_KEY = "core:timing:routes"
+# Sums kept per route; durations in microseconds
+METRICS = ("count", "total_us", "view_us", "render_us", "db_us", "db_queries")
+# Upper bounds (ms) of the histogram buckets for the total time; the last one is open
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_lock = threading.Lock()
+_pending = {}
+_routes = {}
+# pid of the process whose flusher thread is running (threads don't survive a fork)
+_flusher_pid = None
+
+
+def _key(route, metric):
+    return f"core:timing:{route}:{metric}"
+
+
+def _claim_key(route):
+    return f"core:timing:{route}:slot"
+
+
+def _slot_key(n):
+    return f"core:timing:route:{n}"
+
+
+def _bucket(total_ms):
+    for i, bound in enumerate(BUCKETS_MS):
+        if total_ms <= bound:
+            return i
+    return len(BUCKETS_MS)
+
+
+def record(route, url_name, total, view, render, db, db_queries):
+    """
+    Add one request (durations in seconds) to this process's counters.
+    """
+    with _lock:
+        counters = _pending.setdefault(route, dict.fromkeys(METRICS, 0))
+        counters["count"] += 1
+        counters["total_us"] += int(total * 1e6)
+        counters["view_us"] += int(view * 1e6)
+        counters["render_us"] += int(render * 1e6)
+        counters["db_us"] += int(db * 1e6)
+        counters["db_queries"] += db_queries
+        bucket = f"b{_bucket(total * 1000)}"
+        counters[bucket] = counters.get(bucket, 0) + 1
+        _routes[route] = url_name
+        if _flusher_pid != os.getpid():
+            _start_flusher()
+
+
+def _start_flusher():
+    # Called with _lock held
+    global _flusher_pid
+    _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_forever, name="server-timing-flush", daemon=True).start()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(settings.SERVER_TIMING_FLUSH_SECONDS)
+        try:
+            flush()
+        except Exception:
+            # A cache outage must not end the thread; that interval's counters are lost
+            pass
+
+
+def _incr(key, delta):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        if cache.add(key, delta, None):
+            return delta
+        return cache.incr(key, delta)
+
+
+def flush():
+    """
+    Move this process's counters into the shared cache.
+    """
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+        routes = {route: _routes[route] for route in pending}
+    if not pending:
+        return
+    for route, url_name in routes.items():
+        if cache.add(_claim_key(route), True, None):
+            cache.set(_slot_key(_incr(ROUTE_COUNT_KEY, 1)), (route, url_name), None)
+    for route, counters in pending.items():
+        for metric, delta in counters.items():
+            if delta:
+                _incr(_key(route, metric), delta)
+
+
+def _percentile(buckets, count, p):
+    target = p / 100 * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= target and n:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+    return None
+
+
+def _registered_routes():
+    count = cache.get(ROUTE_COUNT_KEY) or 0
+    slots = cache.get_many([_slot_key(n) for n in range(1, count + 1)])
+    # A slot claimed by a worker that hasn't written it yet is skipped
+    return dict(slots.values())
+
+
+def stats():
+    """
+    Aggregates per route, slowest average first. Percentiles are histogram
+    bucket upper bounds in ms (None means above the largest bucket).
+    """
+    flush()
+    routes = _registered_routes()
+    bucket_names = [f"b{i}" for i in range(len(BUCKETS_MS) + 1)]
+    keys = [_key(route, metric) for route in routes for metric in (*METRICS, *bucket_names)]
+    values = cache.get_many(keys)
+    result = []
+    for route, url_name in routes.items():
+        counters = {metric: values.get(_key(route, metric), 0) for metric in METRICS}
+        count = counters["count"]
+        if not count:
+            continue
+        buckets = [values.get(_key(route, name), 0) for name in bucket_names]
+        result.append({
+            "route": route,
+            "url_name": url_name,
+            "requests": count,
+            "avg_total_ms": counters["total_us"] / count / 1000,
+            "avg_view_ms": counters["view_us"] / count / 1000,
+            "avg_render_ms": counters["render_us"] / count / 1000,
+            "avg_db_ms": counters["db_us"] / count / 1000,
+            "avg_db_queries": counters["db_queries"] / count,
+            "p50_ms": _percentile(buckets, count, 50),
+            "p95_ms": _percentile(buckets, count, 95),
+            "p99_ms": _percentile(buckets, count, 99),
+        })
+    result.sort(key=lambda row: row["avg_total_ms"], reverse=True)
+    return result
+
+
+def reset():
+    global _pending
+    with _lock:
+        _pending = {}
+    routes = _registered_routes()
+    count = cache.get(ROUTE_COUNT_KEY) or 0
+    bucket_names = [f"b{i}" for i in range(len(BUCKETS_MS) + 1)]
+    cache.delete_many(
+        [_key(route, metric) for route in routes for metric in (*METRICS, *bucket_names)]
+        + [_claim_key(route) for route in routes]
+        + [_slot_key(n) for n in range(1, count + 1)]
+        + [ROUTE_COUNT_KEY]
+    )
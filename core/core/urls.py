@@ -18,10 +18,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import DatabasePoolStatsView, ServerTimingStatsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/users/", include("users.urls")),
     path("api/questions/", include("questions.urls")), # Added questions app URLs
     path("api/quiz/", include("quiz.urls")), # Added questions app URLs
+    path("api/results/", include("results.urls")),
+    path("api/admin/server-timing/", ServerTimingStatsView.as_view(), name="server-timing-stats"),
+    path("api/admin/db-pool/", DatabasePoolStatsView.as_view(), name="db-pool-stats"),
 
 ]
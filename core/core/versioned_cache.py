@@ -0,0 +1,99 @@
+"""
+Versioned cache namespaces.
+
+A namespace keeps one version counter and every derived entry is keyed by
+that version, so bumping the counter invalidates all of them at once without
+having to know which keys were written.
+
+The counter is a core.models.CacheVersion row rather than a cache entry: with
+the per-process local-memory cache a bump would only reach the worker that
+made it, and the others would go on serving the old entries. Reading it costs
+one indexed query per version() call, so callers read it once per request and
+pass it on.
+
+The `a`-prefixed methods are the same for async views, on the async ORM and
+cache API.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+class VersionedCache:
+    def __init__(self, namespace, timeout=DEFAULT_TIMEOUT):
+        self.namespace = namespace
+        self.timeout = timeout
+
+    def _create(self):
+        # Seed from the clock so a recreated row never reuses the version of
+        # entries still held by a shared cache.
+        try:
+            with transaction.atomic():
+                return CacheVersion.objects.create(namespace=self.namespace, version=time.time_ns()).version
+        except IntegrityError:
+            # Created by a concurrent request
+            return CacheVersion.objects.get(namespace=self.namespace).version
+
+    async def _acreate(self):
+        # No transaction to protect here: async ORM queries run in autocommit
+        try:
+            return (await CacheVersion.objects.acreate(namespace=self.namespace, version=time.time_ns())).version
+        except IntegrityError:
+            return (await CacheVersion.objects.aget(namespace=self.namespace)).version
+
+    def version(self):
+        version = CacheVersion.objects.filter(namespace=self.namespace).values_list('version', flat=True).first()
+        if version is None:
+            version = self._create()
+        return version
+
+    async def aversion(self):
+        version = await CacheVersion.objects.filter(namespace=self.namespace).values_list('version', flat=True).afirst()
+        if version is None:
+            version = await self._acreate()
+        return version
+
+    def bump(self):
+        if not CacheVersion.objects.filter(namespace=self.namespace).update(version=F('version') + 1):
+            self._create()
+
+    def key(self, name, version=None):
+        if version is None:
+            version = self.version()
+        return f"{self.namespace}:{version}:{name}"
+
+    async def akey(self, name, version=None):
+        if version is None:
+            version = await self.aversion()
+        return f"{self.namespace}:{version}:{name}"
+
+    def get_or_build(self, name, builder, version=None):
+        """
+        Return the entry `name` for the current (or given) version, calling
+        `builder()` and storing its result on a miss.
+        """
+        key = self.key(name, version)
+        value = cache.get(key)
+        if value is None:
+            value = builder()
+            cache.set(key, value, self.timeout)
+        return value
+
+    async def aget_or_build(self, name, builder, version=None):
+        """
+        get_or_build() for async callers. `builder` stays synchronous and only
+        runs on a miss, once per version.
+        """
+        key = await self.akey(name, version)
+        value = await cache.aget(key)
+        if value is None:
+            value = await sync_to_async(builder)()
+            await cache.aset(key, value, self.timeout)
+        return value
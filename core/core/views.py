@@ -0,0 +1,42 @@
+"""
+Project-level admin endpoints.
+"""
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import dbpool, timing
+
+
+class ServerTimingStatsView(APIView):
+    """
+    GET: per-route request counts, average total/view/render/DB time, DB
+    queries and p50/p95/p99 from core.middleware.ServerTimingMiddleware.
+    DELETE: reset the aggregates.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"enabled": settings.SERVER_TIMING, "routes": timing.stats()}, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        timing.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DatabasePoolStatsView(APIView):
+    """
+    GET: connection reuse mode and, with DB_POOL, pool size, idle connections
+    and pool-wait counters for the process that serves the request.
+    DELETE: reset the pool's cumulative counters.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(dbpool.stats(), status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        dbpool.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,5 @@
+"""
+Offline load and benchmark tools. Run from the project directory (core/) as
+`python -m loadtest.<module> --help`, against a local database only: they
+create throwaway users and submissions.
+"""
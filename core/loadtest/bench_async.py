@@ -0,0 +1,170 @@
+"""
+Compare the sync exam endpoints under WSGI (core/wsgi.py, the deployed
+setup) with the same views and their native async variants under ASGI
+(core/asgi.py).
+
+Both applications are driven in-process, so no server is needed and the
+numbers measure the handler, middleware, view and database only:
+
+    cd core
+    python -m loadtest.bench_async --scenario questions --requests 2000 --concurrency 50
+
+Runs against the local database from loadtest.settings and refuses any other
+database host unless --allow-remote-db is given. Throwaway users named
+loadtest-<run>-<n>@diu.edu.bd are created for the run and deleted at the end,
+after which rankings and item statistics are rebuilt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "loadtest.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from datetime import timedelta  # noqa: E402
+
+from django.conf import settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from quiz.cache import get_pool  # noqa: E402
+from quiz.models import QuizQuestion  # noqa: E402
+from results import stats  # noqa: E402
+from results.models import BANK_QUIZ, ExamSession  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+from users import ranking  # noqa: E402
+from users.models import User  # noqa: E402
+
+from .drivers import asgi_request, wsgi_request  # noqa: E402
+from .stats import format_table, summarize  # noqa: E402
+
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+
+# scenario -> (method, sync view path, async view path)
+SCENARIOS = {
+    "questions": ("GET", "/api/quiz/questions/", "/api/quiz/async/questions/"),
+    "me": ("GET", "/api/users/me/", "/api/users/async/me/"),
+    "submit": ("POST", "/api/quiz/submit/", "/api/quiz/async/submit/"),
+}
+
+
+def run_wsgi(method, path, jobs, concurrency):
+    def one(job):
+        token, body = job
+        started = time.perf_counter()
+        status, _ = wsgi_request(method, path, body, token)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, jobs))
+    return results, time.perf_counter() - started
+
+
+def run_asgi(method, path, jobs, concurrency):
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(job):
+            token, body = job
+            async with semaphore:
+                started = time.perf_counter()
+                status, _ = await asgi_request(method, path, body, token)
+                return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(job) for job in jobs))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def create_users(run_id, count):
+    users = User.objects.bulk_create(
+        [
+            User(
+                email=f"loadtest-{run_id}-{n}@diu.edu.bd",
+                password="!",  # unusable, tokens are minted directly
+                full_name=f"Load Test {n}",
+                whatsapp_number="0",
+                student_id=f"LT{n}",
+                is_email_verified=True,
+            )
+            for n in range(count)
+        ],
+        batch_size=1000,
+    )
+    if users and users[0].pk is None:  # Backends without RETURNING
+        users = list(User.objects.filter(email__startswith=f"loadtest-{run_id}-").order_by("id"))
+    # Submitting needs a started exam session
+    pool, now = get_pool(), timezone.now()
+    deadline = now + timedelta(seconds=settings.EXAM_DURATION_SECONDS)
+    ExamSession.objects.bulk_create(
+        [ExamSession(user=user, bank=BANK_QUIZ, pool=pool, seed=n, started_at=now, deadline=deadline)
+         for n, user in enumerate(users)],
+        batch_size=1000,
+    )
+    return [str(AccessToken.for_user(user)) for user in users]
+
+
+def cleanup(run_id):
+    User.objects.filter(email__startswith=f"loadtest-{run_id}-").delete()
+    ranking.rebuild()
+    stats.rebuild(BANK_QUIZ)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="questions")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per target.")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--allow-remote-db", action="store_true",
+                        help="Run even though the database is not on this machine.")
+    args = parser.parse_args()
+
+    # The run creates and deletes users: never point it at a real database by accident
+    host = settings.DATABASES["default"].get("HOST") or ""
+    if host not in LOCAL_HOSTS and not args.allow_remote_db:
+        sys.exit(f"Refusing to benchmark database host {host!r}; pass --allow-remote-db if that is intended.")
+
+    method, sync_path, async_path = SCENARIOS[args.scenario]
+    targets = [
+        ("wsgi  sync view", "wsgi", sync_path),
+        ("asgi  sync view", "asgi", sync_path),
+        ("asgi  async view", "asgi", async_path),
+    ]
+    body = b""
+    if method == "POST":
+        q_ids = QuizQuestion.objects.values_list("id", flat=True)
+        body = json.dumps({"answers": [{"q_id": q_id, "ans": "A"} for q_id in q_ids]}).encode()
+
+    run_id = uuid.uuid4().hex[:8]
+    # Every submission needs a user that has not attempted yet; reads can share users
+    per_target = args.requests if method == "POST" else args.concurrency
+    tokens = create_users(run_id, per_target * len(targets))
+    rows = {}
+    try:
+        for n, (label, server, path) in enumerate(targets):
+            own = tokens[n * per_target:(n + 1) * per_target]
+            jobs = [(own[i % len(own)], body) for i in range(args.requests)]
+            runner = run_wsgi if server == "wsgi" else run_asgi
+            if method == "GET":
+                runner(method, path, jobs[:1], 1)  # Warm the caches outside the timing
+            results, elapsed = runner(method, path, jobs, args.concurrency)
+            errors = sum(1 for _, status in results if status >= 400)
+            rows[label] = summarize([latency for latency, _ in results], elapsed, errors)
+    finally:
+        cleanup(run_id)
+
+    print(f"{args.scenario}: {args.requests} requests per target, concurrency {args.concurrency}")
+    print(format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Measure what connection reuse saves: the same short requests against the
+local Postgres from loadtest.settings, with a new connection per request,
+persistent connections (CONN_MAX_AGE), and psycopg's pool (DB_POOL).
+
+    cd core
+    python -m loadtest.bench_db --requests 2000 --concurrency 20 --pool-max-size 10
+    LOADTEST_DB_SSLMODE=require python -m loadtest.bench_db   # include the TLS handshake
+
+Each simulated request goes through request_started/request_finished, which is
+where Django opens, reuses, health-checks and returns connections, and runs
+--queries `SELECT 1`. Each mode runs in its own process because the database
+settings are fixed at startup. The pool run also prints the pool's wait
+statistics (core.dbpool). Nothing is written to the database.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .stats import format_table, summarize
+
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+
+# mode -> loadtest.settings environment
+MODES = {
+    "per-request": {"LOADTEST_DB_POOL": "False", "LOADTEST_DB_CONN_MAX_AGE": "0"},
+    "persistent": {"LOADTEST_DB_POOL": "False", "LOADTEST_DB_CONN_MAX_AGE": "60"},
+    "pool": {"LOADTEST_DB_POOL": "True"},
+}
+
+
+def run_mode(args):
+    """
+    Benchmark the mode configured in this process and return its results.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "loadtest.settings")
+
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.core.signals import request_finished, request_started
+    from django.db import DatabaseError, connection
+
+    from core import dbpool
+
+    if connection.vendor != "postgresql":
+        sys.exit("bench_db needs the local Postgres; unset LOADTEST_DB=sqlite.")
+    host = settings.DATABASES["default"].get("HOST") or ""
+    if host not in LOCAL_HOSTS and not args.allow_remote_db:
+        sys.exit(f"Refusing to benchmark database host {host!r}; pass --allow-remote-db if that is intended.")
+
+    def one(_):
+        started = time.perf_counter()
+        request_started.send(sender=None)
+        try:
+            with connection.cursor() as cursor:
+                for _ in range(args.queries):
+                    cursor.execute("SELECT 1")
+            ok = True
+        except DatabaseError:
+            ok = False
+        finally:
+            request_finished.send(sender=None)
+        latency = time.perf_counter() - started
+        if args.think_ms:
+            time.sleep(args.think_ms / 1000)
+        return latency, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    connection_stats = dbpool.stats()
+    summary = summarize([latency for latency, _ in results], elapsed, sum(1 for _, ok in results if not ok))
+    return {"summary": summary, "connections": connection_stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["all", *MODES], default="all")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=3, help="Queries per request.")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause after each request, outside the timing.")
+    parser.add_argument("--pool-min-size", type=int, default=2)
+    parser.add_argument("--pool-max-size", type=int, default=10)
+    parser.add_argument("--pool-timeout", type=float, default=10.0)
+    parser.add_argument("--allow-remote-db", action="store_true")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ["LOADTEST_DB_POOL_MIN_SIZE"] = str(args.pool_min_size)
+    os.environ["LOADTEST_DB_POOL_MAX_SIZE"] = str(args.pool_max_size)
+    os.environ["LOADTEST_DB_POOL_TIMEOUT"] = str(args.pool_timeout)
+
+    if args.mode != "all":
+        os.environ.update(MODES[args.mode])
+        result = run_mode(args)
+        if args.json:
+            print(json.dumps(result))
+            return
+        results = {args.mode: result}
+    else:
+        results = {}
+        for mode in MODES:
+            command = [sys.executable, "-m", "loadtest.bench_db", *sys.argv[1:], "--mode", mode, "--json"]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{args.requests} requests x {args.queries} queries, concurrency {args.concurrency}")
+    print(format_table({mode: result["summary"] for mode, result in results.items()}))
+    if "pool" in results:
+        pool_stats = results["pool"]["connections"]
+        print(
+            f"pool: size {pool_stats.get('pool_size')} (min {pool_stats.get('pool_min')}, "
+            f"max {pool_stats.get('pool_max')}), {pool_stats.get('connections_num', 0)} connections opened, "
+            f"{pool_stats.get('requests_waiting', 0)} waiting now, "
+            f"{pool_stats.get('requests_queued', 0)} of {pool_stats.get('requests_num', 0)} requests queued, "
+            f"avg wait {pool_stats['avg_wait_ms']:.2f}ms, {pool_stats.get('requests_errors', 0)} timeouts"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Exam-day load test: every simulated student registers, verifies the OTP from
+the email, logs in, fetches the questions and submits, as at 10:00 on
+exam day.
+
+    cd core
+    python -m loadtest.exam_day --migrate --students 5000 --concurrency 200 --ramp 60 \\
+        --slo login=1500 --slo submit=800
+
+It runs fully offline against loadtest.settings:
+- The app is driven in-process through core.wsgi. Use --base-url for a
+  server started with DJANGO_SETTINGS_MODULE=loadtest.settings on the same
+  local database.
+- OTP emails go through the real outbox worker to an SMTP stub on 127.0.0.1.
+
+The report gives throughput and p50/p95/p99 per endpoint, plus the OTP
+delivery time. The exit status is 1 when an --slo p99 budget (ms) or
+--max-error-rate is exceeded, so a release can be gated on it.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .drivers import http_request, wsgi_request
+from .smtp_stub import SMTPStub
+from .stats import format_table, summarize
+
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+
+# bank -> (questions path, submit path)
+BANKS = {
+    "quiz": ("/api/quiz/questions/", "/api/quiz/submit/"),
+    "questions": ("/api/questions/exam/questions/", "/api/questions/exam/submit/"),
+}
+
+
+class Recorder:
+    """
+    Thread-safe latencies and error counts per endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint, latency, ok=True):
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summaries(self, elapsed):
+        return {
+            endpoint: summarize(latencies, elapsed, self.errors[endpoint])
+            for endpoint, latencies in self.latencies.items()
+        }
+
+
+class OutboxWorker(threading.Thread):
+    """
+    The send_outbox loop in a thread, delivering to the SMTP stub.
+    """
+
+    def __init__(self, batch_size=200):
+        super().__init__(name="outbox-worker", daemon=True)
+        self.batch_size = batch_size
+        self.stopped = threading.Event()
+
+    def run(self):
+        from django.core.mail import get_connection
+        from django.db import DatabaseError, connection as db_connection
+
+        from users.emails import send_outbox_batch
+
+        connection = get_connection()
+        try:
+            while not self.stopped.is_set():
+                try:
+                    sent, _ = send_outbox_batch(connection, self.batch_size)
+                except (OSError, DatabaseError):
+                    # Mail server or database hiccup; students waiting on an OTP will time out
+                    sent = 0
+                if not sent:
+                    connection.close()
+                    self.stopped.wait(0.05)
+        finally:
+            connection.close()
+            db_connection.close()
+
+
+def quiz_answers(payload):
+    return {"answers": [
+        {"q_id": question["id"], "ans": random.choice("ABCD")}
+        for question in payload["questions"]
+    ]}
+
+
+def questions_answers(payload):
+    return {"answers": [
+        {"question_id": question["id"], "selected_option_index": random.randrange(max(len(question["options"]), 1))}
+        for question in payload
+    ]}
+
+
+class Student:
+    def __init__(self, harness, n):
+        self.harness = harness
+        self.email = f"loadtest-{harness.run_id}-{n}@diu.edu.bd"
+        self.password = f"Lt-{harness.run_id}-{n}-pass"
+        self.n = n
+
+    def call(self, endpoint, method, path, data=None, token=None, expect=200):
+        body = json.dumps(data).encode() if data is not None else b""
+        started = time.perf_counter()
+        try:
+            status, content = self.harness.send(method, path, body, token)
+        except Exception:
+            self.harness.recorder.add(endpoint, time.perf_counter() - started, ok=False)
+            return None
+        ok = status == expect
+        self.harness.recorder.add(endpoint, time.perf_counter() - started, ok)
+        if not ok:
+            return None
+        return json.loads(content) if content else {}
+
+    def run(self):
+        harness = self.harness
+        if self.call("register", "POST", "/api/users/register/", {
+            "email": self.email,
+            "password": self.password,
+            "full_name": f"Load Test {self.n}",
+            "whatsapp_number": "01700000000",
+            "student_id": f"LT-{self.n}",
+        }, expect=201) is None:
+            return False
+
+        registered = time.perf_counter()
+        delivered = harness.mailbox.wait_for_otp(self.email, harness.args.otp_timeout)
+        if delivered is None:
+            harness.recorder.add("otp_delivery", time.perf_counter() - registered, ok=False)
+            return False
+        otp, arrived = delivered
+        harness.recorder.add("otp_delivery", arrived - registered)
+
+        if self.call("verify_otp", "POST", "/api/users/verify-otp/", {"email": self.email, "otp": otp}) is None:
+            return False
+        login = self.call("login", "POST", "/api/users/login/", {"email": self.email, "password": self.password})
+        if login is None:
+            return False
+        token = login["access"]
+
+        questions_path, submit_path = BANKS[harness.args.bank]
+        payload = self.call("questions", "GET", questions_path, token=token)
+        if payload is None:
+            return False
+        answers = quiz_answers(payload) if harness.args.bank == "quiz" else questions_answers(payload)
+        return self.call("submit", "POST", submit_path, answers, token=token) is not None
+
+
+class Harness:
+    def __init__(self, args, mailbox):
+        self.args = args
+        self.mailbox = mailbox
+        self.recorder = Recorder()
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def send(self, method, path, body, token):
+        if self.args.base_url:
+            return http_request(self.args.base_url, method, path, body, token)
+        return wsgi_request(method, path, body, token)
+
+    def run(self):
+        args = self.args
+        started = time.perf_counter()
+        interval = args.ramp / args.students if args.students else 0
+
+        def student(n):
+            # Spread arrivals over --ramp seconds
+            delay = started + n * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            journey_started = time.perf_counter()
+            ok = Student(self, n).run()
+            self.recorder.add("journey", time.perf_counter() - journey_started, ok)
+            return ok
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            completed = sum(pool.map(student, range(args.students)))
+        return completed, time.perf_counter() - started
+
+    def cleanup(self):
+        from results import stats
+        from users import ranking
+        from users.models import EmailOutbox, User
+
+        prefix = f"loadtest-{self.run_id}-"
+        EmailOutbox.objects.filter(to_email__startswith=prefix).delete()
+        User.objects.filter(email__startswith=prefix).delete()
+        ranking.rebuild()
+        stats.rebuild(self.args.bank)
+
+
+def parse_slo(value):
+    endpoint, _, budget = value.partition("=")
+    try:
+        return endpoint, float(budget)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected endpoint=milliseconds, got {value!r}")
+
+
+def setup_database(args):
+    from django.conf import settings
+    from django.core.management import call_command
+
+    host = settings.DATABASES["default"].get("HOST") or ""
+    if host not in LOCAL_HOSTS and not args.allow_remote_db:
+        sys.exit(f"Refusing to load-test database host {host!r}; pass --allow-remote-db if that is intended.")
+    if args.migrate:
+        # Migrations are not committed, so create tables for apps without them too
+        call_command("migrate", run_syncdb=True, verbosity=0)
+    if args.seed_questions:
+        seed_questions(args.bank, args.seed_questions)
+
+
+def seed_questions(bank, count):
+    """
+    Fill an empty bank with `count` generated questions.
+    """
+    from questions.models import Question, text_hash
+    from quiz.cache import bank as quiz_bank
+    from quiz.models import QuizQuestion
+    from questions.cache import bank as questions_bank
+
+    if bank == "quiz" and not QuizQuestion.objects.exists():
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(text=f"Load test question {n}", option_a="a", option_b="b",
+                         option_c="c", option_d="d", correct=random.choice("ABCD"))
+            for n in range(count)
+        ])
+        quiz_bank.bump()  # bulk_create skips the signals
+    elif bank == "questions" and not Question.objects.exists():
+        Question.objects.bulk_create([
+            Question(text=f"Load test question {n}", text_hash=text_hash(f"Load test question {n}"),
+                     options=["a", "b", "c", "d"], correct_answer_index=random.randrange(4))
+            for n in range(count)
+        ])
+        questions_bank.bump()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50, help="Students in flight at once.")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Seconds over which students arrive.")
+    parser.add_argument("--bank", choices=sorted(BANKS), default="quiz")
+    parser.add_argument("--base-url", help="Drive a running server instead of core.wsgi in-process.")
+    parser.add_argument("--otp-timeout", type=float, default=60.0)
+    parser.add_argument("--migrate", action="store_true", help="Create or migrate the local database first.")
+    parser.add_argument("--seed-questions", type=int, default=30, help="Questions to create if the bank is empty.")
+    parser.add_argument("--allow-remote-db", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Keep the simulated students afterwards.")
+    parser.add_argument("--slo", type=parse_slo, action="append", default=[],
+                        help="endpoint=ms p99 budget, e.g. submit=800 (repeatable).")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    stub = SMTPStub().start()
+    os.environ["LOADTEST_SMTP_PORT"] = str(stub.port)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "loadtest.settings")
+
+    import django
+
+    django.setup()
+    setup_database(args)
+
+    worker = OutboxWorker()
+    worker.start()
+    harness = Harness(args, stub.mailbox)
+    try:
+        completed, elapsed = harness.run()
+    finally:
+        worker.stopped.set()
+        worker.join()
+        stub.stop()
+        if not args.keep:
+            harness.cleanup()
+
+    summaries = harness.recorder.summaries(elapsed)
+    print(f"{args.students} students ({completed} completed) in {elapsed:.1f}s, "
+          f"{completed / elapsed:.1f} students/s, concurrency {args.concurrency}, bank {args.bank}")
+    print(format_table(summaries))
+
+    failures = []
+    requests = sum(s["requests"] for endpoint, s in summaries.items() if endpoint != "journey")
+    errors = sum(s["errors"] for endpoint, s in summaries.items() if endpoint != "journey")
+    if requests and errors / requests > args.max_error_rate:
+        failures.append(f"error rate {errors / requests:.2%} > {args.max_error_rate:.2%}")
+    for endpoint, budget in args.slo:
+        p99 = summaries.get(endpoint, {}).get("p99")
+        if p99 is None:
+            failures.append(f"{endpoint}: no requests recorded")
+        elif p99 > budget:
+            failures.append(f"{endpoint}: p99 {p99:.1f}ms > {budget:.0f}ms")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Settings for the load-test tools: core.settings with everything that could
+reach a shared service replaced by a local one.
+
+The database, cache and mail server come from LOADTEST_* variables rather
+than the DB_*, REDIS_URL and EMAIL_* ones, so a .env holding production
+credentials is never used by accident.
+"""
+import os
+
+from core.settings import *  # noqa: F401,F403
+from core.settings import BASE_DIR, REST_FRAMEWORK
+
+SECRET_KEY = os.getenv("LOADTEST_SECRET_KEY", "loadtest-only-not-secret")
+DEBUG = False
+
+if os.getenv("LOADTEST_DB", "postgres") == "sqlite":
+    # Fine for a smoke run; SQLite serialises writers, so submit p99 is meaningless
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("LOADTEST_DB_NAME", str(BASE_DIR / "loadtest.sqlite3")),
+            # IMMEDIATE so writers queue on the lock instead of failing on upgrade
+            "OPTIONS": {"timeout": 30, "transaction_mode": "IMMEDIATE"},
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("LOADTEST_DB_NAME", "devquest_loadtest"),
+            "USER": os.getenv("LOADTEST_DB_USER", "postgres"),
+            "PASSWORD": os.getenv("LOADTEST_DB_PASSWORD", ""),
+            "HOST": os.getenv("LOADTEST_DB_HOST", "127.0.0.1"),
+            "PORT": os.getenv("LOADTEST_DB_PORT", "5432"),
+            "OPTIONS": {"sslmode": os.getenv("LOADTEST_DB_SSLMODE", "prefer")},
+            "CONN_HEALTH_CHECKS": True,
+            "CONN_MAX_AGE": int(os.getenv("LOADTEST_DB_CONN_MAX_AGE", 60)),
+        }
+    }
+    # Same switch as DB_POOL in core.settings
+    if os.getenv("LOADTEST_DB_POOL", "False").lower() == "true":
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("LOADTEST_DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("LOADTEST_DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.getenv("LOADTEST_DB_POOL_TIMEOUT", 10)),
+        }
+
+if os.getenv("LOADTEST_REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("LOADTEST_REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 1000000},
+        }
+    }
+# The app runs in this one process unless --base-url is given, and that
+# server must then be a single process too, or use LOADTEST_REDIS_URL
+CACHE_SHARED = True
+
+# The SMTP stub started by loadtest.exam_day
+EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+EMAIL_HOST = "127.0.0.1"
+EMAIL_PORT = int(os.getenv("LOADTEST_SMTP_PORT", 2525))
+EMAIL_USE_TLS = False
+EMAIL_HOST_USER = None
+EMAIL_HOST_PASSWORD = None
+
+# Every simulated student comes from 127.0.0.1, while real ones come from their
+# own addresses, so per-IP throttles would only measure the throttle
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {
+        **REST_FRAMEWORK.get("DEFAULT_THROTTLE_RATES", {}),
+        "anon": "1000000/hour",
+        "user": "1000000/hour",
+    },
+}
@@ -0,0 +1,109 @@
+"""
+Minimal SMTP sink for the load test. It speaks just enough SMTP for Django's
+smtp backend (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) and keeps the OTP
+found in each message, so simulated students can verify their accounts.
+"""
+import email
+import email.policy
+import re
+import socketserver
+import threading
+import time
+
+OTP_RE = re.compile(r"OTP\) is:\s*(\d+)")
+ADDRESS_RE = re.compile(r"<([^>]*)>")
+
+
+class Mailbox:
+    def __init__(self):
+        self._otps = {}
+        self._condition = threading.Condition()
+        self.received = 0
+
+    def deliver(self, recipients, data):
+        message = email.message_from_bytes(data, policy=email.policy.default)
+        body = message.get_body(preferencelist=("plain", "html"))
+        match = OTP_RE.search(body.get_content() if body is not None else "")
+        with self._condition:
+            self.received += 1
+            if match:
+                for recipient in recipients:
+                    self._otps[recipient.lower()] = (match.group(1), time.perf_counter())
+            self._condition.notify_all()
+
+    def wait_for_otp(self, address, timeout):
+        """
+        (otp, perf_counter time it arrived) for `address`, or None after `timeout` seconds.
+        """
+        address = address.lower()
+        with self._condition:
+            self._condition.wait_for(lambda: address in self._otps, timeout)
+            return self._otps.pop(address, None)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line.rstrip(b"\r\n") == b".":
+                return b"".join(lines)
+            if line.startswith(b".."):  # Undo dot-stuffing
+                line = line[1:]
+            lines.append(line)
+
+    def handle(self):
+        self.reply("220 loadtest SMTP stub")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 loadtest")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                match = ADDRESS_RE.search(command)
+                recipients.append(match.group(1) if match else command.partition(":")[2].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                self.server.mailbox.deliver(recipients, self.read_data())
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # RSET, NOOP and anything else
+                self.reply("250 OK")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """
+    SMTPStub(port=0).start() listens on 127.0.0.1 (0 = any free port, see .port).
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port=0):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.mailbox = Mailbox()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="smtp-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,44 @@
+"""
+Latency summaries shared by the load-test tools.
+"""
+import math
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    Throughput and latency percentiles (ms) of one run, `elapsed` in seconds.
+    """
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": len(values) / elapsed if elapsed else 0.0,
+        "p50": percentile(values, 50) * 1000,
+        "p95": percentile(values, 95) * 1000,
+        "p99": percentile(values, 99) * 1000,
+        "max": (values[-1] if values else 0.0) * 1000,
+    }
+
+
+def format_table(rows):
+    """
+    Render {label: summary} as a fixed-width table.
+    """
+    header = f"{'':<32} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    lines = [header, "-" * len(header)]
+    for label, s in rows.items():
+        lines.append(
+            f"{label:<32} {s['requests']:>8} {s['errors']:>6} {s['rps']:>9.1f} "
+            f"{s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f} {s['max']:>8.1f}"
+        )
+    return "\n".join(lines)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django import forms # Import forms
-from .models import Question
+from .models import NearDuplicate, Question
 
 class QuestionForm(forms.ModelForm):
     options = forms.CharField(widget=forms.Textarea(attrs={'rows': 4, 'cols': 80}), help_text="Enter options as a JSON list of strings, e.g., [\"Option A\", \"Option B\"]")
@@ -9,9 +9,24 @@ class QuestionForm(forms.ModelForm):
         model = Question
         fields = '__all__'
 
+    def clean_text(self):
+        text = self.cleaned_data['text']
+        if Question.text_taken(text, exclude_pk=self.instance.pk):
+            raise forms.ValidationError("A question with this text already exists.")
+        return text
+
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     form = QuestionForm # Apply the custom form
     list_display = ('text', 'correct_answer_index', 'created_at', 'updated_at')
     search_fields = ('text',)
     list_filter = ('created_at', 'updated_at')
+
+
+@admin.register(NearDuplicate)
+class NearDuplicateAdmin(admin.ModelAdmin):
+    # Dismiss a flag to keep both questions; it is not raised again
+    list_display = ('bank', 'question_id', 'duplicate_of_id', 'similarity', 'dismissed', 'created_at')
+    list_editable = ('dismissed',)
+    list_filter = ('bank', 'dismissed')
+    ordering = ('dismissed', '-similarity')
@@ -0,0 +1,64 @@
+"""
+Native async versions of the examinee endpoints, see quiz.async_views.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from core.conditional import not_modified, payload_response
+from core.throttling import check_throttles, throttled
+from users.authentication import aauthenticate, jwt_required
+from .cache import aget_examinee_items, bank, render_shuffled, shuffle_seed
+from .grading import submit_answers
+from .views import examinee_etag
+
+
+@csrf_exempt
+@require_GET
+async def exam_questions(request):
+    """
+    Async ExamineeQuestionListAPIView; anonymous callers are still allowed.
+    """
+    # Like the DRF view, only a JWT identifies the caller
+    request.user = user = await aauthenticate(request) or AnonymousUser()
+    response = await sync_to_async(check_throttles)(request)
+    if response is not None:
+        return response
+
+    # Same steps as questions.views.examinee_questions_response
+    if not user.is_authenticated:
+        return HttpResponse(render_shuffled(await aget_examinee_items()), content_type="application/json")
+
+    seed = shuffle_seed(user.pk)
+    version = await bank.aversion()
+    etag = examinee_etag(version, seed)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return payload_response(request, etag, render_shuffled(await aget_examinee_items(version), seed))
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+@throttled
+async def submit_exam(request):
+    """
+    Async SubmitExamAPIView.
+    """
+    if request.user.exam_attempted:
+        return JsonResponse({"detail": "You have already attempted the exam."}, status=400)
+
+    try:
+        answers_data = json.loads(request.body).get('answers', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+    if not answers_data:
+        return JsonResponse({"detail": "No answers submitted."}, status=400)
+
+    status_code, payload = await sync_to_async(submit_answers)(request.user.pk, answers_data)
+    return JsonResponse(payload, status=status_code)
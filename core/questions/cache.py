@@ -0,0 +1,89 @@
+import hashlib
+import json
+import random
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from core.answer_key import AnswerKey
+from core.versioned_cache import VersionedCache
+from .models import Question
+from .serializers import ExamineeQuestionSerializer
+
+# Bumped by questions.signals whenever a Question is saved or deleted.
+bank = VersionedCache("questions:bank")
+
+
+def _render_examinee_items():
+    qs = Question.objects.order_by('id')
+    renderer = JSONRenderer()
+    return [renderer.render(item) for item in ExamineeQuestionSerializer(qs, many=True).data]
+
+
+def get_examinee_items(version=None):
+    """
+    Rendered JSON fragment of every question (without the correct answer), ordered by id.
+    """
+    return bank.get_or_build("examinee-items", _render_examinee_items, version)
+
+
+async def aget_examinee_items(version=None):
+    return await bank.aget_or_build("examinee-items", _render_examinee_items, version)
+
+
+def _build_report_map():
+    rows = Question.objects.values_list('id', 'text', 'options', 'correct_answer_index')
+    return {
+        q_id: {'id': q_id, 'question': text, 'options': options, 'correctAnswer': correct}
+        for q_id, text, options, correct in rows
+    }
+
+
+def get_report_map(version=None):
+    """
+    Answer key of the whole bank: question id -> report entry in the shape of
+    ReportQuestionSerializer, so grading needs no query or serializer per answer.
+    """
+    return bank.get_or_build("report-map", _build_report_map, version)
+
+
+async def aget_report_map(version=None):
+    return await bank.aget_or_build("report-map", _build_report_map, version)
+
+
+def _build_answer_key():
+    def correct_choice(options, correct):
+        if not isinstance(options, list):
+            options = json.loads(options)
+        # A key pointing outside the options can never be answered correctly
+        return correct if 0 <= correct < len(options) else None
+
+    rows = Question.objects.order_by('id').values_list('id', 'options', 'correct_answer_index')
+    return AnswerKey((q_id, correct_choice(options, correct)) for q_id, options, correct in rows)
+
+
+def get_answer_key(version=None):
+    """
+    core.answer_key.AnswerKey of the current (or given) bank version.
+    """
+    return bank.get_or_build("answer-key", _build_answer_key, version)
+
+
+def shuffle_seed(user_id):
+    """
+    Stable seed for one examinee in the current exam. hashlib is used instead of
+    hash() so every worker process derives the same value.
+    """
+    digest = hashlib.blake2b(f"{settings.EXAM_ID}:{user_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def render_shuffled(items, seed=None):
+    """
+    Join the cached fragments into a JSON list in a seeded random order.
+    A `None` seed gives a fresh order on every call.
+    """
+    order = list(range(len(items)))
+    random.Random(seed).shuffle(order)
+    return b"[" + b",".join(items[i] for i in order) + b"]"
+
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import status
+
+from core.answer_key import CORRECT
+from results.answers import record_attempt
+from results.models import BANK_QUESTIONS
+from users.ranking import record_score
+from .cache import bank, get_answer_key, get_report_map
+
+User = get_user_model()
+
+
+def grade_answers(report_map, answer_key, answers_data):
+    """
+    Grade [{'question_id': id, 'selected_option_index': index}, ...].
+
+    Returns (processed_answers, sheet): the report entries stored in
+    User.exam_answers and the encoded sheet to pass to answer_key.score().
+    Unknown question ids are skipped.
+    """
+    processed_answers = []
+    graded = [] # (question_id, selected_option_index) pairs for the answer key
+
+    for answer_entry in answers_data:
+        question_id = answer_entry.get('question_id')
+        selected_option_index = answer_entry.get('selected_option_index')
+
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            continue
+        question_data = report_map.get(question_id)
+        if question_data is None:
+            # We can't create a report for a question that doesn't exist, so we skip it.
+            # The frontend should ideally not send invalid question_ids.
+            continue
+
+        is_correct = (
+            isinstance(selected_option_index, int)
+            and answer_key.outcome(question_id, selected_option_index) == CORRECT
+        )
+        graded.append((question_id, selected_option_index))
+        processed_answers.append({
+            'question': question_data,
+            'selectedAnswer': selected_option_index,
+            'isCorrect': is_correct
+        })
+
+    return processed_answers, answer_key.encode(graded)
+
+
+
+def has_duplicates(answers_data):
+    """
+    Whether a question id is answered more than once; the answer key would
+    only score the last copy, so such submissions are rejected.
+    """
+    seen = set()
+    for answer_entry in answers_data:
+        try:
+            question_id = int(answer_entry.get('question_id'))
+        except (TypeError, ValueError):
+            continue
+        if question_id in seen:
+            return True
+        seen.add(question_id)
+    return False
+
+
+def submit_answers(user_pk, answers_data):
+    """
+    Grade a submission, then save it under a row lock on the user.
+    Returns (status_code, payload); shared by the sync and async submit views.
+    """
+    if has_duplicates(answers_data):
+        return status.HTTP_400_BAD_REQUEST, {"detail": "Duplicate question ids in payload."}
+
+    version = bank.version()
+    answer_key = get_answer_key(version)
+    total_questions = len(answer_key)
+    processed_answers, sheet = grade_answers(get_report_map(version), answer_key, answers_data)
+    correct_answers_count = answer_key.score(sheet)
+
+    with transaction.atomic():
+        # Lock the user row so two concurrent submissions can't both be graded
+        locked_user = User.objects.select_for_update().get(pk=user_pk)
+        if locked_user.exam_attempted:
+            return status.HTTP_400_BAD_REQUEST, {"detail": "You have already attempted the exam."}
+
+        locked_user.exam_attempted = True
+        locked_user.exam_marks = correct_answers_count
+        locked_user.save(update_fields=['exam_attempted', 'exam_marks'])
+        record_attempt(locked_user, BANK_QUESTIONS, correct_answers_count, processed_answers)
+        transaction.on_commit(lambda: record_score(correct_answers_count))
+
+    return status.HTTP_200_OK, {
+        "score": correct_answers_count,
+        "totalQuestions": total_questions,
+        "answeredQuestions": processed_answers
+    }
@@ -0,0 +1,265 @@
+"""
+Bulk question import from CSV, JSON (an array of objects) or JSON Lines.
+
+The file is read as a stream: each record is validated as it is parsed, and
+valid ones are inserted with bulk_create in chunks of `chunk_size`, one
+transaction per chunk. Questions whose text_hash already exists in the bank,
+or earlier in the same file, are skipped as duplicates. A bad record is
+reported with its 1-based row number and never aborts the rest of the file:
+in a JSON array, reading resumes after the next top-level comma. Only an
+element still open after _MAX_RECORD_SIZE characters (e.g. an unbalanced
+bracket) ends the file there. bulk_create skips the signals, so the bank
+cache is bumped once at the end, also when a later chunk fails after earlier
+ones were committed, and the questions this import created are checked for
+near-duplicates (questions.similarity) in one pass. After a failure that check
+is left to `find_near_duplicates`, which indexes any question missing.
+
+Records have `text`, `options` and `correct_answer_index`. In CSV, `options`
+is a JSON list or `|`-separated, or the options come from columns whose names
+start with "option", in column order (e.g. option_a .. option_d).
+"""
+import csv
+import json
+import re
+from itertools import islice
+
+from django.db import transaction
+
+from results.models import BANK_QUESTIONS
+from . import similarity
+from .cache import bank
+from .models import Question, text_hash
+
+FORMATS = ('csv', 'json', 'jsonl')
+
+# Characters read from a JSON array per decoding step
+_READ_SIZE = 64 * 1024
+# Longest JSON array element buffered while looking for its end
+_MAX_RECORD_SIZE = 1024 * 1024
+# Complete strings, structural characters, or the start of an unterminated string
+_JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{},]|"')
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self.errors = []
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "near_duplicates": self.near_duplicates,
+            "invalid": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def detect_format(filename):
+    """
+    Format from the file extension, or None if it is not one we read.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'ndjson':
+        return 'jsonl'
+    return extension if extension in FORMATS else None
+
+
+def _csv_records(stream):
+    reader = csv.DictReader(stream)
+    option_columns = [name for name in reader.fieldnames or () if name and name.lower().startswith('option')
+                      and name.lower() != 'options']
+    for row in reader:
+        record = {'text': row.get('text'), 'correct_answer_index': row.get('correct_answer_index')}
+        options = row.get('options')
+        if options:
+            options = options.strip()
+            try:
+                record['options'] = json.loads(options) if options.startswith('[') else options.split('|')
+            except ValueError:
+                record['options'] = options  # Rejected by validate()
+        else:
+            record['options'] = [row[name] for name in option_columns if row.get(name)]
+        yield record
+
+
+def _jsonl_records(stream):
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+
+
+def _element_end(buffer):
+    """
+    Index of the comma or bracket that ends the array element at the start of
+    `buffer`, or None if the element continues past it.
+    """
+    depth = 0
+    for match in _JSON_TOKEN.finditer(buffer):
+        token = match.group()
+        if token == '"':
+            return None
+        if token in '[{':
+            depth += 1
+        elif token in ']}':
+            if depth == 0:
+                return match.start()
+            depth -= 1
+        elif token == ',' and depth == 0:
+            return match.start()
+    return None
+
+
+def _json_array_records(stream):
+    """
+    Elements of a top-level JSON array, decoded one at a time from a buffer
+    that never holds more than the current element and one read. A malformed
+    element is yielded as a ValueError and skipped.
+    """
+    decoder = json.JSONDecoder()
+    buffer = stream.read(_READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        yield ValueError("Expected a JSON array of questions.")
+        return
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        end = _element_end(buffer)
+        if end is None:
+            if eof:
+                yield ValueError("Invalid JSON: the array is not closed.")
+                return
+            if len(buffer) > _MAX_RECORD_SIZE:
+                yield ValueError("Invalid JSON: an element is not closed; the rest of the file was not read.")
+                return
+            # The element may continue in the next read
+            chunk = stream.read(_READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        element, closing, buffer = buffer[:end].strip(), buffer[end], buffer[end + 1:]
+        if element:
+            try:
+                record, consumed = decoder.raw_decode(element)
+                if consumed != len(element):
+                    raise json.JSONDecodeError("Extra data", element, consumed)
+            except ValueError as e:
+                yield ValueError(f"Invalid JSON: {e}")
+            else:
+                yield record
+        elif closing == ',':
+            yield ValueError("Invalid JSON: empty element.")
+        if closing == ']':
+            return
+
+
+READERS = {
+    'csv': _csv_records,
+    'json': _json_array_records,
+    'jsonl': _jsonl_records,
+}
+
+
+def validate(record):
+    """
+    (Question, None) for a valid record, else (None, {field: message}).
+    """
+    if isinstance(record, ValueError):
+        return None, {"record": str(record)}
+    if not isinstance(record, dict):
+        return None, {"record": "Expected an object."}
+
+    errors = {}
+    text = record.get('text')
+    if not isinstance(text, str) or not text.strip():
+        errors['text'] = "Required."
+
+    options = record.get('options')
+    if not isinstance(options, list) or not all(isinstance(option, str) for option in options):
+        errors['options'] = "Must be a list of strings."
+    elif len(options) < 2:
+        errors['options'] = "At least two options are required."
+
+    correct = record.get('correct_answer_index')
+    try:
+        if isinstance(correct, (bool, float)):
+            raise ValueError
+        correct = int(correct)
+    except (TypeError, ValueError):
+        errors['correct_answer_index'] = "Must be an integer."
+    else:
+        if 'options' not in errors and not 0 <= correct < len(options):
+            errors['correct_answer_index'] = "Out of range for the options."
+
+    if errors:
+        return None, errors
+    text = text.strip()
+    return Question(text=text, text_hash=text_hash(text), options=options, correct_answer_index=correct), None
+
+
+def _insert(chunk, report):
+    """
+    Insert the questions of `chunk` not in the bank yet; returns their ids.
+    """
+    hashes = [question.text_hash for question in chunk]
+    existing = set(Question.objects.filter(text_hash__in=hashes).values_list('text_hash', flat=True))
+    new = [question for question in chunk if question.text_hash not in existing]
+    # ignore_conflicts: a question added meanwhile is a duplicate, not an error
+    with transaction.atomic():
+        Question.objects.bulk_create(new, ignore_conflicts=True)
+    report.duplicates += len(chunk) - len(new)
+    report.created += len(new)
+    # ignore_conflicts leaves the primary keys unset
+    return list(Question.objects.filter(text_hash__in=[question.text_hash for question in new])
+                .values_list('pk', flat=True))
+
+
+def import_questions(stream, file_format, chunk_size=1000, dry_run=False):
+    """
+    Import questions from a text stream. Returns an ImportReport; with
+    `dry_run` nothing is written and `created` counts what would be.
+    """
+    report = ImportReport()
+    seen = set()
+    created_ids = []
+    records = enumerate(READERS[file_format](stream), start=1)
+    try:
+        while True:
+            batch = list(islice(records, chunk_size))
+            if not batch:
+                break
+            chunk = []
+            for row, record in batch:
+                question, errors = validate(record)
+                if errors:
+                    report.errors.append({"row": row, "errors": errors})
+                elif question.text_hash in seen:
+                    report.duplicates += 1
+                else:
+                    seen.add(question.text_hash)
+                    chunk.append(question)
+            report.rows += len(batch)
+            if not chunk:
+                continue
+            if dry_run:
+                existing = Question.objects.filter(text_hash__in=[question.text_hash for question in chunk]).count()
+                report.duplicates += existing
+                report.created += len(chunk) - existing
+            else:
+                created_ids += _insert(chunk, report)
+    finally:
+        # Chunks committed before a failure (a decoding or database error) are in the bank too
+        if report.created and not dry_run:
+            bank.bump()
+
+    if report.created and not dry_run:
+        report.near_duplicates = similarity.index_many(BANK_QUESTIONS, created_ids)
+    return report
@@ -0,0 +1,40 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from questions.models import Question, text_hash
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill Question.text_hash for questions created before the column "
+        "existed. Reports questions whose text duplicates another one, since "
+        "the unique hash can't be set on both."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        taken = set(Question.objects.exclude(text_hash=None).values_list('text_hash', flat=True))
+        pending = Question.objects.filter(text_hash=None).only('id', 'text').order_by('pk').iterator(chunk_size=chunk_size)
+
+        filled = 0
+        while True:
+            chunk = list(islice(pending, chunk_size))
+            if not chunk:
+                break
+            updated = []
+            for question in chunk:
+                digest = text_hash(question.text)
+                if digest in taken:
+                    self.stderr.write(f"Question {question.pk} duplicates another question's text; left unset.")
+                    continue
+                taken.add(digest)
+                question.text_hash = digest
+                updated.append(question)
+            Question.objects.bulk_update(updated, ['text_hash'])
+            filled += len(updated)
+
+        self.stdout.write(self.style.SUCCESS(f"Filled text_hash on {filled} questions."))
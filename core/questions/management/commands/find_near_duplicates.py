@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from questions import similarity
+from questions.models import NearDuplicate
+from results.models import BANK_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        "Report clusters of near-duplicate questions in a bank, from the MinHash "
+        "signatures and LSH buckets of questions.similarity. Questions without "
+        "a signature are indexed first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', choices=[bank for bank, _ in BANK_CHOICES], action='append',
+                            help="Bank to check; repeatable (default: both).")
+        parser.add_argument('--threshold', type=float,
+                            help=f"Similarity to report (default: {settings.NEAR_DUPLICATE_THRESHOLD}).")
+        parser.add_argument('--max-bucket', type=int, default=1000,
+                            help="Skip LSH buckets with more questions than this.")
+        parser.add_argument('--reindex', action='store_true',
+                            help="Rebuild every signature first, e.g. after changing the hasher.")
+        parser.add_argument('--flag', action='store_true',
+                            help="Also record the reported pairs as NearDuplicate rows for review.")
+
+    def handle(self, *args, **options):
+        for bank in options['bank'] or [bank for bank, _ in BANK_CHOICES]:
+            if options['reindex']:
+                similarity.reindex(bank)
+            else:
+                similarity.index_missing(bank)
+            clusters = similarity.report(bank, options['threshold'], options['max_bucket'])
+
+            self.stdout.write(f"{bank}: {len(clusters)} clusters of near-duplicates")
+            for cluster in clusters:
+                self.stdout.write("  " + ", ".join(f"Q{q_id}" for q_id in cluster['question_ids']))
+                for a, b, score in cluster['pairs']:
+                    self.stdout.write(f"    Q{a} ~ Q{b}: {score:.2f}")
+
+            if options['flag']:
+                flags = [
+                    NearDuplicate(bank=bank, question_id=b, duplicate_of_id=a, similarity=score)
+                    for cluster in clusters for a, b, score in cluster['pairs']
+                ]
+                # ignore_conflicts keeps existing flags, dismissed ones included
+                NearDuplicate.objects.bulk_create(flags, ignore_conflicts=True)
+                self.stdout.write(self.style.SUCCESS(f"{bank}: recorded {len(flags)} pairs."))
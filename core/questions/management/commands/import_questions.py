@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.importer import FORMATS, detect_format, import_questions
+
+
+class Command(BaseCommand):
+    help = (
+        "Import questions from a CSV, JSON or JSON Lines file. The file is "
+        "streamed and inserted in chunks; duplicates (by text hash) are skipped "
+        "and invalid rows are reported without stopping the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS,
+                            help="File format (default: from the extension).")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Validate and count without inserting.")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("Can't tell the format from the file name; pass --format.")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = import_questions(stream, file_format, options['chunk_size'], options['dry_run'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: " + "; ".join(
+                f"{field}: {message}" for field, message in error['errors'].items()
+            ))
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report.created} of {report.rows} rows: "
+            f"{report.duplicates} duplicates, {len(report.errors)} invalid, "
+            f"{report.near_duplicates} flagged as near-duplicates."
+        ))
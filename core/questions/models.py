@@ -1,7 +1,22 @@
+import hashlib
+
 from django.db import models
 
+from results.models import BANK_CHOICES
+
+
+def text_hash(text):
+    """
+    sha256 hex digest of the question text with whitespace runs collapsed.
+    """
+    return hashlib.sha256(" ".join(str(text).split()).encode()).hexdigest()
+
+
 class Question(models.Model):
-    text = models.TextField(unique=True)
+    text = models.TextField()
+    # Unique fixed-size key instead of a unique index over the full text; null
+    # only on rows created before it existed (backfill_text_hashes)
+    text_hash = models.CharField(max_length=64, unique=True, null=True, editable=False)
     options = models.JSONField(default=list) # Stores a list of strings, e.g., ["Option A", "Option B", "Option C"]
     correct_answer_index = models.IntegerField() # 0-indexed position of the correct answer in the options list
     created_at = models.DateTimeField(auto_now_add=True)
@@ -10,7 +25,77 @@ class Question(models.Model):
     def __str__(self):
         return self.text[:50] # Display first 50 characters of the question text
 
+    def save(self, *args, **kwargs):
+        self.text_hash = text_hash(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'text_hash'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def text_taken(cls, text, exclude_pk=None):
+        """
+        Whether another question already has this text (up to whitespace).
+        """
+        return cls.objects.filter(text_hash=text_hash(text)).exclude(pk=exclude_pk).exists()
+
     class Meta:
         verbose_name = "Question"
         verbose_name_plural = "Questions"
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+
+class QuestionSignature(models.Model):
+    """
+    MinHash signature of one question of either bank (questions.similarity).
+    """
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    # Not a foreign key: the id refers to QuizQuestion or Question depending on `bank`
+    question_id = models.BigIntegerField()
+    signature = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bank', 'question_id'], name='unique_question_signature'),
+        ]
+
+
+class LSHBucket(models.Model):
+    """
+    One band of a signature; questions sharing a row here are candidates.
+    """
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    band = models.SmallIntegerField()
+    bucket = models.BigIntegerField()
+    question_id = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bank', 'bucket']),
+            models.Index(fields=['bank', 'question_id']),
+        ]
+
+
+class NearDuplicate(models.Model):
+    """
+    A question flagged as a likely reworded copy of an older one.
+    """
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    question_id = models.BigIntegerField()
+    duplicate_of_id = models.BigIntegerField()
+    # Estimated Jaccard similarity of the shingled text and options
+    similarity = models.FloatField()
+    # Reviewed and kept; not flagged again
+    dismissed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.bank} Q{self.question_id} ~ Q{self.duplicate_of_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bank', 'question_id', 'duplicate_of_id'], name='unique_near_duplicate'),
+        ]
+        indexes = [
+            models.Index(fields=['bank', 'duplicate_of_id']),
+        ]
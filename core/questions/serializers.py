@@ -19,6 +19,12 @@ class QuestionSerializer(serializers.ModelSerializer):
             return options_list
         except json.JSONDecodeError:
             raise serializers.ValidationError("Enter a valid JSON list for options.")
+
+    def validate_text(self, value):
+        if Question.text_taken(value, exclude_pk=self.instance.pk if self.instance else None):
+            raise serializers.ValidationError("A question with this text already exists.")
+        return value
+
 class ExamineeQuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from results.models import BANK_QUESTIONS
+from . import similarity
+from .cache import bank
+from .models import Question
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def bump_bank_version(sender, **kwargs):
+    # Bump after commit so a rebuild never caches rows that may still roll back.
+    transaction.on_commit(bank.bump)
+
+
+@receiver(post_save, sender=Question)
+def index_near_duplicates(sender, instance, update_fields=None, **kwargs):
+    if not similarity.hooks_enabled():
+        return
+    if update_fields is not None and not {'text', 'options'} & set(update_fields):
+        return
+    # robust: a failed index must not fail the save that has already committed
+    transaction.on_commit(lambda: similarity.index(BANK_QUESTIONS, instance.pk), robust=True)
+
+
+@receiver(post_delete, sender=Question)
+def forget_near_duplicates(sender, instance, **kwargs):
+    similarity.forget(BANK_QUESTIONS, instance.pk)
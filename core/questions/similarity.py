@@ -0,0 +1,259 @@
+"""
+Near-duplicate detection across both banks (core.minhash).
+
+Each question's text and options are shingled into a MinHash signature, stored
+as a QuestionSignature with one LSHBucket row per band. Indexing a new or
+edited question looks up the questions sharing any of its buckets with one
+indexed query, compares their signatures, and flags those at or above
+NEAR_DUPLICATE_THRESHOLD as NearDuplicate rows. Saves are indexed from
+questions.signals and quiz.signals, unless made inside indexed_by_caller();
+bulk inserts call index_many() with the ids they created.
+
+`report()` clusters a whole bank from its stored signatures: each question is
+only compared with those it shares a bucket with, so the work grows with the
+bank plus the number of colliding pairs, not with its square.
+"""
+import json
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from core.minhash import MinHasher, shingles, similarity
+from quiz.models import QuizQuestion
+from results.models import BANK_QUESTIONS, BANK_QUIZ
+from .models import LSHBucket, NearDuplicate, Question, QuestionSignature
+
+# 32 bands of 4 rows: pairs from about 0.42 similar on become candidates,
+# and the threshold decides which are flagged
+hasher = MinHasher(num_perm=128, bands=32)
+
+_caller_indexes = ContextVar("near_duplicates_caller_indexes", default=False)
+
+
+def _quiz_text(row):
+    return " ".join(part for part in row[1:] if part)
+
+
+def _questions_text(row):
+    _, text, options = row
+    if not isinstance(options, list):
+        try:
+            options = json.loads(options)
+        except (TypeError, ValueError):
+            options = []
+    return " ".join([text, *(str(option) for option in options)])
+
+
+# bank -> (model, values_list fields starting with the id, row -> text)
+SOURCES = {
+    BANK_QUIZ: (QuizQuestion, ('id', 'text', 'option_a', 'option_b', 'option_c', 'option_d'), _quiz_text),
+    BANK_QUESTIONS: (Question, ('id', 'text', 'options'), _questions_text),
+}
+
+
+def _signatures(bank, rows):
+    to_text = SOURCES[bank][2]
+    signatures = {}
+    for row in rows:
+        signature = hasher.signature(shingles(to_text(row)))
+        if signature is not None:
+            signatures[row[0]] = signature
+    return signatures
+
+
+def _index_rows(bank, rows):
+    """
+    (Re)index `rows` of `bank` and flag their near-duplicates among the
+    indexed questions and each other. Returns the new NearDuplicate rows.
+    """
+    threshold = settings.NEAR_DUPLICATE_THRESHOLD
+    signatures = _signatures(bank, rows)
+    ids = list(signatures)
+    buckets = {q_id: hasher.buckets(signature) for q_id, signature in signatures.items()}
+
+    with transaction.atomic():
+        # An edited question replaces its signature, buckets and open flags
+        QuestionSignature.objects.filter(bank=bank, question_id__in=ids).delete()
+        LSHBucket.objects.filter(bank=bank, question_id__in=ids).delete()
+        touching = Q(question_id__in=ids) | Q(duplicate_of_id__in=ids)
+        NearDuplicate.objects.filter(touching, bank=bank, dismissed=False).delete()
+
+        # Bucket keys include the band, so matching the key alone is enough
+        keys = {key for question_buckets in buckets.values() for key in question_buckets}
+        colliding = defaultdict(set)
+        for key, q_id in LSHBucket.objects.filter(bank=bank, bucket__in=keys).values_list('bucket', 'question_id'):
+            colliding[key].add(q_id)
+        stored_ids = {q_id for members in colliding.values() for q_id in members}
+        known = {
+            q_id: hasher.unpack(data)
+            for q_id, data in QuestionSignature.objects.filter(bank=bank, question_id__in=stored_ids)
+            .values_list('question_id', 'signature')
+        }
+        dismissed = set(
+            NearDuplicate.objects.filter(touching, bank=bank, dismissed=True)
+            .values_list('question_id', 'duplicate_of_id')
+        )
+
+        flags = []
+        for q_id in sorted(ids):
+            candidates = set()
+            for key in buckets[q_id]:
+                candidates |= colliding[key]
+            for other in sorted(candidates - {q_id}):
+                score = similarity(signatures[q_id], known[other]) if other in known else 0.0
+                # The newer question is the one flagged
+                pair = (max(q_id, other), min(q_id, other))
+                if score >= threshold and pair not in dismissed:
+                    flags.append(NearDuplicate(bank=bank, question_id=pair[0], duplicate_of_id=pair[1], similarity=score))
+            # Later rows of this batch are compared with this one too
+            known[q_id] = signatures[q_id]
+            for key in buckets[q_id]:
+                colliding[key].add(q_id)
+
+        QuestionSignature.objects.bulk_create([
+            QuestionSignature(bank=bank, question_id=q_id, signature=hasher.pack(signature))
+            for q_id, signature in signatures.items()
+        ])
+        LSHBucket.objects.bulk_create([
+            LSHBucket(bank=bank, band=band, bucket=key, question_id=q_id)
+            for q_id, question_buckets in buckets.items()
+            for band, key in enumerate(question_buckets)
+        ], batch_size=2000)
+        NearDuplicate.objects.bulk_create(flags, ignore_conflicts=True)
+    return flags
+
+
+def index(bank, question_id):
+    """
+    Index one saved question and flag its near-duplicates. Returns the flags.
+    """
+    model, fields, _ = SOURCES[bank]
+    row = model.objects.filter(pk=question_id).values_list(*fields).first()
+    if row is None:
+        return []
+    return _index_rows(bank, [row])
+
+
+@contextmanager
+def indexed_by_caller():
+    """
+    Saves inside the block are not indexed by the post_save hooks: the caller
+    indexes them itself, e.g. to return the flags in its response.
+    """
+    token = _caller_indexes.set(True)
+    try:
+        yield
+    finally:
+        _caller_indexes.reset(token)
+
+
+def hooks_enabled():
+    return not _caller_indexes.get()
+
+
+def index_many(bank, question_ids, chunk_size=200):
+    """
+    Index the questions of `bank` with `question_ids`, e.g. after a bulk
+    insert. Returns the number of near-duplicates flagged.
+    """
+    model, _, _ = SOURCES[bank]
+    return _index_queryset(bank, model.objects.filter(pk__in=question_ids), chunk_size)
+
+
+def index_missing(bank, chunk_size=200):
+    """
+    Index every question of `bank` without a signature. Returns the number of
+    near-duplicates flagged.
+    """
+    model, _, _ = SOURCES[bank]
+    queryset = model.objects.exclude(pk__in=QuestionSignature.objects.filter(bank=bank).values('question_id'))
+    return _index_queryset(bank, queryset, chunk_size)
+
+
+def _index_queryset(bank, queryset, chunk_size):
+    _, fields, _ = SOURCES[bank]
+    rows = queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+    flagged = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        flagged += len(_index_rows(bank, chunk))
+    return flagged
+
+
+def reindex(bank, chunk_size=200):
+    """
+    Drop a bank's signatures and buckets and index it again, e.g. after
+    changing the hasher. Dismissed flags are kept.
+    """
+    QuestionSignature.objects.filter(bank=bank).delete()
+    LSHBucket.objects.filter(bank=bank).delete()
+    NearDuplicate.objects.filter(bank=bank, dismissed=False).delete()
+    return index_missing(bank, chunk_size)
+
+
+def forget(bank, question_id):
+    """
+    Remove a deleted question from the index and from any flag.
+    """
+    QuestionSignature.objects.filter(bank=bank, question_id=question_id).delete()
+    LSHBucket.objects.filter(bank=bank, question_id=question_id).delete()
+    NearDuplicate.objects.filter(Q(question_id=question_id) | Q(duplicate_of_id=question_id), bank=bank).delete()
+
+
+def report(bank, threshold=None, max_bucket=1000):
+    """
+    Clusters of near-duplicate questions in `bank` from the stored signatures
+    (run index_missing() first), largest first: a list of
+    {"question_ids": [...], "pairs": [(a, b, similarity), ...]}. Buckets with
+    more than `max_bucket` members are skipped as too generic to be useful.
+    """
+    threshold = settings.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    signatures = {}
+    members = defaultdict(list)
+    rows = QuestionSignature.objects.filter(bank=bank).values_list('question_id', 'signature').iterator(chunk_size=2000)
+    for q_id, data in rows:
+        signature = signatures[q_id] = hasher.unpack(data)
+        for key in hasher.buckets(signature):
+            members[key].append(q_id)
+
+    parent = {}
+
+    def find(q_id):
+        while parent.get(q_id, q_id) != q_id:
+            parent[q_id] = parent.get(parent[q_id], parent[q_id])
+            q_id = parent[q_id]
+        return q_id
+
+    pairs = {}
+    for bucket in members.values():
+        if len(bucket) < 2 or len(bucket) > max_bucket:
+            continue
+        for i, a in enumerate(bucket):
+            for b in bucket[i + 1:]:
+                pair = (min(a, b), max(a, b))
+                if pair in pairs:
+                    continue
+                score = similarity(signatures[a], signatures[b])
+                pairs[pair] = score
+                if score >= threshold:
+                    parent[find(pair[1])] = find(pair[0])
+
+    clusters = defaultdict(lambda: {"question_ids": set(), "pairs": []})
+    for (a, b), score in pairs.items():
+        if score >= threshold:
+            cluster = clusters[find(a)]
+            cluster["question_ids"].update((a, b))
+            cluster["pairs"].append((a, b, score))
+    result = [
+        {"question_ids": sorted(cluster["question_ids"]), "pairs": sorted(cluster["pairs"], key=lambda p: -p[2])}
+        for cluster in clusters.values()
+    ]
+    result.sort(key=lambda cluster: (-len(cluster["question_ids"]), cluster["question_ids"][0]))
+    return result
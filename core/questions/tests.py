@@ -1,3 +1,295 @@
+import io
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from results.models import BANK_QUESTIONS
+from . import importer, similarity
+from .cache import bank, get_answer_key, get_report_map
+from .importer import import_questions
+from .models import NearDuplicate, Question, QuestionSignature
+
+User = get_user_model()
+
+# The 'exam-submit' URL name is shared with quiz.urls, so use the path directly
+SUBMIT_URL = '/api/questions/exam/submit/'
+
+
+class SubmitExamAPIViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [
+            Question.objects.create(
+                text=f"Question {i}",
+                options=["A", "B", "C", "D"],
+                correct_answer_index=i % 4,
+            )
+            for i in range(20)
+        ]
+        # Warm the answer key so every submission below reads it from the cache
+        get_answer_key()
+        get_report_map()
+
+    def submit(self, answers, email="examinee@diu.edu.bd"):
+        user = User.objects.create_user(
+            email=email, password="s3cret-pass", full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(SUBMIT_URL, {"answers": answers}, format="json")
+        return response, len(ctx.captured_queries), user
+
+    def test_query_count_does_not_depend_on_answer_count(self):
+        one = [{"question_id": self.questions[0].id, "selected_option_index": 0}]
+        many = [{"question_id": q.id, "selected_option_index": 0} for q in self.questions]
+
+        response_one, queries_one, _ = self.submit(one, email="one@diu.edu.bd")
+        response_many, queries_many, _ = self.submit(many, email="many@diu.edu.bd")
+
+        self.assertEqual(response_one.status_code, 200)
+        self.assertEqual(response_many.status_code, 200)
+        self.assertEqual(queries_one, queries_many)
+
+    def test_grades_against_answer_key(self):
+        answers = [{"question_id": q.id, "selected_option_index": 1} for q in self.questions]
+        answers.append({"question_id": 999999, "selected_option_index": 0})
+
+        response, _, user = self.submit(answers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["score"], 5)
+        self.assertEqual(response.data["totalQuestions"], 20)
+        self.assertEqual(len(response.data["answeredQuestions"]), 20)
+        self.assertEqual(response.data["answeredQuestions"][1]["question"]["correctAnswer"], 1)
+        user.refresh_from_db()
+        self.assertTrue(user.exam_attempted)
+        self.assertEqual(user.exam_marks, 5)
+
+    def test_duplicate_question_ids_are_rejected(self):
+        question = self.questions[1]
+        answers = [{"question_id": question.id, "selected_option_index": 0},
+                   {"question_id": str(question.id), "selected_option_index": 1}]
+
+        response, _, user = self.submit(answers)
+
+        self.assertEqual(response.status_code, 400)
+        user.refresh_from_db()
+        self.assertFalse(user.exam_attempted)
+
+    def test_second_submission_is_rejected(self):
+        answers = [{"question_id": self.questions[0].id, "selected_option_index": 0}]
+        _, _, user = self.submit(answers)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post(SUBMIT_URL, {"answers": answers}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class QuestionImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Question.objects.create(text="Already  in the bank", options=["a", "b"], correct_answer_index=0)
+
+    def test_csv_import_reports_rows_and_skips_duplicates(self):
+        rows = [
+            "text,option_a,option_b,option_c,correct_answer_index",
+            "What is 2 + 2?,3,4,5,1",
+            "Already in the bank,a,b,,0",
+            "What is 2 + 2?,3,4,5,1",
+            ",a,b,c,0",
+            "Out of range,a,b,,5",
+        ] + [f"Question {n},a,b,c,{n % 3}" for n in range(10)]
+        version = bank.version()
+
+        report = import_questions(io.StringIO("\n".join(rows)), "csv", chunk_size=4)
+
+        self.assertEqual(report.rows, 15)
+        self.assertEqual(report.created, 11)
+        self.assertEqual(report.duplicates, 2)
+        self.assertEqual([error["row"] for error in report.errors], [4, 5])
+        self.assertEqual(Question.objects.get(text="What is 2 + 2?").options, ["3", "4", "5"])
+        self.assertNotEqual(bank.version(), version)
+
+    def test_json_array_is_decoded_incrementally(self):
+        records = [{"text": f"Question {n} " + "x" * 500, "options": ["a", "b"], "correct_answer_index": 1}
+                   for n in range(300)]
+        records.insert(5, {"text": "Bad", "options": "a,b", "correct_answer_index": 0})
+
+        report = import_questions(io.StringIO(json.dumps(records, indent=2)), "json")
+
+        self.assertEqual(report.created, 300)
+        self.assertEqual(report.errors, [{"row": 6, "errors": {"options": "Must be a list of strings."}}])
+
+    @mock.patch.object(importer, "_READ_SIZE", 16)
+    def test_json_array_resyncs_after_a_malformed_element(self):
+        def record(text):
+            return json.dumps({"text": text, "options": ["a", "b"], "correct_answer_index": 0})
+
+        body = "[" + ", ".join([
+            record("One"),
+            '{"text": "Bad" "options": ["a", "b"]}',
+            record('Two, with "quotes", [brackets] and {braces}'),
+            "",
+            record("Three"),
+        ]) + "]"
+
+        report = import_questions(io.StringIO(body), "json")
+
+        self.assertEqual(report.rows, 5)
+        self.assertEqual(report.created, 3)
+        self.assertEqual([error["row"] for error in report.errors], [2, 4])
+
+    @mock.patch.object(importer, "_MAX_RECORD_SIZE", 100)
+    def test_json_array_stops_at_an_element_that_never_closes(self):
+        body = '[{"text": "One", "options": ["a", "b"], "correct_answer_index": 0}, {"text": [' + "1, " * 100
+
+        report = import_questions(io.StringIO(body), "json")
+
+        self.assertEqual(report.created, 1)
+        self.assertEqual([error["row"] for error in report.errors], [2])
+
+    def test_bank_is_bumped_when_a_later_chunk_fails(self):
+        def lines():
+            yield json.dumps({"text": "Committed", "options": ["a", "b"], "correct_answer_index": 0})
+            raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+        version = bank.version()
+        with self.assertRaises(UnicodeDecodeError):
+            import_questions(lines(), "jsonl", chunk_size=1)
+
+        self.assertTrue(Question.objects.filter(text="Committed").exists())
+        self.assertNotEqual(bank.version(), version)
+
+    def test_upload_endpoint(self):
+        admin = User.objects.create_superuser(email="admin@diu.edu.bd", password="s3cret-pass")
+        client = APIClient()
+        client.force_authenticate(admin)
+        upload = SimpleUploadedFile("questions.jsonl", b"\n".join([
+            json.dumps({"text": "One", "options": ["a", "b"], "correct_answer_index": 0}).encode(),
+            b"{not json",
+            json.dumps({"text": "Two", "options": ["a", "b"], "correct_answer_index": 1}).encode(),
+        ]))
+
+        response = client.post('/api/questions/admin/questions/import/', {"file": upload}, format="multipart")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["invalid"], 1)
+
+    def test_serializer_rejects_duplicate_text(self):
+        admin = User.objects.create_superuser(email="admin@diu.edu.bd", password="s3cret-pass")
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.post('/api/questions/admin/questions/', {
+            "text": " Already in the bank ", "options": '["a", "b"]', "correct_answer_index": 0,
+        }, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("text", response.data)
+
+
+class NearDuplicateTests(TestCase):
+    ORIGINAL = "Which data structure gives constant time lookup of a value by its key on average?"
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser(email="admin@diu.edu.bd", password="s3cret-pass")
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.options = '["Hash table", "Linked list", "Binary heap", "Stack"]'
+        self.original = self.create(self.ORIGINAL).data["id"]
+
+    def create(self, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/questions/admin/questions/', {
+                "text": text, "options": self.options, "correct_answer_index": 0,
+            }, format="json")
+
+    def test_reworded_question_is_flagged_on_create(self):
+        response = self.create(
+            "Which data structure gives constant time lookup of a value by its key on average, usually?"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([flag["question_id"] for flag in response.data["near_duplicates"]], [self.original])
+        self.assertTrue(NearDuplicate.objects.filter(question_id=response.data["id"],
+                                                     duplicate_of_id=self.original).exists())
+
+    def test_unrelated_question_is_not_flagged(self):
+        self.options = '["Dijkstra", "Kruskal", "Prim", "Floyd"]'
+        response = self.create("Which algorithm finds shortest paths from one source in a weighted graph?")
+
+        self.assertEqual(response.data["near_duplicates"], [])
+
+    def test_created_question_is_indexed_once(self):
+        with mock.patch.object(similarity, '_index_rows', wraps=similarity._index_rows) as index_rows:
+            self.create("Which algorithm finds shortest paths from one source in a weighted graph?")
+
+        self.assertEqual(index_rows.call_count, 1)
+
+    def test_import_indexes_only_the_questions_it_created(self):
+        # Inserted without signals, so left unindexed
+        [unindexed] = Question.objects.bulk_create([Question(
+            text=self.ORIGINAL.replace("Which", "Tell me which"), options=["Hash table", "Stack"],
+            correct_answer_index=0,
+        )])
+        records = [{"text": self.ORIGINAL + " Usually?", "options": ["Hash table", "Stack"],
+                    "correct_answer_index": 0}]
+
+        report = import_questions(io.StringIO(json.dumps(records)), "json")
+
+        self.assertEqual(report.near_duplicates, 1)
+        imported = Question.objects.get(text=self.ORIGINAL + " Usually?").pk
+        self.assertEqual(list(NearDuplicate.objects.values_list('question_id', 'duplicate_of_id')),
+                         [(imported, self.original)])
+        self.assertFalse(QuestionSignature.objects.filter(bank=BANK_QUESTIONS, question_id=unindexed.pk).exists())
+
+    def test_report_clusters_the_bank(self):
+        ids = [
+            Question.objects.create(text=self.ORIGINAL.replace("Which", prefix), options=["Hash table", "Stack"],
+                                    correct_answer_index=0).pk
+            for prefix in ("Tell me which", "Name which")
+        ]
+        Question.objects.create(text="What is the capital of Bangladesh?", options=["Dhaka", "Khulna"],
+                                correct_answer_index=0)
+
+        similarity.index_missing(BANK_QUESTIONS)
+        clusters = similarity.report(BANK_QUESTIONS, threshold=0.6)
+
+        self.assertEqual([cluster["question_ids"] for cluster in clusters], [sorted([self.original, *ids])])
+
+
+class AsyncExamineeQuestionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for n in range(5):
+            Question.objects.create(text=f"Question {n}", options=["a", "b"], correct_answer_index=0)
+        user = User.objects.create_user(
+            email="examinee@diu.edu.bd", password=None, full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        self.auth = {"authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def test_async_view_serves_the_sync_order(self):
+        async_response = await self.async_client.get('/api/questions/exam/async/questions/', headers=self.auth)
+        sync_response = await sync_to_async(self.client.get)('/api/questions/exam/questions/', headers=self.auth)
+        anonymous = await self.async_client.get('/api/questions/exam/async/questions/')
+
+        self.assertEqual((async_response["ETag"], async_response.content),
+                         (sync_response["ETag"], sync_response.content))
+        self.assertEqual(len(json.loads(anonymous.content)), 5)
 
-# Create your tests here.
@@ -1,7 +1,9 @@
 from django.urls import path
+from . import async_views
 from .views import (
     QuestionListCreateAPIView,
     QuestionRetrieveUpdateDestroyAPIView,
+    QuestionImportAPIView,
     ExamineeQuestionListAPIView,
     SubmitExamAPIView,
     SubmitExamResultAPIView,
@@ -11,9 +13,14 @@ urlpatterns = [
     # Admin URLs for managing questions
     path('admin/questions/', QuestionListCreateAPIView.as_view(), name='admin-question-list-create'),
     path('admin/questions/<int:pk>/', QuestionRetrieveUpdateDestroyAPIView.as_view(), name='admin-question-detail'),
+    path('admin/questions/import/', QuestionImportAPIView.as_view(), name='admin-question-import'),
 
     # Examinee URLs for taking the exam
     path('exam/questions/', ExamineeQuestionListAPIView.as_view(), name='examinee-question-list'),
     path('exam/submit/', SubmitExamAPIView.as_view(), name='exam-submit'),
     path('v2/exam/submit/', SubmitExamResultAPIView.as_view(), name='exam-result'),
+
+    # Native async variants for ASGI deployments
+    path('exam/async/questions/', async_views.exam_questions, name='examinee-question-list-async'),
+    path('exam/async/submit/', async_views.submit_exam, name='examinee-exam-submit-async'),
 ]
@@ -1,35 +1,121 @@
+import io
+
+from django.db import transaction
+from django.http import HttpResponse
 from rest_framework import generics, status
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from .models import Question
-from .serializers import QuestionSerializer, ExamineeQuestionSerializer, ReportQuestionSerializer
-from django.db import transaction
+from . import similarity
+from .serializers import QuestionSerializer, ExamineeQuestionSerializer
+from .importer import FORMATS, detect_format, import_questions
+from .cache import bank, get_examinee_items, render_shuffled, shuffle_seed
+from core.conditional import not_modified, payload_response
+from .grading import submit_answers
+from users.models import User
+from users.ranking import record_score
+from results.models import BANK_QUESTIONS
 import json
 
 class QuestionListCreateAPIView(generics.ListCreateAPIView):
+    """
+    Creating a question also reports the existing questions it nearly
+    duplicates (questions.similarity) as `near_duplicates`; it is still saved.
+    """
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAdminUser] # Only admins can list/create questions
 
+    def create(self, request, *args, **kwargs):
+        # Indexed here rather than by the post_save hook, whose on_commit may
+        # run after the response is built
+        with similarity.indexed_by_caller():
+            response = super().create(request, *args, **kwargs)
+        flags = similarity.index(BANK_QUESTIONS, response.data['id'])
+        response.data['near_duplicates'] = [
+            {"question_id": flag.duplicate_of_id, "similarity": round(flag.similarity, 3)}
+            for flag in sorted(flags, key=lambda flag: -flag.similarity)
+        ]
+        return response
+
 class QuestionRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAdminUser] # Only admins can retrieve/update/delete questions
 
+class QuestionImportAPIView(APIView):
+    """
+    POST a CSV, JSON or JSON Lines file as `file` (multipart) to add many
+    questions at once (questions.importer). Optional fields: `format` when the
+    file name doesn't tell, `dry_run` to only validate.
+    Duplicates are skipped and invalid rows are reported per row; the rest
+    of the file is still imported.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "Upload the questions as `file`."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('format') or detect_format(upload.name)
+        if file_format not in FORMATS:
+            return Response({"detail": f"Unknown format; use one of {', '.join(FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        # Large uploads are spooled to disk by Django, so this still streams
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = import_questions(stream, file_format, dry_run=dry_run)
+        except UnicodeDecodeError:
+            return Response({"detail": "The file must be UTF-8."}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            stream.detach()
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+def examinee_etag(version, seed):
+    return f"questions-bank-{version}-{seed:x}"
+
+
+def examinee_questions_response(request, user):
+    """
+    The shuffled question list for `user`; questions.async_views repeats it on
+    the async ORM.
+    """
+    if not user.is_authenticated:
+        # Anonymous callers have no stable identity, so they get a fresh order each time
+        return HttpResponse(render_shuffled(get_examinee_items()), content_type="application/json")
+
+    seed = shuffle_seed(user.pk)
+    version = bank.version()
+    etag = examinee_etag(version, seed)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return payload_response(request, etag, lambda: render_shuffled(get_examinee_items(version), seed))
+
 class ExamineeQuestionListAPIView(generics.ListAPIView):
-    queryset = Question.objects.all().order_by('?') # Order randomly for each examinee
+    """
+    Questions in a random order that is stable per examinee and exam.
+    The shuffle runs over the cached bank instead of ORDER BY RANDOM().
+    Examinees get an ETag per bank version (If-None-Match -> 304) and a
+    compressed body when they accept one.
+    """
+    queryset = Question.objects.all()
     serializer_class = ExamineeQuestionSerializer
     permission_classes = [AllowAny] # Only authenticated users can get questions
 
     def list(self, request, *args, **kwargs):
-
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        print("DEBUG: ExamineeQuestionListAPIView serializer.data:", serializer.data) # Debug print
-        return Response(serializer.data)
+        return examinee_questions_response(request, request.user)
 
 class SubmitExamAPIView(APIView):
+    """
+    Grades the submitted answers against the cached answer key, so the cost
+    does not depend on how many answers are submitted.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -42,52 +128,16 @@ class SubmitExamAPIView(APIView):
         if not answers_data:
             return Response({"detail": "No answers submitted."}, status=status.HTTP_400_BAD_REQUEST)
 
-        total_questions = Question.objects.count()
-        correct_answers_count = 0
-        processed_answers = [] # To store answers for the user's exam_answers field
-
-        with transaction.atomic():
-            for answer_entry in answers_data:
-                question_id = answer_entry.get('question_id')
-                selected_option_index = answer_entry.get('selected_option_index')
-
-                try:
-                    question = Question.objects.get(id=question_id)
-                except Question.DoesNotExist:
-                    # We can't create a report for a question that doesn't exist, so we skip it.
-                    # The frontend should ideally not send invalid question_ids.
-                    continue
-
-                # options is a JSONField, so it's already a Python list, not a JSON string
-                options_list = question.options if isinstance(question.options, list) else json.loads(question.options)
-                question_data = ReportQuestionSerializer(question).data
-                is_correct = False
-                
-                if selected_option_index is not None:
-                    if 0 <= selected_option_index < len(options_list):
-                        if selected_option_index == question.correct_answer_index:
-                            is_correct = True
-                            correct_answers_count += 1
-                
-                processed_answers.append({
-                    'question': question_data,
-                    'selectedAnswer': selected_option_index,
-                    'isCorrect': is_correct
-                })
-            
-            user.exam_attempted = True
-            user.exam_marks = correct_answers_count
-            user.exam_answers = json.dumps(processed_answers) # Store as JSON string
-            user.save()
-
-        return Response({
-            "score": correct_answers_count,
-            "totalQuestions": total_questions,
-            "answeredQuestions": processed_answers
-        }, status=status.HTTP_200_OK)
+        status_code, payload = submit_answers(user.pk, answers_data)
+        return Response(payload, status=status_code)
 
 
 class SubmitExamResultAPIView(APIView):
+    """
+    POST: store marks graded by the client. request.user is the cached
+    snapshot (users.authentication), which another worker may not have
+    invalidated yet, so the user row is locked and re-checked before saving.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
@@ -109,17 +159,24 @@ class SubmitExamResultAPIView(APIView):
         except (ValueError, TypeError):
             return Response({"detail": "exam_mark must be a valid integer."}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update user fields
-        user.exam_marks = exam_mark
-        user.exam_attempted = True
-        
         # Try to serialize exam_answers, but ignore if there's a JSON error
         try:
-            user.exam_answers = json.dumps(exam_answers) if exam_answers else json.dumps([])
+            exam_answers = json.dumps(exam_answers) if exam_answers else json.dumps([])
         except (TypeError, ValueError) as e:
             # If JSON serialization fails, just save empty list and continue
-            user.exam_answers = json.dumps([])
-        
-        user.save()
+            exam_answers = json.dumps([])
+
+        with transaction.atomic():
+            # The real row, not the snapshot: a second submit waits here and then sees exam_attempted
+            locked_user = User.objects.select_for_update().get(pk=user.pk)
+            if locked_user.exam_attempted:
+                return Response({"detail": "You have already attempted the exam."}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Update user fields
+            locked_user.exam_marks = exam_mark
+            locked_user.exam_attempted = True
+            locked_user.exam_answers = exam_answers
+            locked_user.save(update_fields=['exam_marks', 'exam_attempted', 'exam_answers'])
+            transaction.on_commit(lambda: record_score(exam_mark))
         
         return Response({"detail": "Exam result submitted successfully."}, status=status.HTTP_200_OK)
\ No newline at end of file
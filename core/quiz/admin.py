@@ -4,7 +4,8 @@ from .models import QuizQuestion
 
 @admin.register(QuizQuestion)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ('id', 'text_short', 'created_at')
+    list_display = ('id', 'text_short', 'section', 'created_at')
+    list_filter = ('section',)
     readonly_fields = ('created_at',)
     search_fields = ('text',)
     list_per_page = 50
@@ -0,0 +1,71 @@
+# quiz/async_views.py
+"""
+Native async versions of the exam endpoints for ASGI deployments (core/asgi.py).
+
+The user, the bank and session versions, and the session itself are read
+with the async ORM and cache API. Only the locked submit transaction runs in a
+sync_to_async hop, since Django's async ORM has no transactions and
+select_for_update() needs one; so do cache entries rebuilt on a miss, once per
+bank version. DRF's throttles are applied by core.throttling.throttled.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from core.conditional import not_modified, payload_response
+from core.throttling import throttled
+from results import sessions
+from results.models import BANK_QUIZ
+from users.authentication import jwt_required
+from .cache import aget_pool, arender_assigned, bank
+from .grading import submit_answers
+from .serializers import SubmitAnswersSerializer
+from .views import questions_etag
+
+
+@csrf_exempt
+@require_GET
+@jwt_required
+@throttled
+async def exam_questions(request):
+    """
+    Async ExamQuestionsView.
+    """
+    if request.user.exam_attempted:
+        return JsonResponse({"detail": "You already attempted the exam."}, status=403)
+
+    # Same steps as quiz.views.exam_questions_response
+    session = await sessions.aget_or_start(request.user.pk, BANK_QUIZ, aget_pool)
+    if not sessions.is_open(session):
+        return JsonResponse({"detail": "Exam time is over."}, status=403)
+
+    version = await bank.aversion()
+    etag = questions_etag(session, version)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return payload_response(request, etag, await arender_assigned(session, version))
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+@throttled
+async def submit_exam(request):
+    """
+    Async SubmitExamView.
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "JSON parse error."}, status=400)
+
+    serializer = SubmitAnswersSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    status_code, payload = await sync_to_async(submit_answers)(request.user.pk, serializer.validated_data['answers'])
+    return JsonResponse(payload, status=status_code)
@@ -0,0 +1,86 @@
+# quiz/cache.py
+from rest_framework.renderers import JSONRenderer
+
+from core.answer_key import AnswerKey
+from core.versioned_cache import VersionedCache
+from results import sessions
+from results.models import BANK_QUIZ
+from .models import QuizQuestion
+from .serializers import QuestionSerializer
+
+# Bumped by quiz.signals whenever a QuizQuestion is saved or deleted.
+bank = VersionedCache("quiz:bank")
+
+CHOICE_LETTERS = 'ABCD'
+
+
+def choice_index(letter):
+    """
+    'A'..'D' -> 0..3, anything else -> None.
+    """
+    letter = str(letter).strip().upper() if letter is not None else ''
+    if len(letter) != 1 or letter not in CHOICE_LETTERS:
+        return None
+    return CHOICE_LETTERS.index(letter)
+
+
+def _render_question_items():
+    qs = QuizQuestion.objects.order_by('id')
+    renderer = JSONRenderer()
+    return {item['id']: renderer.render(item) for item in QuestionSerializer(qs, many=True).data}
+
+
+def get_question_items(version=None):
+    """
+    Rendered JSON fragment of every question (without the correct answer), by id.
+    """
+    return bank.get_or_build("question-items", _render_question_items, version)
+
+
+async def aget_question_items(version=None):
+    return await bank.aget_or_build("question-items", _render_question_items, version)
+
+
+def _build_pool():
+    return sessions.build_pool(BANK_QUIZ, QuizQuestion.objects.values_list('id', 'section'))
+
+
+def get_pool(version=None):
+    """
+    results.models.QuestionPool of the current bank under the exam plan.
+    """
+    return bank.get_or_build("pool", _build_pool, version)
+
+
+async def aget_pool(version=None):
+    return await bank.aget_or_build("pool", _build_pool, version)
+
+
+def render_assigned(session, version=None):
+    """
+    JSON bytes of the questions drawn for a results.models.ExamSession, in
+    the order drawn, and the session's start and deadline.
+    """
+    return _assemble(session, get_question_items(version), sessions.assigned_ids(session))
+
+
+async def arender_assigned(session, version=None):
+    return _assemble(session, await aget_question_items(version), await sessions.aassigned_ids(session))
+
+
+def _assemble(session, items, assigned):
+    questions = b",".join(items[q_id] for q_id in assigned if q_id in items)
+    meta = JSONRenderer().render({"started_at": session.started_at, "deadline": session.deadline})
+    return b'{"questions":[' + questions + b'],"session":' + meta + b'}'
+
+
+def _build_answer_key():
+    rows = QuizQuestion.objects.order_by('id').values_list('id', 'correct')
+    return AnswerKey((q_id, choice_index(correct)) for q_id, correct in rows)
+
+
+def get_answer_key(version=None):
+    """
+    core.answer_key.AnswerKey of the current (or given) bank version.
+    """
+    return bank.get_or_build("answer-key", _build_answer_key, version)
@@ -0,0 +1,132 @@
+# quiz/grading.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import status
+
+from core.answer_key import CORRECT, NO_CORRECT_ANSWER, QUESTION_NOT_FOUND
+from results import drafts, sessions
+from results.answers import record_attempt
+from results.models import BANK_QUIZ
+from users.ranking import record_score
+from .cache import choice_index, get_answer_key
+
+User = get_user_model()
+
+
+def grade_answers(answer_key, answers):
+    """
+    Grade [{"q_id": 1, "ans": "A"}, ...] against an AnswerKey.
+
+    Returns (processed, invalid_q_ids, sheet): the per-question entries stored in
+    User.exam_answers, the ids that could not be graded, and the encoded sheet
+    to pass to answer_key.score() / score_many().
+    """
+    processed = []
+    invalid_q_ids = []
+    graded = []
+
+    for item in answers:
+        q_id = item['q_id']
+        # Safety check: ensure ans is a string before calling upper()
+        # Serializer validates this, but defensive check prevents AttributeError
+        ans_value = item.get('ans')
+        if ans_value is None:
+            ans = None
+        else:
+            ans = str(ans_value).upper()
+
+        # Skip if answer is None or invalid
+        if ans is None:
+            invalid_q_ids.append(q_id)
+            processed.append({"q_id": q_id, "ans": None, "valid": False, "reason": "answer_is_null"})
+            continue
+
+        outcome = answer_key.outcome(q_id, choice_index(ans))
+        if outcome == QUESTION_NOT_FOUND:
+            invalid_q_ids.append(q_id)
+            # Still record provided answer for audit/debug
+            processed.append({"q_id": q_id, "ans": ans, "valid": False, "reason": QUESTION_NOT_FOUND})
+            continue
+
+        # Validate that question has a correct answer before comparing
+        if outcome == NO_CORRECT_ANSWER:
+            processed.append({"q_id": q_id, "ans": ans, "valid": False, "reason": NO_CORRECT_ANSWER})
+            continue
+
+        graded.append((q_id, choice_index(ans)))
+        processed.append({
+            "q_id": q_id,
+            "ans": ans,
+            "valid": True,
+            "is_correct": outcome == CORRECT
+        })
+
+    return processed, invalid_q_ids, answer_key.encode(graded)
+
+
+
+@transaction.atomic
+def submit_answers(user_pk, answers):
+    """
+    Grade and save one submission of validated answers, plus any autosaved
+    draft (results.drafts), under a row lock on the user. Only the questions
+    drawn for the user's session (results.sessions) are scored, and after its
+    deadline only the draft counts.
+    Returns (status_code, payload); shared by the sync and async submit views.
+    """
+    if not answers and not settings.CACHE_SHARED:
+        # Without a shared cache there is no autosaved draft to seal
+        return status.HTTP_400_BAD_REQUEST, {"detail": "No answers submitted."}
+
+    # Lock the user row to prevent race conditions (user can't submit twice concurrently)
+    try:
+        locked_user = User.objects.select_for_update().get(pk=user_pk)
+    except User.DoesNotExist:
+        return status.HTTP_404_NOT_FOUND, {"detail": "User not found."}
+
+    if getattr(locked_user, "exam_attempted", False):
+        return status.HTTP_403_FORBIDDEN, {"detail": "Exam already submitted."}
+
+    session = sessions.get_session(user_pk, BANK_QUIZ)
+    if session is None:
+        return status.HTTP_403_FORBIDDEN, {"detail": "Exam not started."}
+    late = not sessions.is_open(session)
+    if late:
+        # Answers autosaved before the deadline still count, the payload doesn't
+        answers = []
+
+    # Answers autosaved earlier, overridden by the ones submitted now
+    draft = drafts.get_draft(BANK_QUIZ, user_pk)
+    if draft:
+        submitted = {item['q_id'] for item in answers}
+        answers = [
+            {"q_id": q_id, "ans": ans} for q_id, ans in sorted(draft.items())
+            if ans is not None and q_id not in submitted
+        ] + list(answers)
+
+    # Answers to questions not drawn for this session grade as not found
+    answer_key = get_answer_key().subset(sessions.assigned_ids(session))
+    processed, invalid_q_ids, sheet = grade_answers(answer_key, answers)
+    total_marks = answer_key.score(sheet)
+
+    # Save result: marks on the user row, answers as results.ExamAnswer rows
+    try:
+        locked_user.exam_attempted = True
+        locked_user.exam_marks = total_marks
+        locked_user.save(update_fields=['exam_attempted', 'exam_marks'])
+        record_attempt(locked_user, BANK_QUIZ, total_marks, processed)
+        drafts.discard(BANK_QUIZ, locked_user.pk)
+        transaction.on_commit(lambda: record_score(total_marks))
+    except Exception as e:
+        transaction.set_rollback(True)
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, {"detail": "Failed to save results.", "error": str(e)}
+
+    return status.HTTP_200_OK, {
+        "message": "Exam submitted successfully.",
+        "marks": total_marks,
+        "total_questions_submitted": len(answers),
+        "late": late,
+        "invalid_question_ids": invalid_q_ids,
+        "per_question": processed
+    }
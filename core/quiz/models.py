@@ -15,6 +15,8 @@ class QuizQuestion(models.Model):
         ('D', 'Option D'),
     )
     correct = models.CharField(max_length=1, choices=CORRECT_CHOICES, blank=True, null=True)
+    # Stratum for EXAM_SECTIONS (results.sessions); unused otherwise
+    section = models.CharField(max_length=50, blank=True, default='', db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -22,8 +22,9 @@ class AnswerItemSerializer(serializers.Serializer):
         return val
 
 class SubmitAnswersSerializer(serializers.Serializer):
+    # Optional: answers autosaved earlier are submitted along with these
     answers = serializers.ListSerializer(
-        child=AnswerItemSerializer()
+        child=AnswerItemSerializer(), required=False, default=list
     )
 
     def validate_answers(self, value):
@@ -32,3 +33,21 @@ class SubmitAnswersSerializer(serializers.Serializer):
         if len(q_ids) != len(set(q_ids)):
             raise serializers.ValidationError("Duplicate question ids in payload.")
         return value
+
+
+class DraftAnswerItemSerializer(AnswerItemSerializer):
+    # null clears a previously saved answer
+    ans = serializers.CharField(max_length=1, allow_null=True)
+
+    def validate_ans(self, value):
+        return None if value is None else super().validate_ans(value)
+
+
+class AutosaveSerializer(SubmitAnswersSerializer):
+    """
+    {"answers": [{"q_id": 1, "ans": "A"}, {"q_id": 2, "ans": null}, ...]}:
+    only the answers changed since the last autosave.
+    """
+    answers = serializers.ListSerializer(
+        child=DraftAnswerItemSerializer(), allow_empty=False, max_length=500
+    )
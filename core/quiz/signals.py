@@ -0,0 +1,34 @@
+# quiz/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from questions import similarity
+from results.models import BANK_QUIZ
+from .cache import bank
+from .models import QuizQuestion
+
+# Fields that make up a question's signature (questions.similarity)
+INDEXED_FIELDS = {'text', 'option_a', 'option_b', 'option_c', 'option_d'}
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def bump_bank_version(sender, **kwargs):
+    # Bump after commit so a rebuild never caches rows that may still roll back.
+    transaction.on_commit(bank.bump)
+
+
+@receiver(post_save, sender=QuizQuestion)
+def index_near_duplicates(sender, instance, update_fields=None, **kwargs):
+    if not similarity.hooks_enabled():
+        return
+    if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+        return
+    # robust: a failed index must not fail the save that has already committed
+    transaction.on_commit(lambda: similarity.index(BANK_QUIZ, instance.pk), robust=True)
+
+
+@receiver(post_delete, sender=QuizQuestion)
+def forget_near_duplicates(sender, instance, **kwargs):
+    similarity.forget(BANK_QUIZ, instance.pk)
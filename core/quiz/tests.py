@@ -1,3 +1,333 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.answer_key import CORRECT, WRONG
+from core.throttling import UserSlidingThrottle
+from results import drafts, sessions
+from results.models import ExamAttempt, ExamDraft, ExamSession
+from .cache import get_answer_key, get_question_items
+from .models import QuizQuestion
+
+User = get_user_model()
+
+QUESTIONS_URL = '/api/quiz/questions/'
+AUTOSAVE_URL = '/api/quiz/autosave/'
+SUBMIT_URL = '/api/quiz/submit/'
+ASYNC_QUESTIONS_URL = '/api/quiz/async/questions/'
+ASYNC_SUBMIT_URL = '/api/quiz/async/submit/'
+
+
+def worker_cache(name):
+    """
+    CACHES for one simulated worker process: its own local-memory cache.
+    """
+    return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': name}}
+
+
+class BankCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = QuizQuestion.objects.create(text="Old text", option_a="a", option_b="b",
+                                                    option_c="c", option_d="d", correct="A")
+
+    def edit(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(self.question, name, value)
+            self.question.save()
+
+    def test_edit_invalidates_payload_and_answer_key(self):
+        self.assertIn(b"Old text", get_question_items()[self.question.id])
+        self.assertEqual(get_answer_key().outcome(self.question.id, 0), CORRECT)
+
+        self.edit(text="New text", correct="B")
+
+        self.assertIn(b"New text", get_question_items()[self.question.id])
+        self.assertEqual(get_answer_key().outcome(self.question.id, 0), WRONG)
+        self.assertEqual(get_answer_key().outcome(self.question.id, 1), CORRECT)
+
+    def test_edit_reaches_other_workers(self):
+        with self.settings(CACHES=worker_cache("worker-a")):
+            self.assertEqual(get_answer_key().outcome(self.question.id, 0), CORRECT)
+        with self.settings(CACHES=worker_cache("worker-b")):
+            self.edit(correct="C")
+
+        # Worker A still holds the old key in its own cache, under the old version
+        with self.settings(CACHES=worker_cache("worker-a")):
+            self.assertEqual(get_answer_key().outcome(self.question.id, 2), CORRECT)
+
+
+@override_settings(CACHE_SHARED=True)
+class AutosaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [
+            QuizQuestion.objects.create(text=f"Question {i}", option_a="a", option_b="b",
+                                        option_c="c", option_d="d", correct="A")
+            for i in range(4)
+        ]
+        self.user = User.objects.create_user(
+            email="examinee@diu.edu.bd", password="s3cret-pass", full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.get(QUESTIONS_URL)  # Starts the session
+
+    def autosave(self, answers):
+        return self.client.post(AUTOSAVE_URL, {"answers": answers}, format="json")
+
+    def flush(self):
+        call_command('flush_drafts', stdout=StringIO())
+
+    def test_autosave_buffers_deltas_without_queries(self):
+        first, second = self.questions[:2]
+        self.autosave([{"q_id": first.id, "ans": "a"}])
+
+        # Only the session version (results.sessions) is read from the database
+        with self.assertNumQueries(1):
+            response = self.autosave([{"q_id": second.id, "ans": "B"}, {"q_id": 999999, "ans": "C"}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["invalid_question_ids"], [999999])
+        self.assertFalse(ExamDraft.objects.exists())
+        self.assertEqual(
+            self.client.get(AUTOSAVE_URL).data["answers"],
+            [{"q_id": first.id, "ans": "A"}, {"q_id": second.id, "ans": "B"}],
+        )
+
+    def test_flushed_draft_survives_losing_the_cache(self):
+        first, second = self.questions[:2]
+        self.autosave([{"q_id": first.id, "ans": "A"}, {"q_id": second.id, "ans": "B"}])
+        self.flush()
+        cache.clear()
+        self.autosave([{"q_id": second.id, "ans": None}])
+        self.flush()
+
+        self.assertEqual(ExamDraft.objects.get(user=self.user).answers, {str(first.id): "A", str(second.id): None})
+        self.assertEqual(self.client.get(AUTOSAVE_URL).data["answers"], [{"q_id": first.id, "ans": "A"}])
+
+    def test_submit_seals_the_draft(self):
+        self.autosave([{"q_id": q.id, "ans": "A"} for q in self.questions[:3]])
+        self.flush()
+
+        # The payload overrides the draft; the rest comes from it
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(SUBMIT_URL, {"answers": [{"q_id": self.questions[0].id, "ans": "B"}]},
+                                        format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["marks"], 2)
+        self.assertEqual(response.data["total_questions_submitted"], 3)
+        self.assertFalse(ExamDraft.objects.exists())
+        self.assertEqual(self.client.get(AUTOSAVE_URL).data["answers"], [])
+
+    def test_redis_cache_uses_the_atomic_buffer(self):
+        redis_caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                    'LOCATION': 'redis://localhost:6379'}}
+
+        self.assertIsInstance(drafts._buffer(), drafts.LocalDraftBuffer)
+        with self.settings(CACHES=redis_caches):
+            self.assertIsInstance(drafts._buffer(), drafts.RedisDraftBuffer)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_drafts_need_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.autosave([{"q_id": self.questions[0].id, "ans": "A"}])
+        with self.assertRaises(ImproperlyConfigured):
+            self.flush()
+
+        # No draft to seal: an empty submit must not grade zero marks
+        response = self.client.post(SUBMIT_URL, {"answers": []}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ExamAttempt.objects.exists())
+
+
+@override_settings(CACHE_SHARED=True)
+class ExamSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [
+            QuizQuestion.objects.create(text=f"Question {i}", option_a="a", option_b="b", option_c="c",
+                                        option_d="d", correct="A", section="math" if i % 2 else "logic")
+            for i in range(20)
+        ]
+
+    def examinee(self, n=0):
+        user = User.objects.create_user(
+            email=f"examinee{n}@diu.edu.bd", password="s3cret-pass", full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        return user, client
+
+    @override_settings(EXAM_QUESTION_COUNT=5)
+    def test_questions_are_drawn_once_per_examinee(self):
+        user, client = self.examinee()
+
+        first = client.get(QUESTIONS_URL)
+        # Only the session and bank versions (core.versioned_cache) are read from the database
+        with self.assertNumQueries(2):
+            second = client.get(QUESTIONS_URL)
+
+        self.assertEqual(first.status_code, 200)
+        ids = [question["id"] for question in first.json()["questions"]]
+        self.assertEqual(len(set(ids)), 5)
+        self.assertEqual([question["id"] for question in second.json()["questions"]], ids)
+        self.assertEqual(ids, sessions.assigned_ids(ExamSession.objects.get(user=user)))
+
+    @override_settings(EXAM_SECTIONS={"math": 3, "logic": 2})
+    def test_sections_are_stratified(self):
+        _, client = self.examinee()
+
+        ids = [question["id"] for question in client.get(QUESTIONS_URL).json()["questions"]]
+
+        sections = dict(QuizQuestion.objects.values_list("id", "section"))
+        self.assertEqual(sorted(sections[q_id] for q_id in ids), ["logic", "logic", "math", "math", "math"])
+
+    @override_settings(EXAM_QUESTION_COUNT=5)
+    def test_only_assigned_questions_are_scored(self):
+        user, client = self.examinee()
+        client.get(QUESTIONS_URL)
+        assigned = sessions.assigned_ids(ExamSession.objects.get(user=user))
+
+        response = client.post(SUBMIT_URL, {"answers": [{"q_id": q.id, "ans": "A"} for q in self.questions]},
+                               format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["marks"], 5)
+        self.assertEqual(sorted(response.data["invalid_question_ids"]),
+                         sorted(q.id for q in self.questions if q.id not in assigned))
+
+    def test_submit_needs_a_session(self):
+        _, client = self.examinee()
+
+        response = client.post(SUBMIT_URL, {"answers": []}, format="json")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_deadline_is_enforced(self):
+        user, client = self.examinee()
+        ids = [question["id"] for question in client.get(QUESTIONS_URL).json()["questions"]]
+        client.post(AUTOSAVE_URL, {"answers": [{"q_id": ids[0], "ans": "A"}]}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            session = ExamSession.objects.get(user=user)
+            session.deadline = timezone.now() - timedelta(hours=1)
+            session.save()
+
+        self.assertEqual(client.get(QUESTIONS_URL).status_code, 403)
+        self.assertEqual(
+            client.post(AUTOSAVE_URL, {"answers": [{"q_id": ids[1], "ans": "A"}]}, format="json").status_code, 403,
+        )
+        response = client.post(SUBMIT_URL, {"answers": [{"q_id": q_id, "ans": "A"} for q_id in ids]}, format="json")
+
+        # Late: only the answer autosaved in time counts
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["late"])
+        self.assertEqual(response.data["marks"], 1)
+
+    def test_deadline_extension_changes_the_etag(self):
+        user, client = self.examinee()
+        etag = client.get(QUESTIONS_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            session = ExamSession.objects.get(user=user)
+            session.deadline += timedelta(minutes=30)
+            session.save()
+
+        response = client.get(QUESTIONS_URL, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(parse_datetime(response.json()["session"]["deadline"]), session.deadline)
+
+    def test_deadline_extension_reaches_other_workers(self):
+        user, client = self.examinee()
+        with self.settings(CACHES=worker_cache("worker-a")):
+            client.get(QUESTIONS_URL)
+        with self.settings(CACHES=worker_cache("worker-b")), self.captureOnCommitCallbacks(execute=True):
+            session = ExamSession.objects.get(user=user)
+            session.deadline = timezone.now() - timedelta(hours=1)
+            session.save()
+
+        # Worker A cached the open session, under the old version
+        with self.settings(CACHES=worker_cache("worker-a")):
+            self.assertEqual(client.get(QUESTIONS_URL).status_code, 403)
+
+
+class AsyncSubmitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [
+            QuizQuestion.objects.create(text=f"Question {i}", option_a="a", option_b="b",
+                                        option_c="c", option_d="d", correct="A")
+            for i in range(3)
+        ]
+        self.user = User.objects.create_user(
+            email="examinee@diu.edu.bd", password=None, full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        self.auth = {"authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.client.get(QUESTIONS_URL, headers=self.auth)  # Starts the session
+
+    def submit(self, client, answers):
+        return client.post(ASYNC_SUBMIT_URL, {"answers": answers}, content_type="application/json", headers=self.auth)
+
+    async def test_concurrent_submits_record_one_attempt(self):
+        client = AsyncClient()
+        answers = [{"q_id": q.id, "ans": "A"} for q in self.questions]
+
+        responses = await asyncio.gather(*[self.submit(client, answers) for _ in range(4)])
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200, 403, 403, 403])
+        self.assertEqual(await ExamAttempt.objects.filter(user=self.user).acount(), 1)
+        self.assertEqual((await User.objects.aget(pk=self.user.pk)).exam_marks, 3)
+
+    async def test_async_submit_is_throttled(self):
+        client = AsyncClient()
+
+        with mock.patch.object(UserSlidingThrottle, 'THROTTLE_RATES', {'user': '1/hour'}):
+            await self.submit(client, [])
+            throttled = await self.submit(client, [])
+
+        self.assertEqual(throttled.status_code, 429)
+        self.assertIn('Retry-After', throttled)
+
+
+class AsyncQuestionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(3):
+            QuizQuestion.objects.create(text=f"Question {i}", option_a="a", option_b="b",
+                                        option_c="c", option_d="d", correct="A")
+        self.user = User.objects.create_user(
+            email="examinee@diu.edu.bd", password=None, full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        self.auth = {"authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def test_async_view_starts_the_session_the_sync_view_serves(self):
+        client = AsyncClient()
+
+        first = await client.get(ASYNC_QUESTIONS_URL, headers=self.auth)
+        again = await client.get(ASYNC_QUESTIONS_URL, headers={**self.auth, "If-None-Match": first["ETag"]})
+        synced = await sync_to_async(self.client.get)(QUESTIONS_URL, headers=self.auth)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(await ExamSession.objects.filter(user=self.user).acount(), 1)
+        self.assertEqual((synced["ETag"], synced.content), (first["ETag"], first.content))
 
-# Create your tests here.
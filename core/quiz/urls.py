@@ -1,8 +1,13 @@
 # quiz/urls.py
 from django.urls import path
-from .views import ExamQuestionsView, SubmitExamView
+from . import async_views
+from .views import AutosaveView, ExamQuestionsView, SubmitExamView
 
 urlpatterns = [
     path('questions/', ExamQuestionsView.as_view(), name='exam-questions'),
     path('submit/', SubmitExamView.as_view(), name='exam-submit'),
+    path('autosave/', AutosaveView.as_view(), name='exam-autosave'),
+    # Native async variants for ASGI deployments
+    path('async/questions/', async_views.exam_questions, name='exam-questions-async'),
+    path('async/submit/', async_views.submit_exam, name='exam-submit-async'),
 ]
@@ -1,23 +1,51 @@
 # quiz/views.py
-import json
-from django.db import transaction
-from django.db.models import F
-from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth import get_user_model
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 
-from .models import QuizQuestion
-from .serializers import QuestionSerializer, SubmitAnswersSerializer
+from django.http import JsonResponse
+
+from core.conditional import not_modified, payload_response
+from results import drafts, sessions
+from results.models import BANK_QUIZ
+from .cache import bank, get_pool, render_assigned
+from .grading import submit_answers
+from .serializers import AutosaveSerializer, SubmitAnswersSerializer
+
+def questions_etag(session, version):
+    # The payload carries the deadline, which an admin may extend
+    return f"quiz-session-{session.pk}-{version}-{session.deadline.timestamp():.0f}"
+
+
+def exam_questions_response(request, user_pk):
+    """
+    The examinee's questions with conditional GET, starting their session on
+    the first call; quiz.async_views repeats it on the async ORM.
+    """
+    session = sessions.get_or_start(user_pk, BANK_QUIZ, get_pool)
+    if not sessions.is_open(session):
+        return JsonResponse({"detail": "Exam time is over."}, status=status.HTTP_403_FORBIDDEN)
+
+    version = bank.version()
+    etag = questions_etag(session, version)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    return payload_response(request, etag, lambda: render_assigned(session, version))
 
-User = get_user_model()
 
 class ExamQuestionsView(APIView):
     """
-    GET: return all questions (without correct answer).
-    Prevent access if user.exam_attempted is True.
+    GET: return the questions drawn for this examinee (without correct answer)
+    and their session's start and deadline.
+    - The first call starts the exam session (results.sessions): the deadline
+      runs from then, and the questions drawn stay fixed
+    - Prevent access if user.exam_attempted is True or the deadline has passed
+    The questions and the session are served from the cache, so a hit only
+    reads their two cache versions from the DB. Responses carry an ETag per session, deadline and
+    bank version (If-None-Match -> 304) and are compressed when the client accepts
+    gzip/brotli.
     """
     permission_classes = [IsAuthenticated]
 
@@ -26,109 +54,73 @@ class ExamQuestionsView(APIView):
         if getattr(user, "exam_attempted", False):
             return Response({"detail": "You already attempted the exam."}, status=status.HTTP_403_FORBIDDEN)
 
-        qs = QuizQuestion.objects.all()
-        serializer = QuestionSerializer(qs, many=True)
-        return Response({"questions": serializer.data}, status=status.HTTP_200_OK)
+        return exam_questions_response(request, user.pk)
+
+class AutosaveView(APIView):
+    """
+    POST: Accepts {"answers": [{"q_id": 1, "ans": "A"}, {"q_id": 2, "ans": null}, ...]}
+    with only the answers changed since the last autosave (null clears one).
+    - Only during the examinee's session, before its deadline
+    - Merged into the examinee's draft in the cache (results.drafts); the only
+      DB query reads the session cache version, and the flush_drafts command writes drafts to the database in batches
+    - q_ids not drawn for this examinee are not saved (but returned in response)
+    GET: the saved answers, to restore the exam after a reload or crash.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        draft = drafts.get_draft(BANK_QUIZ, request.user.pk)
+        answers = [{"q_id": q_id, "ans": ans} for q_id, ans in sorted(draft.items()) if ans is not None]
+        return Response({"answers": answers}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        if getattr(request.user, "exam_attempted", False):
+            return Response({"detail": "Exam already submitted."}, status=status.HTTP_403_FORBIDDEN)
+
+        session = sessions.get_session(request.user.pk, BANK_QUIZ)
+        if session is None:
+            return Response({"detail": "Exam not started."}, status=status.HTTP_403_FORBIDDEN)
+        if not sessions.is_open(session):
+            return Response({"detail": "Exam time is over."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = AutosaveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        assigned = set(sessions.assigned_ids(session))
+        delta = {}
+        invalid_q_ids = []
+        for item in serializer.validated_data['answers']:
+            if item['q_id'] in assigned:
+                delta[item['q_id']] = item['ans']
+            else:
+                invalid_q_ids.append(item['q_id'])
+        drafts.save(BANK_QUIZ, request.user.pk, delta)
+        return Response({"saved": len(delta), "invalid_question_ids": invalid_q_ids}, status=status.HTTP_200_OK)
+
 
 class SubmitExamView(APIView):
     """
     POST: Accepts {"answers": [{"q_id": 1, "ans": "A"}, ...]}
     - Validates input
+    - Seals the autosaved draft: the answers in the payload override it, and
+      with the draft up to date the payload can be empty (only with a shared
+      cache, which drafts need)
+    - Needs a started session; after its deadline only the draft is graded
+    - Only the questions drawn for the session are scored
     - Compares answers in an atomic transaction using select_for_update on user
-    - Ignores invalid q_ids (but returns them in response)
-    - Saves `exam_attempted`, `exam_marks`, `exam_answers` on user
+      (quiz.grading.submit_answers, also used by quiz.async_views)
+    - Scores against the cached answer key (core.answer_key), no question queries
+    - Ignores invalid or unassigned q_ids (but returns them in response)
+    - Saves `exam_attempted`, `exam_marks` on user and the answers as results.ExamAnswer rows
     """
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
     def post(self, request):
         # Validate payload
         serializer = SubmitAnswersSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        data = serializer.validated_data
-        answers = data['answers']
-
-        # Lock the user row to prevent race conditions (user can't submit twice concurrently)
-        try:
-            locked_user = User.objects.select_for_update().get(pk=request.user.pk)
-        except User.DoesNotExist:
-            return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        if getattr(locked_user, "exam_attempted", False):
-            return Response({"detail": "Exam already submitted."}, status=status.HTTP_403_FORBIDDEN)
-
-        # Build dictionary of question objects for given q_ids (single query)
-        q_id_list = [item['q_id'] for item in answers]
-        questions = QuizQuestion.objects.filter(id__in=q_id_list)
-        questions_map = {q.id: q for q in questions}
-
-        total_marks = 0
-        processed = []
-        invalid_q_ids = []
-
-        for item in answers:
-            q_id = item['q_id']
-            # Safety check: ensure ans is a string before calling upper()
-            # Serializer validates this, but defensive check prevents AttributeError
-            ans_value = item.get('ans')
-            if ans_value is None:
-                ans = None
-            else:
-                ans = str(ans_value).upper()
-
-            # Skip if answer is None or invalid
-            if ans is None:
-                invalid_q_ids.append(q_id)
-                processed.append({"q_id": q_id, "ans": None, "valid": False, "reason": "answer_is_null"})
-                continue
-
-            q = questions_map.get(q_id)
-            if q is None:
-                invalid_q_ids.append(q_id)
-                # Still record provided answer for audit/debug
-                processed.append({"q_id": q_id, "ans": ans, "valid": False, "reason": "question_not_found"})
-                continue
-
-            # Validate that question has a correct answer before comparing
-            if not q.correct:
-                processed.append({"q_id": q_id, "ans": ans, "valid": False, "reason": "question_has_no_correct_answer"})
-                continue
-
-            is_correct = (ans == q.correct.upper())
-            if is_correct:
-                total_marks += 1
-
-            processed.append({
-                "q_id": q_id,
-                "ans": ans,
-                "valid": True,
-                "is_correct": is_correct
-            })
-
-        # Save result into user model (user has exam_attempted, exam_marks, exam_answers text)
-        try:
-            locked_user.exam_attempted = True
-            locked_user.exam_marks = total_marks
-            
-            # Try to serialize exam_answers, but if JSON fails, save empty list and continue
-            try:
-                locked_user.exam_answers = json.dumps(processed, ensure_ascii=False)
-            except (TypeError, ValueError) as json_error:
-                # If JSON serialization fails, save empty list but still save marks
-                locked_user.exam_answers = json.dumps([], ensure_ascii=False)
-            
-            locked_user.save(update_fields=['exam_attempted', 'exam_marks', 'exam_answers'])
-        except Exception as e:
-            transaction.set_rollback(True)
-            return Response({"detail": "Failed to save results.", "error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        response_payload = {
-            "message": "Exam submitted successfully.",
-            "marks": total_marks,
-            "total_questions_submitted": len(answers),
-            "invalid_question_ids": invalid_q_ids,
-            "per_question": processed
-        }
-        return Response(response_payload, status=status.HTTP_200_OK)
+        status_code, payload = submit_answers(request.user.pk, serializer.validated_data['answers'])
+        return Response(payload, status=status_code)
@@ -0,0 +1,43 @@
+from django.contrib import admin
+
+from .models import ExamAnswer, ExamAttempt, ExamDraft, ExamSession
+
+
+class ExamAnswerInline(admin.TabularInline):
+    model = ExamAnswer
+    fields = ('question_id', 'choice', 'outcome', 'is_correct')
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+
+@admin.register(ExamAttempt)
+class ExamAttemptAdmin(admin.ModelAdmin):
+    list_display = ('user', 'bank', 'marks', 'submitted_at')
+    list_filter = ('bank',)
+    search_fields = ('user__email', 'user__student_id')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    inlines = [ExamAnswerInline]
+    list_per_page = 50
+
+
+@admin.register(ExamDraft)
+class ExamDraftAdmin(admin.ModelAdmin):
+    list_display = ('user', 'bank', 'saved_at')
+    list_filter = ('bank',)
+    search_fields = ('user__email', 'user__student_id')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('answers', 'saved_at')
+    list_per_page = 50
+
+
+@admin.register(ExamSession)
+class ExamSessionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'bank', 'started_at', 'deadline')
+    list_filter = ('bank',)
+    search_fields = ('user__email', 'user__student_id')
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'pool')
+    list_per_page = 50
@@ -0,0 +1,160 @@
+"""
+Writing graded submissions as ExamAttempt/ExamAnswer rows, and rendering them
+back into the exam_answers shape the submit endpoints have always returned.
+"""
+import json
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from core.answer_key import CORRECT, WRONG
+from questions.cache import aget_report_map, get_report_map
+from quiz.cache import CHOICE_LETTERS, choice_index
+
+from .models import ANSWER_IS_NULL, BANK_QUESTIONS, BANK_QUIZ, ExamAnswer, ExamAttempt
+from .stats import record_item_stats
+
+# SmallIntegerField range; anything else can't be a real option index anyway
+_MAX_CHOICE = 32767
+
+
+def _quiz_row(entry):
+    if entry.get('valid'):
+        outcome = CORRECT if entry.get('is_correct') else WRONG
+    else:
+        outcome = entry.get('reason') or ANSWER_IS_NULL
+    return entry['q_id'], choice_index(entry.get('ans')), outcome
+
+
+def _questions_row(entry):
+    choice = entry.get('selectedAnswer')
+    if not isinstance(choice, int) or isinstance(choice, bool) or not 0 <= choice <= _MAX_CHOICE:
+        choice = None
+    return entry['question']['id'], choice, CORRECT if entry.get('isCorrect') else WRONG
+
+
+ROW_BUILDERS = {
+    BANK_QUIZ: _quiz_row,
+    BANK_QUESTIONS: _questions_row,
+}
+
+
+def record_attempt(user, bank, marks, processed, submitted_at=None):
+    """
+    Store a graded submission. `processed` is the per-question list built by
+    quiz.grading / questions.grading for `bank`. Runs two INSERTs regardless
+    of the number of answers; the item statistics are updated after commit.
+    """
+    attempt = ExamAttempt(user=user, bank=bank, marks=marks)
+    if submitted_at is not None:
+        attempt.submitted_at = submitted_at
+    attempt.save()
+    answers = ExamAnswer.objects.bulk_create(build_answers(attempt, processed), batch_size=500)
+    # A failed statistics update must not fail a committed submission
+    transaction.on_commit(partial(record_item_stats, attempt.bank, marks, answers), robust=True)
+    return attempt
+
+
+def build_answers(attempt, processed):
+    """
+    Unsaved ExamAnswer rows for a graded submission of `attempt`.
+    """
+    to_row = ROW_BUILDERS[attempt.bank]
+    answers = []
+    for entry in processed:
+        question_id, choice, outcome = to_row(entry)
+        answers.append(ExamAnswer(
+            attempt=attempt,
+            bank=attempt.bank,
+            question_id=question_id,
+            choice=choice,
+            outcome=outcome,
+            is_correct=outcome == CORRECT,
+        ))
+    return answers
+
+
+def _render_quiz(answers, report_map=None):
+    rendered = []
+    for answer in answers:
+        ans = CHOICE_LETTERS[answer.choice] if answer.choice is not None else None
+        if answer.outcome in (CORRECT, WRONG):
+            rendered.append({"q_id": answer.question_id, "ans": ans, "valid": True, "is_correct": answer.is_correct})
+        else:
+            rendered.append({"q_id": answer.question_id, "ans": ans, "valid": False, "reason": answer.outcome})
+    return rendered
+
+
+def _render_questions(answers, report_map=None):
+    if report_map is None:
+        report_map = get_report_map()
+    return [
+        {'question': report_map[answer.question_id], 'selectedAnswer': answer.choice, 'isCorrect': answer.is_correct}
+        for answer in answers
+        # Questions deleted since the attempt have no report entry left
+        if answer.question_id in report_map
+    ]
+
+
+RENDERERS = {
+    BANK_QUIZ: _render_quiz,
+    BANK_QUESTIONS: _render_questions,
+}
+
+
+def render_attempt(attempt, report_map=None):
+    """
+    `report_map` is questions.cache.get_report_map(), read when needed and not given.
+    """
+    answers = sorted(attempt.answers.all(), key=lambda answer: answer.pk)
+    return RENDERERS[attempt.bank](answers, report_map)
+
+
+def rendered_answers(user, report_map=None):
+    """
+    The user's answers rendered from their attempts, or None when they have no
+    attempt rows (graded before the normalized tables existed and not yet
+    backfilled). Prefetch `exam_attempts__answers` and pass the report map
+    when calling this in a loop.
+    """
+    attempts = list(user.exam_attempts.all())
+    if not attempts:
+        return None
+    if report_map is None and _needs_report_map(attempts):
+        report_map = get_report_map()
+    return _render_attempts(attempts, report_map)
+
+
+def _needs_report_map(attempts):
+    return any(attempt.bank == BANK_QUESTIONS for attempt in attempts)
+
+
+def _render_attempts(attempts, report_map):
+    rendered = []
+    for attempt in attempts:
+        rendered.extend(render_attempt(attempt, report_map))
+    return rendered
+
+
+def exam_answers_json(user):
+    """
+    JSON string of the user's answers in the same shape as the legacy
+    User.exam_answers blob, which is returned as-is for legacy users.
+    """
+    rendered = rendered_answers(user)
+    if rendered is None:
+        return user.exam_answers
+    return json.dumps(rendered, ensure_ascii=False)
+
+
+async def aexam_answers_json(user):
+    """
+    exam_answers_json() for async callers, on the async ORM. `user` may be a
+    users.authentication snapshot, whose exam_answers column is not loaded.
+    """
+    attempts = [attempt async for attempt in user.exam_attempts.prefetch_related('answers')]
+    if not attempts:
+        return await get_user_model().objects.filter(pk=user.pk).values_list('exam_answers', flat=True).afirst()
+    report_map = await aget_report_map() if _needs_report_map(attempts) else None
+    return json.dumps(_render_attempts(attempts, report_map), ensure_ascii=False)
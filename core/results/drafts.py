@@ -0,0 +1,197 @@
+"""
+Autosave buffer for exams in progress.
+
+An autosave merges an answer delta into the examinee's draft in the shared
+cache and marks the draft dirty, without touching the database. The
+`flush_drafts` command writes dirty drafts to ExamDraft rows in batches, so
+those writes are spread over the exam instead of all landing at submit time.
+A draft is read back as its ExamDraft row overlaid with the cached answers,
+which are newer; submitting grades it and discards both.
+
+With Redis a draft is a hash with one field per question and the dirty drafts
+of a bank are a set, so a delta is one pipelined round trip and concurrent
+deltas from two tabs never overwrite each other. Any other cache gets
+LocalDraftBuffer, which is atomic within one process only.
+
+Until flushed, the cache holds the only copy of a draft, so saving and
+flushing require a cache shared by every worker (core.shared_cache): with a
+per-process cache, flush_drafts and a submit served by another worker would
+never see the answers.
+"""
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.utils import timezone
+
+from core.shared_cache import cache_backend, require_shared_cache
+from .models import ExamAttempt, ExamDraft
+
+
+def _draft_key(bank, user_pk):
+    return f"drafts:{bank}:{user_pk}"
+
+
+def _dirty_key(bank):
+    return f"drafts:{bank}:dirty"
+
+
+class RedisDraftBuffer:
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _client(self):
+        # Writes, and reads that must see them, all go to the primary
+        return self.cache._cache.get_client(write=True)
+
+    def _key(self, key):
+        return self.cache.make_and_validate_key(key)
+
+    def save(self, bank, user_pk, delta):
+        pipe = self._client().pipeline()
+        key = self._key(_draft_key(bank, user_pk))
+        pipe.hset(key, mapping={str(q_id): json.dumps(answer) for q_id, answer in delta.items()})
+        pipe.expire(key, settings.DRAFT_TTL_SECONDS)
+        pipe.sadd(self._key(_dirty_key(bank)), user_pk)
+        pipe.execute()
+
+    def get_many(self, bank, user_pks):
+        pipe = self._client().pipeline()
+        for user_pk in user_pks:
+            pipe.hgetall(self._key(_draft_key(bank, user_pk)))
+        return {
+            user_pk: {int(q_id): json.loads(answer) for q_id, answer in fields.items()}
+            for user_pk, fields in zip(user_pks, pipe.execute())
+        }
+
+    def pop_dirty(self, bank, count):
+        return [int(user_pk) for user_pk in self._client().spop(self._key(_dirty_key(bank)), count) or ()]
+
+    def mark_dirty(self, bank, user_pks):
+        if user_pks:
+            self._client().sadd(self._key(_dirty_key(bank)), *user_pks)
+
+    def discard(self, bank, user_pk):
+        pipe = self._client().pipeline()
+        pipe.delete(self._key(_draft_key(bank, user_pk)))
+        pipe.srem(self._key(_dirty_key(bank)), user_pk)
+        pipe.execute()
+
+
+class LocalDraftBuffer:
+    """
+    Same contract on the Django cache API.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def save(self, bank, user_pk, delta):
+        with self._lock:
+            key = _draft_key(bank, user_pk)
+            self.cache.set(key, {**(self.cache.get(key) or {}), **delta}, settings.DRAFT_TTL_SECONDS)
+            dirty = self.cache.get(_dirty_key(bank)) or set()
+            self.cache.set(_dirty_key(bank), dirty | {user_pk}, None)
+
+    def get_many(self, bank, user_pks):
+        drafts = self.cache.get_many([_draft_key(bank, user_pk) for user_pk in user_pks])
+        return {user_pk: drafts.get(_draft_key(bank, user_pk)) or {} for user_pk in user_pks}
+
+    def pop_dirty(self, bank, count):
+        with self._lock:
+            dirty = self.cache.get(_dirty_key(bank)) or set()
+            popped = sorted(dirty)[:count]
+            self.cache.set(_dirty_key(bank), dirty.difference(popped), None)
+            return popped
+
+    def mark_dirty(self, bank, user_pks):
+        with self._lock:
+            dirty = self.cache.get(_dirty_key(bank)) or set()
+            self.cache.set(_dirty_key(bank), dirty | set(user_pks), None)
+
+    def discard(self, bank, user_pk):
+        with self._lock:
+            self.cache.delete(_draft_key(bank, user_pk))
+            dirty = self.cache.get(_dirty_key(bank)) or set()
+            self.cache.set(_dirty_key(bank), dirty - {user_pk}, None)
+
+
+_redis_buffer = RedisDraftBuffer(cache)
+_local_buffer = LocalDraftBuffer(cache)
+
+
+def _buffer():
+    # `cache` is a proxy: the check needs the backend configured behind it
+    return _redis_buffer if isinstance(cache_backend(cache), RedisCache) else _local_buffer
+
+
+def save(bank, user_pk, delta):
+    """
+    Merge {question id: answer} into the user's draft; a None answer clears one.
+    """
+    require_shared_cache("Exam drafts")
+    if delta:
+        _buffer().save(bank, user_pk, delta)
+
+
+def get_draft(bank, user_pk):
+    """
+    The user's saved answers {question id: answer}, cleared ones included as None.
+    """
+    row = ExamDraft.objects.filter(user_id=user_pk, bank=bank).values_list('answers', flat=True).first()
+    answers = {int(q_id): answer for q_id, answer in (row or {}).items()}
+    if settings.CACHE_SHARED:
+        # save() refuses a private cache, which then holds no draft
+        answers.update(_buffer().get_many(bank, [user_pk])[user_pk])
+    return answers
+
+
+def discard(bank, user_pk):
+    """
+    Drop the user's draft once their submission commits. Call inside the
+    submit transaction.
+    """
+    ExamDraft.objects.filter(user_id=user_pk, bank=bank).delete()
+    transaction.on_commit(lambda: _buffer().discard(bank, user_pk))
+
+
+def flush(bank, batch_size=500):
+    """
+    Write up to `batch_size` dirty drafts of `bank` to ExamDraft in three
+    queries. Returns the number of dirty drafts taken from the buffer.
+    """
+    require_shared_cache("Exam drafts")
+    buffer = _buffer()
+    user_pks = buffer.pop_dirty(bank, batch_size)
+    if not user_pks:
+        return 0
+    try:
+        drafts = buffer.get_many(bank, user_pks)
+        # A submission may have discarded the draft after it was popped
+        submitted = set(
+            ExamAttempt.objects.filter(bank=bank, user_id__in=user_pks).values_list('user_id', flat=True)
+        )
+        # Overlay rather than replace: the cache may have lost answers flushed earlier
+        existing = dict(
+            ExamDraft.objects.filter(bank=bank, user_id__in=user_pks).values_list('user_id', 'answers')
+        )
+        now = timezone.now()
+        rows = [
+            ExamDraft(user_id=user_pk, bank=bank, saved_at=now, answers={
+                **existing.get(user_pk, {}),
+                **{str(q_id): answer for q_id, answer in answers.items()},
+            })
+            for user_pk, answers in drafts.items()
+            if answers and user_pk not in submitted
+        ]
+        ExamDraft.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['user', 'bank'], update_fields=['answers', 'saved_at'],
+        )
+    except Exception:
+        buffer.mark_dirty(bank, user_pks)
+        raise
+    return len(user_pks)
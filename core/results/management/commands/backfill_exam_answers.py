@@ -0,0 +1,89 @@
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from results import stats
+from results.answers import build_answers
+from results.models import BANK_CHOICES, BANK_QUESTIONS, BANK_QUIZ, ExamAnswer, ExamAttempt
+from users.models import User
+
+
+def detect_bank(entries):
+    """
+    Which submit endpoint wrote a legacy exam_answers blob, or None if unknown.
+    """
+    if not isinstance(entries, list) or not entries or not all(isinstance(e, dict) for e in entries):
+        return None
+    if all(isinstance(e.get('q_id'), int) for e in entries):
+        return BANK_QUIZ
+    if all(isinstance(e.get('question'), dict) and isinstance(e['question'].get('id'), int) for e in entries):
+        return BANK_QUESTIONS
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy legacy User.exam_answers JSON blobs into ExamAttempt/ExamAnswer rows. "
+        "Users are streamed with a server-side cursor and written in chunks, so "
+        "the command can be stopped and rerun; users that already have an attempt "
+        "are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--clear-blobs', action='store_true',
+                            help="Reset exam_answers to '[]' once a user's answers are copied.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = (
+            User.objects.filter(exam_attempted=True)
+            .exclude(Exists(ExamAttempt.objects.filter(user=OuterRef('pk'))))
+            .only('id', 'exam_marks', 'exam_answers', 'date_joined')
+            .order_by('pk')
+            .iterator(chunk_size=chunk_size)
+        )
+
+        copied = skipped = 0
+        started = time.monotonic()
+        while True:
+            chunk = list(islice(users, chunk_size))
+            if not chunk:
+                break
+
+            pending = []
+            for user in chunk:
+                try:
+                    entries = json.loads(user.exam_answers or '[]')
+                except ValueError:
+                    entries = None
+                bank = detect_bank(entries)
+                if bank is None:
+                    skipped += 1
+                    continue
+                # The real submission time was never stored
+                attempt = ExamAttempt(user=user, bank=bank, marks=user.exam_marks, submitted_at=user.date_joined)
+                pending.append((attempt, entries))
+
+            with transaction.atomic():
+                ExamAttempt.objects.bulk_create([attempt for attempt, _ in pending])
+                ExamAnswer.objects.bulk_create(
+                    [answer for attempt, entries in pending for answer in build_answers(attempt, entries)],
+                    batch_size=1000,
+                )
+                if options['clear_blobs']:
+                    User.objects.filter(pk__in=[attempt.user_id for attempt, _ in pending]).update(exam_answers='[]')
+
+            copied += len(pending)
+            self.stdout.write(f"{copied} users copied, {skipped} skipped ({time.monotonic() - started:.1f}s)")
+
+        if copied:
+            # Backfilled attempts bypass the per-submission counters
+            for bank, _ in BANK_CHOICES:
+                stats.rebuild(bank)
+
+        self.stdout.write(self.style.SUCCESS(f"Backfill done: {copied} users copied, {skipped} skipped."))
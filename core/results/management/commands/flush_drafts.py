@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from results import drafts
+from results.models import BANK_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Write autosaved exam drafts from the cache to the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep flushing instead of exiting once no draft is dirty.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between flushes when nothing was dirty (with --loop).")
+
+    def handle(self, *args, **options):
+        banks = [bank for bank, _ in BANK_CHOICES]
+        total = 0
+        while True:
+            written = sum(drafts.flush(bank, options['batch_size']) for bank in banks)
+            total += written
+            if written:
+                self.stdout.write(f"Flushed {written} drafts")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Drafts flushed: {total} in total."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from results import stats
+from results.models import BANK_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Recompute the item-analysis counters from the stored answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', choices=[bank for bank, _ in BANK_CHOICES],
+                            help="Only rebuild this bank (default: all banks).")
+
+    def handle(self, *args, **options):
+        banks = [options['bank']] if options['bank'] else [bank for bank, _ in BANK_CHOICES]
+        for bank in banks:
+            stats.rebuild(bank)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt item statistics for the {bank} bank."))
@@ -0,0 +1,170 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from core.answer_key import CORRECT, NO_CORRECT_ANSWER, QUESTION_NOT_FOUND, WRONG
+
+BANK_QUIZ = 'quiz'
+BANK_QUESTIONS = 'questions'
+BANK_CHOICES = (
+    (BANK_QUIZ, 'Quiz questions'),
+    (BANK_QUESTIONS, 'Questions'),
+)
+
+ANSWER_IS_NULL = 'answer_is_null'
+OUTCOME_CHOICES = (
+    (CORRECT, 'Correct'),
+    (WRONG, 'Wrong'),
+    (QUESTION_NOT_FOUND, 'Question not found'),
+    (NO_CORRECT_ANSWER, 'Question has no correct answer'),
+    (ANSWER_IS_NULL, 'No answer given'),
+)
+
+
+class ExamAttempt(models.Model):
+    """
+    One graded submission. Its answers live in ExamAnswer rows instead of the
+    User.exam_answers JSON blob.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exam_attempts')
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    marks = models.IntegerField(default=0)
+    submitted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user} ({self.bank})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'bank'], name='unique_attempt_per_bank'),
+        ]
+        indexes = [
+            models.Index(fields=['bank', 'marks']),
+        ]
+
+
+class ExamAnswer(models.Model):
+    attempt = models.ForeignKey(ExamAttempt, on_delete=models.CASCADE, related_name='answers')
+    # Denormalized from the attempt so per-question aggregates need no join
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    # Not a foreign key: the id refers to QuizQuestion or Question depending on `bank`
+    question_id = models.BigIntegerField()
+    # Option index (A=0 .. D=3 for the quiz bank), null when no usable answer was given
+    choice = models.SmallIntegerField(blank=True, null=True)
+    outcome = models.CharField(max_length=32, choices=OUTCOME_CHOICES)
+    is_correct = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Q{self.question_id}: {self.outcome}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bank', 'question_id', 'choice']),
+        ]
+
+
+class ItemStat(models.Model):
+    """
+    Running item-analysis counters for one question, updated as each
+    submission is graded (see results.stats).
+    """
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    question_id = models.BigIntegerField()
+    responses = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    # Sums of the examinees' total marks, for the discrimination index
+    score_sum = models.BigIntegerField(default=0)
+    correct_score_sum = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.bank} Q{self.question_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bank', 'question_id'], name='unique_item_stat'),
+        ]
+
+
+class ItemChoiceStat(models.Model):
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    question_id = models.BigIntegerField()
+    choice = models.SmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bank', 'question_id', 'choice'], name='unique_item_choice_stat'),
+        ]
+
+
+class BankStat(models.Model):
+    """
+    Distribution of total marks over every graded attempt of a bank.
+    """
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES, unique=True)
+    examinees = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_sq_sum = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return self.bank
+
+
+class ExamDraft(models.Model):
+    """
+    Answers saved so far by an examinee who has not submitted yet, written in
+    batches from the autosave buffer (results.drafts). Removed on submit.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exam_drafts')
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    # {question id (as a string): answer}; a null answer was cleared by the examinee
+    answers = models.JSONField(default=dict)
+    saved_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user} ({self.bank} draft)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'bank'], name='unique_draft_per_bank'),
+        ]
+
+
+class QuestionPool(models.Model):
+    """
+    Snapshot of the question ids a bank's examinees are drawn from, and how
+    many to draw from each section. Sessions point at it, so an assignment can
+    be redrawn from (pool, seed) however the bank has changed since.
+    """
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    # Hash of bank, sections and plan; identical snapshots share a row
+    digest = models.CharField(max_length=64, unique=True)
+    # {section: [question ids, ascending]}
+    sections = models.JSONField(default=dict)
+    # {section: questions drawn}; 0 draws the whole section
+    plan = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.bank} pool {self.pk}"
+
+
+class ExamSession(models.Model):
+    """
+    One examinee's sitting of a bank: when it started, its deadline, and the
+    questions they were served, stored as a pool and a seed (results.sessions).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exam_sessions')
+    bank = models.CharField(max_length=20, choices=BANK_CHOICES)
+    pool = models.ForeignKey(QuestionPool, on_delete=models.PROTECT, related_name='sessions')
+    seed = models.BigIntegerField()
+    started_at = models.DateTimeField(default=timezone.now)
+    deadline = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user} ({self.bank} session)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'bank'], name='unique_session_per_bank'),
+        ]
@@ -0,0 +1,203 @@
+"""
+Server-side exam sessions: when an examinee started, when their time runs
+out, and which questions they were served.
+
+Questions are drawn from a QuestionPool, a durable snapshot of the bank's ids
+per section plus how many to draw from each (EXAM_SECTIONS, or
+EXAM_QUESTION_COUNT from the whole bank). The pool is built once per bank
+version from the bank's cache, so starting a session never scans the
+questions table. A session stores only the pool and a random seed;
+`assigned_ids()` redraws the same questions from them whenever needed.
+Pools never change and are cached as is. Sessions are cached under a
+core.versioned_cache namespace per bank, bumped when a session is changed or
+deleted (e.g. an admin extending a deadline): the version lives in the
+database, so every worker stops serving the old session, and the exam
+endpoints read one version row instead of the session. The `a`-prefixed
+functions are the same for the async views.
+"""
+import hashlib
+import json
+import random
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.versioned_cache import VersionedCache
+from .models import ExamSession, QuestionPool
+
+TIMEOUT = 60 * 60 * 24
+
+
+def _sessions(bank):
+    return VersionedCache(f"sessions:{bank}", TIMEOUT)
+
+
+def _pool_key(pool_pk):
+    return f"sessions:pool:{pool_pk}"
+
+
+def exam_plan():
+    """
+    {section: questions to draw}; 0 draws every question of the section.
+    """
+    return dict(settings.EXAM_SECTIONS) or {"": settings.EXAM_QUESTION_COUNT}
+
+
+def build_pool(bank, rows):
+    """
+    The QuestionPool for (question id, section) `rows` under the current plan,
+    creating it on first use.
+    """
+    plan = exam_plan()
+    stratified = bool(settings.EXAM_SECTIONS)
+    sections = {section: [] for section in plan}
+    for q_id, section in sorted(rows):
+        section = section if stratified else ""
+        if section in sections:
+            sections[section].append(q_id)
+    digest = hashlib.sha256(json.dumps([bank, sections, plan], sort_keys=True).encode()).hexdigest()
+    pool, _ = QuestionPool.objects.get_or_create(
+        digest=digest, defaults={"bank": bank, "sections": sections, "plan": plan},
+    )
+    cache.set(_pool_key(pool.pk), pool, TIMEOUT)
+    return pool
+
+
+def get_pool(pool_pk):
+    pool = cache.get(_pool_key(pool_pk))
+    if pool is None:
+        pool = QuestionPool.objects.get(pk=pool_pk)
+        cache.set(_pool_key(pool_pk), pool, TIMEOUT)
+    return pool
+
+
+async def aget_pool(pool_pk):
+    pool = await cache.aget(_pool_key(pool_pk))
+    if pool is None:
+        pool = await QuestionPool.objects.aget(pk=pool_pk)
+        await cache.aset(_pool_key(pool_pk), pool, TIMEOUT)
+    return pool
+
+
+def draw(pool, seed):
+    """
+    The question ids `seed` draws from `pool`, in the order they are served.
+    """
+    rng = random.Random(seed)
+    drawn = []
+    # Sorted: JSON columns need not keep key order
+    for section in sorted(pool.plan):
+        candidates = pool.sections.get(section, [])
+        count = pool.plan[section]
+        drawn.extend(rng.sample(candidates, min(count, len(candidates)) if count else len(candidates)))
+    return drawn
+
+
+def drawn_count(pool):
+    """
+    How many questions draw() serves from `pool`, whatever the seed.
+    """
+    total = 0
+    for section, count in pool.plan.items():
+        available = len(pool.sections.get(section, []))
+        total += min(count, available) if count else available
+    return total
+
+
+def assigned_ids(session):
+    return draw(get_pool(session.pool_id), session.seed)
+
+
+async def aassigned_ids(session):
+    return draw(await aget_pool(session.pool_id), session.seed)
+
+
+def get_session(user_pk, bank, version=None):
+    """
+    The user's session for `bank`, or None if they have not started.
+    """
+    key = _sessions(bank).key(user_pk, version)
+    session = cache.get(key)
+    if session is None:
+        session = ExamSession.objects.filter(user_id=user_pk, bank=bank).first()
+        if session is not None:
+            cache.set(key, session, TIMEOUT)
+    return session
+
+
+async def aget_session(user_pk, bank, version=None):
+    key = await _sessions(bank).akey(user_pk, version)
+    session = await cache.aget(key)
+    if session is None:
+        session = await ExamSession.objects.filter(user_id=user_pk, bank=bank).afirst()
+        if session is not None:
+            await cache.aset(key, session, TIMEOUT)
+    return session
+
+
+def _new_session(user_pk, bank, pool):
+    now = timezone.now()
+    return ExamSession(
+        user_id=user_pk, bank=bank, pool_id=pool.pk, seed=secrets.randbits(63),
+        started_at=now, deadline=now + timedelta(seconds=settings.EXAM_DURATION_SECONDS),
+    )
+
+
+def get_or_start(user_pk, bank, current_pool):
+    """
+    The user's session for `bank`, started now with `current_pool()` if they
+    have none yet.
+    """
+    version = _sessions(bank).version()
+    session = get_session(user_pk, bank, version)
+    if session is not None:
+        return session
+    session = _new_session(user_pk, bank, current_pool())
+    try:
+        with transaction.atomic():
+            session.save(force_insert=True)
+    except IntegrityError:
+        # Started by a concurrent request
+        session = ExamSession.objects.get(user_id=user_pk, bank=bank)
+    # No other worker can have cached this session, so the version stays
+    cache.set(_sessions(bank).key(user_pk, version), session, TIMEOUT)
+    return session
+
+
+async def aget_or_start(user_pk, bank, current_pool):
+    """
+    get_or_start() for async callers; `current_pool` is a coroutine function.
+    """
+    version = await _sessions(bank).aversion()
+    session = await aget_session(user_pk, bank, version)
+    if session is not None:
+        return session
+    session = _new_session(user_pk, bank, await current_pool())
+    try:
+        # Autocommit: a failed insert leaves no transaction to roll back
+        await session.asave(force_insert=True)
+    except IntegrityError:
+        session = await ExamSession.objects.aget(user_id=user_pk, bank=bank)
+    await cache.aset(await _sessions(bank).akey(user_pk, version), session, TIMEOUT)
+    return session
+
+
+def is_open(session, now=None):
+    """
+    Whether answers are still accepted, allowing EXAM_GRACE_SECONDS for
+    requests in flight at the deadline.
+    """
+    now = now or timezone.now()
+    return now <= session.deadline + timedelta(seconds=settings.EXAM_GRACE_SECONDS)
+
+
+def forget(bank):
+    """
+    Invalidate the cached sessions of `bank`; results.signals calls this when
+    one is changed or deleted.
+    """
+    _sessions(bank).bump()
@@ -0,0 +1,15 @@
+# results/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import sessions
+from .models import ExamSession
+
+
+@receiver(post_save, sender=ExamSession)
+@receiver(post_delete, sender=ExamSession)
+def drop_cached_sessions(sender, instance, created=False, **kwargs):
+    # e.g. an admin extending the deadline. A new session is not cached anywhere yet.
+    if not created:
+        transaction.on_commit(lambda: sessions.forget(instance.bank))
@@ -0,0 +1,152 @@
+"""
+Item analysis (difficulty, discrimination, option distribution) per question.
+
+Counters are updated with one upsert per table once each graded submission
+has committed, so reading the statistics never scans the answers and the
+submit transaction never holds the shared per-bank row. `rebuild()` recomputes
+them from ExamAnswer rows with SQL aggregates for backfills and regrades.
+
+Difficulty is the share of responses that were correct. Discrimination is the
+point-biserial correlation between getting the item right and the examinee's
+total marks (the item itself included), computed from running sums:
+
+    r = (M1 - M0) / s * sqrt(p * (1 - p))
+
+where M1 and M0 are the mean total marks of those who got the item right and
+wrong, p the difficulty and s the standard deviation of total marks in the bank.
+"""
+import math
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+
+from core.answer_key import CORRECT, WRONG
+
+from .models import BankStat, ExamAnswer, ExamAttempt, ItemChoiceStat, ItemStat
+
+GRADED_OUTCOMES = (CORRECT, WRONG)
+
+
+def _upsert_increment(model, key_fields, increment_fields, rows):
+    """
+    INSERT rows, adding `increment_fields` onto existing rows that share
+    `key_fields`. One statement for any number of rows (PostgreSQL and SQLite).
+    """
+    if not rows:
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = key_fields + increment_fields
+    quoted = [connection.ops.quote_name(model._meta.get_field(name).column) for name in columns]
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(rows))
+    updates = ", ".join(
+        f"{column} = {table}.{column} + EXCLUDED.{column}" for column in quoted[len(key_fields):]
+    )
+    sql = (
+        f"INSERT INTO {table} ({', '.join(quoted)}) VALUES {placeholders} "
+        f"ON CONFLICT ({', '.join(quoted[:len(key_fields)])}) DO UPDATE SET {updates}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+def record_item_stats(bank, marks, answers):
+    """
+    Add one graded attempt with total `marks` and its ExamAnswer rows.
+
+    Run it outside the submit transaction (record_attempt defers it to
+    on_commit): each upsert then commits on its own, so the single BankStat
+    row of the bank is locked for one statement rather than a whole
+    submission. Rows are upserted in key order, so concurrent submissions
+    lock the item rows they share in the same order and can't deadlock.
+    """
+    # Merged per key first: one upsert can't touch the same row twice
+    items = defaultdict(lambda: [0, 0])
+    choices = defaultdict(int)
+    for answer in answers:
+        if answer.outcome not in GRADED_OUTCOMES:
+            continue
+        items[answer.question_id][0] += 1
+        items[answer.question_id][1] += int(answer.is_correct)
+        if answer.choice is not None:
+            choices[answer.question_id, answer.choice] += 1
+
+    _upsert_increment(ItemStat, ['bank', 'question_id'],
+                      ['responses', 'correct', 'score_sum', 'correct_score_sum'],
+                      [(bank, q_id, n, correct, marks * n, marks * correct)
+                       for q_id, (n, correct) in sorted(items.items())])
+    _upsert_increment(ItemChoiceStat, ['bank', 'question_id', 'choice'], ['count'],
+                      [(bank, q_id, choice, count) for (q_id, choice), count in sorted(choices.items())])
+    _upsert_increment(BankStat, ['bank'], ['examinees', 'score_sum', 'score_sq_sum'],
+                      [(bank, 1, marks, marks * marks)])
+
+
+@transaction.atomic
+def rebuild(bank):
+    """
+    Recompute every counter of `bank` from the stored answers. Submissions
+    committing while it runs may be counted twice; run it when the bank is quiet.
+    """
+    graded = ExamAnswer.objects.filter(bank=bank, outcome__in=GRADED_OUTCOMES)
+    correct = Q(is_correct=True)
+
+    ItemStat.objects.filter(bank=bank).delete()
+    ItemStat.objects.bulk_create([
+        ItemStat(bank=bank, **row)
+        for row in graded.values('question_id').annotate(
+            responses=Count('id'),
+            correct=Count('id', filter=correct),
+            score_sum=Sum('attempt__marks'),
+            correct_score_sum=Sum('attempt__marks', filter=correct, default=0),
+        ).order_by()
+    ], batch_size=1000)
+
+    ItemChoiceStat.objects.filter(bank=bank).delete()
+    ItemChoiceStat.objects.bulk_create([
+        ItemChoiceStat(bank=bank, **row)
+        for row in graded.filter(choice__isnull=False)
+        .values('question_id', 'choice').annotate(count=Count('id')).order_by()
+    ], batch_size=1000)
+
+    totals = ExamAttempt.objects.filter(bank=bank).aggregate(
+        examinees=Count('id'),
+        score_sum=Sum('marks', default=0),
+        score_sq_sum=Sum(F('marks') * F('marks'), default=0),
+    )
+    BankStat.objects.update_or_create(bank=bank, defaults=totals)
+
+
+def item_statistics(bank):
+    """
+    List of per-question statistics for `bank`, ordered by question id.
+    """
+    bank_stat = BankStat.objects.filter(bank=bank).first()
+    sd = 0.0
+    if bank_stat and bank_stat.examinees:
+        mean = bank_stat.score_sum / bank_stat.examinees
+        sd = math.sqrt(max(bank_stat.score_sq_sum / bank_stat.examinees - mean * mean, 0.0))
+
+    distribution = defaultdict(dict)
+    for question_id, choice, count in ItemChoiceStat.objects.filter(bank=bank).values_list(
+        'question_id', 'choice', 'count'
+    ):
+        distribution[question_id][choice] = count
+
+    result = []
+    for item in ItemStat.objects.filter(bank=bank).order_by('question_id'):
+        p = item.correct / item.responses if item.responses else None
+        discrimination = None
+        if p is not None and 0 < p < 1 and sd > 0:
+            wrong = item.responses - item.correct
+            m1 = item.correct_score_sum / item.correct
+            m0 = (item.score_sum - item.correct_score_sum) / wrong
+            discrimination = round((m1 - m0) / sd * math.sqrt(p * (1 - p)), 4)
+        result.append({
+            "question_id": item.question_id,
+            "responses": item.responses,
+            "correct": item.correct,
+            "difficulty": round(p, 4) if p is not None else None,
+            "discrimination": discrimination,
+            "choices": distribution.get(item.question_id, {}),
+        })
+    return result
@@ -0,0 +1,191 @@
+import json
+import random
+import statistics
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.answer_key import CORRECT, QUESTION_NOT_FOUND, WRONG
+from questions import cache as questions_cache
+from questions.grading import grade_answers, submit_answers
+from questions.models import Question
+from . import stats
+from .answers import exam_answers_json, record_attempt, rendered_answers
+from .models import ANSWER_IS_NULL, BANK_QUESTIONS, BANK_QUIZ, BankStat, ExamAnswer, ExamAttempt, ItemStat
+
+User = get_user_model()
+
+
+def make_user(n, **fields):
+    return User.objects.create_user(
+        email=f"examinee{n}@diu.edu.bd", password=None, full_name=f"Examinee {n}",
+        whatsapp_number="0100000000", student_id="000-00-0000", **fields,
+    )
+
+
+QUIZ_PROCESSED = [
+    {"q_id": 1, "ans": "A", "valid": True, "is_correct": True},
+    {"q_id": 2, "ans": "C", "valid": True, "is_correct": False},
+    {"q_id": 3, "ans": None, "valid": False, "reason": ANSWER_IS_NULL},
+    {"q_id": 99, "ans": "B", "valid": False, "reason": QUESTION_NOT_FOUND},
+]
+
+
+class RecordAttemptTests(TestCase):
+    def test_quiz_answers_become_rows_and_render_back(self):
+        user = make_user(0, exam_attempted=True, exam_marks=1)
+
+        attempt = record_attempt(user, BANK_QUIZ, 1, QUIZ_PROCESSED)
+
+        rows = list(attempt.answers.order_by('pk').values_list('question_id', 'choice', 'outcome', 'is_correct'))
+        self.assertEqual(rows, [
+            (1, 0, CORRECT, True),
+            (2, 2, WRONG, False),
+            (3, None, ANSWER_IS_NULL, False),
+            (99, 1, QUESTION_NOT_FOUND, False),
+        ])
+        self.assertEqual(json.loads(exam_answers_json(user)), QUIZ_PROCESSED)
+
+    def test_user_without_attempts_keeps_the_legacy_blob(self):
+        user = make_user(0, exam_attempted=True, exam_answers='[{"q_id": 1}]')
+
+        self.assertIsNone(rendered_answers(user))
+        self.assertEqual(exam_answers_json(user), '[{"q_id": 1}]')
+
+
+class BackfillExamAnswersTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [Question.objects.create(text=f"Question {i}", options=["a", "b", "c"],
+                                                  correct_answer_index=i % 3) for i in range(3)]
+
+    def backfill(self, *args):
+        call_command('backfill_exam_answers', *args, stdout=StringIO())
+
+    def test_legacy_blobs_round_trip(self):
+        report_map = questions_cache.get_report_map()
+        questions_blob = [
+            {"question": report_map[question.pk], "selectedAnswer": choice, "isCorrect": choice == question.pk % 3}
+            for question, choice in zip(self.questions, [0, 0, 2])
+        ]
+        quiz_user = make_user(0, exam_attempted=True, exam_marks=1, exam_answers=json.dumps(QUIZ_PROCESSED))
+        questions_user = make_user(1, exam_attempted=True, exam_marks=2, exam_answers=json.dumps(questions_blob))
+        broken_user = make_user(2, exam_attempted=True, exam_answers='{not json')
+        make_user(3)  # Never attempted
+
+        self.backfill('--chunk-size', '2')
+
+        self.assertEqual(dict(ExamAttempt.objects.values_list('user_id', 'bank')),
+                         {quiz_user.pk: BANK_QUIZ, questions_user.pk: BANK_QUESTIONS})
+        self.assertEqual(rendered_answers(User.objects.get(pk=quiz_user.pk)), QUIZ_PROCESSED)
+        self.assertEqual(rendered_answers(User.objects.get(pk=questions_user.pk)), questions_blob)
+        self.assertEqual(ExamAttempt.objects.get(user=questions_user).marks, 2)
+        self.assertIsNone(rendered_answers(broken_user))
+
+    def test_rerun_skips_copied_users_and_can_clear_blobs(self):
+        user = make_user(0, exam_attempted=True, exam_marks=1, exam_answers=json.dumps(QUIZ_PROCESSED))
+
+        self.backfill('--clear-blobs')
+        self.backfill()
+
+        self.assertEqual(ExamAttempt.objects.count(), 1)
+        self.assertEqual(ExamAnswer.objects.count(), len(QUIZ_PROCESSED))
+        user.refresh_from_db()
+        self.assertEqual(user.exam_answers, '[]')
+        self.assertEqual(json.loads(exam_answers_json(user)), QUIZ_PROCESSED)
+
+
+class RegradeMatchesGradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [Question.objects.create(text=f"Question {i}", options=["a", "b", "c", "d"],
+                                                  correct_answer_index=i % 4) for i in range(10)]
+
+    def test_sql_regrade_matches_python_grading(self):
+        rng = random.Random(7)
+        submissions = {}
+        for n in range(15):
+            user = make_user(n)
+            answers = [
+                {"question_id": question.pk, "selected_option_index": rng.randrange(4)}
+                for question in rng.sample(self.questions, rng.randrange(1, 11))
+            ]
+            self.assertEqual(submit_answers(user.pk, answers)[0], 200)
+            submissions[user.pk] = answers
+
+        # Fix three answers and remove a question, without signals
+        for question in self.questions[:3]:
+            Question.objects.filter(pk=question.pk).update(correct_answer_index=(question.correct_answer_index + 1) % 4)
+        Question.objects.filter(pk=self.questions[9].pk).delete()
+        call_command('regrade_exam', '--bank', BANK_QUESTIONS, stdout=StringIO())
+
+        questions_cache.bank.bump()
+        answer_key = questions_cache.get_answer_key()
+        for user_pk, answers in submissions.items():
+            graded = {
+                answer["question"]["id"]: answer["isCorrect"]
+                for answer in grade_answers(questions_cache.get_report_map(), answer_key, answers)[0]
+            }
+            attempt = ExamAttempt.objects.get(user_id=user_pk)
+            stored = {q_id: is_correct for q_id, is_correct in attempt.answers.filter(
+                outcome__in=(CORRECT, WRONG)).values_list('question_id', 'is_correct')}
+            self.assertEqual(stored, graded)
+            self.assertEqual(attempt.marks, sum(graded.values()))
+            self.assertEqual(User.objects.get(pk=user_pk).exam_marks, attempt.marks)
+
+
+class ItemStatisticsTests(TestCase):
+    # (choice for question 1, choice for question 2); "A" is correct for both
+    SUBMISSIONS = [("A", "A"), ("A", "B"), ("B", "A"), ("C", "C")]
+
+    def submit(self, n, choices):
+        processed = [
+            {"q_id": q_id, "ans": ans, "valid": True, "is_correct": ans == "A"}
+            for q_id, ans in zip((1, 2), choices)
+        ]
+        marks = sum(ans == "A" for ans in choices)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_attempt(make_user(n, exam_attempted=True, exam_marks=marks), BANK_QUIZ, marks, processed)
+
+    def test_counters_are_updated_after_commit(self):
+        processed = [{"q_id": 1, "ans": "A", "valid": True, "is_correct": True}]
+        user = make_user(0, exam_attempted=True)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            record_attempt(user, BANK_QUIZ, 1, processed)
+
+        self.assertFalse(ItemStat.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(BankStat.objects.get(bank=BANK_QUIZ).examinees, 1)
+
+    def test_difficulty_discrimination_and_distribution(self):
+        for n, choices in enumerate(self.SUBMISSIONS):
+            self.submit(n, choices)
+
+        items = stats.item_statistics(BANK_QUIZ)
+
+        totals = [sum(ans == "A" for ans in choices) for choices in self.SUBMISSIONS]
+        for item, column in zip(items, range(2)):
+            right = [float(choices[column] == "A") for choices in self.SUBMISSIONS]
+            self.assertEqual(item["responses"], 4)
+            self.assertEqual(item["difficulty"], 0.5)
+            # Point-biserial is Pearson's r against a dichotomous variable
+            self.assertAlmostEqual(item["discrimination"], statistics.correlation(right, totals), places=4)
+            self.assertEqual(item["choices"], {0: 2, 1: 1, 2: 1})
+
+    def test_rebuild_matches_incremental_counters(self):
+        for n, choices in enumerate(self.SUBMISSIONS):
+            self.submit(n, choices)
+        incremental = stats.item_statistics(BANK_QUIZ)
+        bank_stat = BankStat.objects.values('examinees', 'score_sum', 'score_sq_sum').get(bank=BANK_QUIZ)
+
+        stats.rebuild(BANK_QUIZ)
+
+        self.assertEqual(stats.item_statistics(BANK_QUIZ), incremental)
+        self.assertEqual(BankStat.objects.values('examinees', 'score_sum', 'score_sq_sum').get(bank=BANK_QUIZ),
+                         bank_stat)
+        self.assertEqual(bank_stat, {"examinees": 4, "score_sum": 4, "score_sq_sum": 6})
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ItemStatisticsView
+
+urlpatterns = [
+    path('admin/item-stats/', ItemStatisticsView.as_view(), name='item-stats'),
+]
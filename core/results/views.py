@@ -0,0 +1,22 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import BANK_CHOICES, BANK_QUIZ
+from .stats import item_statistics
+
+
+class ItemStatisticsView(APIView):
+    """
+    GET ?bank=quiz|questions
+    Difficulty, discrimination index and option-choice distribution per question,
+    read from the incrementally maintained counters in results.stats.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        bank = request.query_params.get('bank', BANK_QUIZ)
+        if bank not in dict(BANK_CHOICES):
+            return Response({"error": "Unknown bank."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"bank": bank, "items": item_statistics(bank)}, status=status.HTTP_200_OK)
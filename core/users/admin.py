@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import EmailOutbox, MailCampaign, MailCampaignFailure, User
 
 
 @admin.register(User)
@@ -47,7 +47,7 @@ class UserAdmin(BaseUserAdmin):
             "fields": ("full_name", "whatsapp_number", "student_id")
         }),
         ("Verification", {
-            "fields": ("is_email_verified", "otp")
+            "fields": ("is_email_verified",)
         }),
         ("Exam Information", {
             "fields": ("exam_attempted", "exam_marks", "exam_answers")
@@ -70,3 +70,27 @@ class UserAdmin(BaseUserAdmin):
 
     # Disable editing exam_answers directly (optional but recommended)
     readonly_fields = ("exam_answers", "date_joined", "last_login")
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("to_email", "subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to_email", "subject")
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    list_per_page = 50
+
+
+class MailCampaignFailureInline(admin.TabularInline):
+    model = MailCampaignFailure
+    fields = ("user", "error", "failed_at")
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(MailCampaign)
+class MailCampaignAdmin(admin.ModelAdmin):
+    list_display = ("name", "sent_count", "failed_count", "last_user_id", "started_at", "finished_at")
+    readonly_fields = ("started_at", "updated_at")
+    inlines = (MailCampaignFailureInline,)
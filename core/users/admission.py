@@ -0,0 +1,149 @@
+# users/admission.py
+"""
+Admission control for password hashing.
+
+A PBKDF2 check keeps a worker busy for a long time. A login burst can
+therefore take every worker and starve the cheap exam endpoints. The gate lets
+at most `concurrency` hashes run at once in this process. At most
+`queue_depth` more callers may wait up to `wait_seconds` for a slot. Anything
+beyond that is refused at once with a Retry-After estimate, which the view
+turns into a 429.
+
+Those counts only cover one process, and a deployment of single-request
+instances (Vercel) never has two hashes in one. With a shared cache
+(CACHE_SHARED) the gate also holds one of `shared_slots` site-wide slots,
+each a cache key claimed with add() and leased for SLOT_LEASE_SECONDS so the
+slot of a killed instance frees itself; a caller that finds none free within
+`wait_seconds` is refused the same way. Without a shared cache the limit is
+per process only.
+"""
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Longest a site-wide slot stays claimed by an instance that never releases it
+SLOT_LEASE_SECONDS = 30
+# Pause between scans for a free site-wide slot
+SLOT_POLL_SECONDS = 0.05
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    def __init__(self, concurrency, queue_depth, wait_seconds, shared_slots=0, name="admission"):
+        self.concurrency = max(int(concurrency), 1)
+        self.queue_depth = max(int(queue_depth), 0)
+        self.wait_seconds = wait_seconds
+        self.shared_slots = max(int(shared_slots), 0)
+        self.name = name
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.avg_seconds = 0.0  # Moving average of the time inside the gate
+
+    def _queued(self):
+        # Callers inside admit() that do not hold a slot yet
+        return max(self.running + self.waiting - self.concurrency, 0)
+
+    def _retry_after(self):
+        # Time for the current queue to drain, at least a second
+        per_slot = self.avg_seconds or 1.0
+        return max(math.ceil((self._queued() + 1) / self.concurrency * per_slot), 1)
+
+    def _claim_shared_slot(self, deadline):
+        """
+        Key of the site-wide slot claimed, or None if none was free by `deadline`.
+        """
+        first = random.randrange(self.shared_slots)  # Spread the scans over the slots
+        while True:
+            for n in range(self.shared_slots):
+                key = f"{self.name}:slot:{(first + n) % self.shared_slots}"
+                if cache.add(key, 1, SLOT_LEASE_SECONDS):
+                    return key
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(SLOT_POLL_SECONDS)
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold one hashing slot for the duration of the block, or raise Overloaded.
+        """
+        deadline = time.monotonic() + self.wait_seconds
+        with self._lock:
+            if self.running + self.waiting >= self.concurrency + self.queue_depth:
+                self.rejected += 1
+                raise Overloaded(self._retry_after())
+            self.waiting += 1
+            self.max_queued = max(self.max_queued, self._queued())
+
+        admitted = self._slots.acquire(timeout=self.wait_seconds)
+        with self._lock:
+            self.waiting -= 1
+            if not admitted:
+                self.timed_out += 1
+                raise Overloaded(self._retry_after())
+            self.running += 1
+
+        shared_key = None
+        if self.shared_slots and settings.CACHE_SHARED:
+            shared_key = self._claim_shared_slot(deadline)
+            if shared_key is None:
+                with self._lock:
+                    self.running -= 1
+                    self.timed_out += 1
+                    retry_after = self._retry_after()
+                self._slots.release()
+                raise Overloaded(retry_after)
+        with self._lock:
+            self.admitted += 1
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            if shared_key is not None:
+                cache.delete(shared_key)
+            with self._lock:
+                self.running -= 1
+                self.avg_seconds = elapsed if not self.avg_seconds else 0.8 * self.avg_seconds + 0.2 * elapsed
+            self._slots.release()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "shared_slots": self.shared_slots,
+                "queue_depth": self.queue_depth,
+                "running": self.running,
+                "queued": self._queued(),
+                "max_queued": self.max_queued,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_ms": round(self.avg_seconds * 1000, 1),
+            }
+
+
+login_gate = AdmissionGate(
+    settings.LOGIN_HASH_CONCURRENCY,
+    settings.LOGIN_HASH_QUEUE_DEPTH,
+    settings.LOGIN_HASH_WAIT_SECONDS,
+    shared_slots=settings.LOGIN_HASH_SHARED_CONCURRENCY,
+    name="users:login-gate",
+)
@@ -0,0 +1,27 @@
+# users/async_views.py
+"""
+Native async version of /me/, see quiz.async_views.
+"""
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.throttling import throttled
+from results.answers import aexam_answers_json
+from .authentication import jwt_required
+from .ranking import aranking
+from .serializers import UserDetailSerializer
+
+
+@require_GET
+@jwt_required
+@throttled
+async def user_detail(request):
+    """
+    Async UserDetailView. The answers and ranking are read ahead on the async
+    ORM and cache API, so serializing the snapshot user makes no query.
+    """
+    user = request.user
+    context = {'exam_answers': '[]', 'ranking': None}
+    if user.exam_attempted:
+        context = {'exam_answers': await aexam_answers_json(user), 'ranking': await aranking(user.exam_marks)}
+    return JsonResponse(UserDetailSerializer(user, context=context).data)
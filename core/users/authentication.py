@@ -0,0 +1,148 @@
+# users/authentication.py
+"""
+JWT authentication backed by a cached slim snapshot of the user row.
+
+The token signature proves who the caller is; the fields requests actually
+need (is_active, is_staff, exam_attempted, ...) come from a short-lived cache
+entry, so hot endpoints read no user row at all. The snapshot leaves out the
+potentially large exam_answers column and everything else not listed in
+SNAPSHOT_FIELDS; those are deferred and load from the DB on first access.
+Saving or deleting a User drops its snapshot (users.signals), but only from
+the cache of the process that saved it: with a per-process cache, other
+workers may serve the old snapshot for up to USER_SNAPSHOT_TTL. Endpoints that
+write the user therefore lock and re-read the row instead of trusting
+request.user (the grading modules, questions.views.SubmitExamResultAPIView).
+
+Also provides the same authentication for the async views, which run outside
+DRF's request cycle.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'full_name', 'whatsapp_number', 'student_id', 'date_joined',
+    'is_active', 'is_staff', 'is_superuser', 'is_email_verified', 'exam_attempted', 'exam_marks',
+)
+
+
+def _snapshot_key(user_id):
+    return f"users:snapshot:{user_id}"
+
+
+def _from_snapshot(snapshot):
+    # A regular model instance whose other fields are deferred
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in snapshot]
+    return User.from_db('default', names, [snapshot[name] for name in names])
+
+
+def _load_snapshot(user_id):
+    return User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*SNAPSHOT_FIELDS).first()
+
+
+def get_user_snapshot(user_id):
+    """
+    The user with only SNAPSHOT_FIELDS loaded, from the cache when possible, or None.
+    """
+    key = _snapshot_key(user_id)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _load_snapshot(user_id)
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, settings.USER_SNAPSHOT_TTL)
+    return _from_snapshot(snapshot)
+
+
+async def aget_user_snapshot(user_id):
+    key = _snapshot_key(user_id)
+    snapshot = await cache.aget(key)
+    if snapshot is None:
+        snapshot = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*SNAPSHOT_FIELDS).afirst()
+        if snapshot is None:
+            return None
+        await cache.aset(key, snapshot, settings.USER_SNAPSHOT_TTL)
+    return _from_snapshot(snapshot)
+
+
+def invalidate_user_snapshot(user_id):
+    cache.delete(_snapshot_key(user_id))
+
+
+def invalidate_user_snapshots(user_ids):
+    """
+    For bulk updates, which send no post_save.
+    """
+    cache.delete_many([_snapshot_key(user_id) for user_id in user_ids])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that takes the user from get_user_snapshot() instead of
+    loading the full row on every request.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The revoke claim is checked against the password hash, which is not cached
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_user_snapshot(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+async def aauthenticate(request):
+    """
+    The active user for the request's Bearer access token, or None.
+    Same token checks as CachedJWTAuthentication, with the snapshot read asynchronously.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = auth.get_raw_token(header)
+        if raw_token is None:
+            return None
+        user_id = auth.get_validated_token(raw_token)[api_settings.USER_ID_CLAIM]
+    except (AuthenticationFailed, InvalidToken, TokenError, KeyError):
+        return None
+
+    user = await aget_user_snapshot(user_id)
+    if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+        return None
+    return user
+
+
+def jwt_required(view):
+    """
+    Async counterpart of IsAuthenticated: sets request.user or answers 401 like DRF.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aauthenticate(request)
+        if user is None:
+            response = JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
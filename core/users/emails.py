@@ -1,7 +1,11 @@
+from datetime import timedelta
+
 from django.core.mail import send_mail
 from django.conf import settings
-from .utils import generate_otp
-from .models import User
+from django.db import transaction
+from django.utils import timezone
+from .models import EmailOutbox
+from .otp import PURPOSE_RESET_PASSWORD, PURPOSE_VERIFY_EMAIL, issue_otp
 
 
 from django.core.mail import EmailMultiAlternatives
@@ -33,7 +37,7 @@ def build_otp_email(otp, purpose):
             </span>
           </div>
           
-          <p style="margin: 0 0 8px;">This OTP is valid for the next <strong>10 minutes</strong>. Please do not share it with anyone.</p>
+          <p style="margin: 0 0 8px;">This OTP is valid for the next <strong>{settings.OTP_TTL_SECONDS // 60} minutes</strong>. Please do not share it with anyone.</p>
           <p style="margin: 0;">If you didn’t request this, you can safely ignore this email.</p>
         </div>
         
@@ -51,43 +55,139 @@ def build_otp_email(otp, purpose):
 
 
 
-def send_otp_via_email(email):
-    subject = "Verify Your Email – Self Made Dev"
-    otp = generate_otp()
-    html_content = build_otp_email(otp, "Email Verification")
-    text_content = strip_tags(html_content)
+def build_results_email(full_name, marks, total):
+    return f"""
+    <div style="font-family: 'Segoe UI', Arial, sans-serif; background-color: #f7f7f7; padding: 30px;">
+      <div style="max-width: 600px; margin: auto; background: #ffffff; border-radius: 10px; overflow: hidden; box-shadow: 0 2px 10px rgba(0,0,0,0.08);">
+        
+        <!-- Header -->
+        <div style="background-color: #245F73; color: white; padding: 22px 30px;">
+          <h2 style="margin: 0; font-weight: 600;">Self Made Dev</h2>
+          <p style="margin: 0; font-size: 14px;">Preliminary Exam Portal by Byteblooper</p>
+        </div>
+        
+        <!-- Body -->
+        <div style="padding: 28px 30px; color: #333333;">
+          <h3 style="margin-bottom: 10px; color: #111827;">Preliminary Exam Results</h3>
+          <p style="margin: 0 0 10px;">Hi {full_name},</p>
+          <p style="margin: 0 0 18px;">The results of the preliminary exam have been published. Your score is:</p>
+          
+          <div style="text-align: center; margin: 24px 0;">
+            <span style="display: inline-block; background: #245F73; color: #ffffff; padding: 12px 24px; font-size: 22px; font-weight: 700; letter-spacing: 1px; border-radius: 8px;">
+              {marks} / {total}
+            </span>
+          </div>
+          
+          <p style="margin: 0;">Thank you for taking part. You can review your answers on your profile page.</p>
+        </div>
+        
+        <!-- Footer -->
+        <div style="background: #f1f5f9; border-top: 3px solid #245F73; text-align: center; padding: 15px; font-size: 12px; color: #6b7280;">
+          © 2025 <strong>ByteBlooper</strong> | All rights reserved.
+        </div>
+      </div>
+    </div>
+    """
+
+
+def queue_email(to_email, subject, html_content):
+    """
+    Store an email in the outbox. Delivery happens in the `send_outbox`
+    command, so the caller never waits on SMTP.
+    """
+    return EmailOutbox.objects.create(
+        to_email=to_email,
+        subject=subject,
+        text_body=strip_tags(html_content),
+        html_body=html_content,
+    )
 
-    try:
-        msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [email])
-        msg.attach_alternative(html_content, "text/html")
-        msg.send()
 
-        user = User.objects.get(email=email)
-        user.otp = otp
-        user.save()
+# A failed send waits RETRY_BASE_SECONDS * 2 ** (attempts - 1), at most
+# RETRY_MAX_SECONDS, before it is tried again
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 60 * 60
+# A claimed email whose worker died before recording the result is claimed
+# again after this long
+CLAIM_SECONDS = 10 * 60
 
-        return otp
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return None
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def claim_outbox_batch(batch_size):
+    """
+    Mark up to `batch_size` due emails as sending and return them. The rows are
+    locked (SKIP LOCKED, so several workers can drain the outbox side by side)
+    only for this short transaction, never while SMTP runs.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=(EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING), next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for item in batch:
+            item.status = EmailOutbox.STATUS_SENDING
+            item.attempts += 1
+            item.next_attempt_at = now + timedelta(seconds=CLAIM_SECONDS)
+        EmailOutbox.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at'])
+    return batch
+
+
+def send_outbox_batch(connection, batch_size=100, max_attempts=5):
+    """
+    Deliver up to `batch_size` due outbox emails over `connection`, keeping it
+    open for the next batch. A failed email is retried with exponential
+    backoff until it has had `max_attempts`. Returns (sent, failed).
+    """
+    batch = claim_outbox_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    # Opened here so the backend keeps the session across messages instead of
+    # reconnecting for each send()
+    connection.open()
+    for item in batch:
+        msg = EmailMultiAlternatives(
+            item.subject, item.text_body, settings.DEFAULT_FROM_EMAIL, [item.to_email],
+            connection=connection,
+        )
+        if item.html_body:
+            msg.attach_alternative(item.html_body, "text/html")
+
+        try:
+            msg.send()
+        except Exception as e:
+            item.last_error = str(e)
+            # The session may be broken; drop it so the next send reconnects
+            connection.close()
+            if item.attempts >= max_attempts:
+                item.status = EmailOutbox.STATUS_FAILED
+            else:
+                item.status = EmailOutbox.STATUS_PENDING
+                item.next_attempt_at = timezone.now() + retry_delay(item.attempts)
+            failed += 1
+        else:
+            item.status = EmailOutbox.STATUS_SENT
+            item.sent_at = timezone.now()
+            item.last_error = ''
+            sent += 1
+
+    EmailOutbox.objects.bulk_update(batch, ['status', 'last_error', 'next_attempt_at', 'sent_at'])
+    return sent, failed
+
+
+def send_otp_via_email(email):
+    otp = issue_otp(email, PURPOSE_VERIFY_EMAIL)
+    queue_email(email, "Verify Your Email – Self Made Dev", build_otp_email(otp, "Email Verification"))
+    return otp
 
 
 def send_otp_via_email_forgot_password(email):
-    subject = "Password Reset – Self Made Dev"
-    otp = generate_otp()
-    html_content = build_otp_email(otp, "Password Reset Request")
-    text_content = strip_tags(html_content)
-
-    try:
-        msg = EmailMultiAlternatives(subject, text_content, settings.DEFAULT_FROM_EMAIL, [email])
-        msg.attach_alternative(html_content, "text/html")
-        msg.send()
-
-        user = User.objects.get(email=email)
-        user.otp = otp
-        user.save()
-
-        return otp
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        return None
+    otp = issue_otp(email, PURPOSE_RESET_PASSWORD)
+    queue_email(email, "Password Reset – Self Made Dev", build_otp_email(otp, "Password Reset Request"))
+    return otp
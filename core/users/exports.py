@@ -0,0 +1,84 @@
+"""
+Streaming exports of exam results.
+
+Users are read with a server-side cursor, their answers prefetched per chunk,
+and encoded in small batches, so an export of every examinee runs in constant
+memory and the first bytes go out before the whole table has been read.
+"""
+import csv
+import json
+
+from questions.cache import get_report_map
+from results.answers import rendered_answers
+from results.models import BANK_QUESTIONS
+from .models import User
+
+FIELDS = ('id', 'email', 'full_name', 'student_id', 'whatsapp_number', 'exam_attempted', 'exam_marks', 'exam_answers')
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def _decode_answers(raw):
+    try:
+        return json.loads(raw or '[]')
+    except ValueError:
+        # Keep the raw text rather than dropping a malformed blob
+        return raw
+
+
+def export_rows(attempted_only=False, chunk_size=2000):
+    # Answers come from results.ExamAnswer, prefetched once per chunk
+    users = User.objects.only(*FIELDS).prefetch_related('exam_attempts__answers').order_by('pk')
+    if attempted_only:
+        users = users.filter(exam_attempted=True)
+    report_map = None
+    for n, user in enumerate(users.iterator(chunk_size=chunk_size)):
+        if n % chunk_size == 0:
+            # The questions bank's report map is read at most once per chunk
+            report_map = None
+        if report_map is None and any(attempt.bank == BANK_QUESTIONS for attempt in user.exam_attempts.all()):
+            report_map = get_report_map()
+        row = {field: getattr(user, field) for field in FIELDS}
+        answers = rendered_answers(user, report_map)
+        row['exam_answers'] = _decode_answers(user.exam_answers) if answers is None else answers
+        yield row
+
+
+def _batched(lines, batch_size=200):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        row['exam_answers'] = json.dumps(row['exam_answers'], ensure_ascii=False)
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def stream_export(output, attempted_only=False):
+    """
+    Yield the export as text chunks; `output` is one of FORMATS.
+    """
+    rows = export_rows(attempted_only)
+    lines = _csv_lines(rows) if output == 'csv' else _ndjson_lines(rows)
+    return _batched(lines)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from users.exports import FORMATS, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream users, marks and decoded exam answers as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=FORMATS, default='csv')
+        parser.add_argument('--attempted', action='store_true', help="Only export users who attempted the exam.")
+        parser.add_argument('-o', '--file', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        chunks = stream_export(options['output'], attempted_only=options['attempted'])
+        if options['file']:
+            with open(options['file'], 'w', encoding='utf-8', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,114 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+
+from core.answer_key import CORRECT, NO_CHOICE, NO_CORRECT_ANSWER, QUESTION_NOT_FOUND, WRONG
+from questions import cache as questions_cache
+from quiz import cache as quiz_cache
+from results import stats
+from results.models import ANSWER_IS_NULL, BANK_QUESTIONS, BANK_QUIZ, ExamAnswer, ExamAttempt
+from users import ranking
+from users.authentication import invalidate_user_snapshots
+from users.models import User
+
+BANKS = {
+    BANK_QUIZ: quiz_cache,
+    BANK_QUESTIONS: questions_cache,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescore every attempt against the current answer key. Answer outcomes "
+        "are fixed with one indexed UPDATE per question that only touches rows "
+        "whose result changes; marks are then recounted in chunks of attempts, "
+        "each chunk in its own short transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bank', choices=sorted(BANKS), default=BANK_QUIZ,
+                            help="Which question bank to regrade.")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only count the answers whose result would change.")
+
+    def handle(self, *args, **options):
+        bank = options['bank']
+        dry_run = options['dry_run']
+
+        legacy = User.objects.filter(exam_attempted=True).exclude(
+            Exists(ExamAttempt.objects.filter(user=OuterRef('pk')))
+        ).count()
+        if legacy:
+            self.stderr.write(f"{legacy} attempted users have no answer rows yet; run backfill_exam_answers first.")
+
+        # Start from a fresh key even if it was corrected with queryset.update()
+        bank_cache = BANKS[bank]
+        bank_cache.bank.bump()
+        answer_key = bank_cache.get_answer_key()
+
+        flipped = self.regrade_answers(bank, answer_key, dry_run)
+        verb = "would change" if dry_run else "changed"
+        self.stdout.write(f"{flipped} answers {verb}")
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS("Marks are unchanged."))
+            return
+
+        # Recounted even when no answer flipped: a run that stopped after the
+        # flips left the marks stale, and only attempts that differ are written
+        changed = self.recount_marks(bank, options['chunk_size'])
+        ranking.rebuild()
+        stats.rebuild(bank)
+        self.stdout.write(self.style.SUCCESS(f"Regraded the {bank} bank: marks changed for {changed} users."))
+
+    def regrade_answers(self, bank, answer_key, dry_run):
+        def apply(rows, outcome, is_correct):
+            rows = rows.exclude(outcome=outcome)
+            return rows.count() if dry_run else rows.update(outcome=outcome, is_correct=is_correct)
+
+        # QUESTION_NOT_FOUND rows stay so: they include answers to questions the
+        # examinee was not drawn, which still carry a real question id
+        graded = ExamAnswer.objects.filter(bank=bank).exclude(outcome__in=(ANSWER_IS_NULL, QUESTION_NOT_FOUND))
+        flipped = apply(graded.exclude(question_id__in=list(answer_key.question_ids)), QUESTION_NOT_FOUND, False)
+        for question_id, correct in zip(answer_key.question_ids, answer_key.choices):
+            rows = graded.filter(question_id=question_id)
+            if correct == NO_CHOICE:
+                flipped += apply(rows, NO_CORRECT_ANSWER, False)
+            else:
+                flipped += apply(rows.filter(choice=correct), CORRECT, True)
+                flipped += apply(rows.exclude(choice=correct), WRONG, False)
+        return flipped
+
+    def recount_marks(self, bank, chunk_size):
+        attempts = (
+            ExamAttempt.objects.filter(bank=bank)
+            .annotate(correct=Count('answers', filter=Q(answers__is_correct=True)))
+            .order_by('pk')
+        )
+        last_pk = seen = changed = 0
+        started = time.monotonic()
+        while True:
+            chunk = list(
+                attempts.filter(pk__gt=last_pk).values_list('pk', 'user_id', 'marks', 'correct')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+
+            updates = [(pk, user_id, correct) for pk, user_id, marks, correct in chunk if marks != correct]
+            if updates:
+                with transaction.atomic():
+                    ExamAttempt.objects.bulk_update(
+                        [ExamAttempt(pk=pk, marks=correct) for pk, _, correct in updates], ['marks']
+                    )
+                    User.objects.bulk_update(
+                        [User(pk=user_id, exam_marks=correct) for _, user_id, correct in updates], ['exam_marks']
+                    )
+                invalidate_user_snapshots(user_id for _, user_id, _ in updates)
+
+            seen += len(chunk)
+            changed += len(updates)
+            self.stdout.write(f"{seen} attempts recounted, {changed} changed ({time.monotonic() - started:.1f}s)")
+        return changed
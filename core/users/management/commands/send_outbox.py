@@ -0,0 +1,54 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.emails import send_outbox_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver pending emails from the outbox in batches over a single "
+        "reused SMTP connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help="Mark an email as failed after this many attempts.")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new emails instead of exiting once the outbox is empty.")
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help="Seconds to sleep between polls when the outbox is empty (with --loop).")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        connection = get_connection()
+        try:
+            while True:
+                try:
+                    sent, failed = send_outbox_batch(connection, options['batch_size'], options['max_attempts'])
+                except OSError as e:
+                    # smtplib errors are OSErrors; the server is unreachable, so retry later
+                    if not options['loop']:
+                        raise
+                    self.stderr.write(f"Mail server unavailable: {e}")
+                    connection.close()
+                    time.sleep(options['interval'])
+                    continue
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent}, failed {failed}")
+                if sent:
+                    continue
+                if not options['loop']:
+                    break
+                # Nothing sent: the outbox is empty or the server is failing.
+                # Don't hold an idle SMTP session open between polls
+                connection.close()
+                time.sleep(options['interval'])
+        finally:
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Outbox drained: {total_sent} sent, {total_failed} failed."))
@@ -0,0 +1,173 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+
+from quiz.cache import get_answer_key
+from results import sessions
+from results.models import BANK_QUIZ, ExamSession
+from users.emails import build_results_email
+from users.models import MailCampaign, MailCampaignFailure, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Email every examinee their exam_marks. Recipients are read in chunks in "
+        "primary-key order and sent over a small pool of persistent SMTP "
+        "connections. Progress is checkpointed after every chunk, so rerunning "
+        "with the same campaign name resumes where a crashed run stopped. "
+        "Recipients that could not be emailed are recorded on the campaign and "
+        "retried with --retry-failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign', help="Checkpoint name; rerun with the same name to resume.")
+        parser.add_argument('--subject', default="Your Preliminary Exam Results – Self Made Dev")
+        parser.add_argument('--total', type=int,
+                            help="Total marks shown in the email (defaults to the number of questions "
+                                 "drawn for each examinee's session, or the size of the quiz bank).")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--connections', type=int, default=4,
+                            help="Number of SMTP connections used in parallel.")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Only resend to the recipients this campaign failed to email.")
+
+    def handle(self, *args, **options):
+        campaign, _ = MailCampaign.objects.get_or_create(name=options['campaign'])
+        retry = options['retry_failed']
+        if campaign.finished_at and not retry:
+            self.stdout.write(f"Campaign '{campaign}' already finished at {campaign.finished_at}.")
+            return
+
+        subject = options['subject']
+        # Render once, substitute per recipient
+        html_template = Template(build_results_email("$full_name", "$marks", "$total"))
+        text_template = Template(strip_tags(html_template.template))
+
+        pool_totals = {}
+
+        def total_for(pool_id):
+            if options['total'] is not None:
+                return options['total']
+            if pool_id not in pool_totals:
+                # Without a session the whole bank was graded
+                pool_totals[pool_id] = (
+                    len(get_answer_key()) if pool_id is None else sessions.drawn_count(sessions.get_pool(pool_id))
+                )
+            return pool_totals[pool_id]
+
+        local = threading.local()
+        connections = []
+        connections_lock = threading.Lock()
+
+        def thread_connection():
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = local.connection = get_connection()
+                with connections_lock:
+                    connections.append(connection)
+            return connection
+
+        def send(recipients):
+            connection = thread_connection()
+            sent, failed = [], []
+            for user_pk, email, full_name, marks, total in recipients:
+                msg = EmailMultiAlternatives(
+                    subject,
+                    text_template.substitute(full_name=full_name, marks=marks, total=total),
+                    settings.DEFAULT_FROM_EMAIL,
+                    [email],
+                    connection=connection,
+                )
+                msg.attach_alternative(
+                    html_template.substitute(full_name=escape(full_name), marks=marks, total=total), "text/html",
+                )
+                try:
+                    # No-op while the session is alive; reconnects after a failure
+                    connection.open()
+                    msg.send()
+                    sent.append(user_pk)
+                except Exception as e:
+                    failed.append((user_pk, email, str(e)))
+                    connection.close()
+            return sent, failed
+
+        pool_size = max(1, options['connections'])
+        chunk_size = options['chunk_size']
+        recipients = User.objects.filter(exam_attempted=True)
+        if retry:
+            recipients = recipients.filter(pk__in=campaign.failures.values('user_id'))
+        recipients = recipients.annotate(
+            pool_id=Subquery(ExamSession.objects.filter(user=OuterRef('pk'), bank=BANK_QUIZ).values('pool_id')[:1]),
+        ).order_by('pk')
+        last_pk = 0 if retry else campaign.last_user_id
+        started = time.monotonic()
+
+        try:
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                while True:
+                    chunk = list(
+                        recipients.filter(pk__gt=last_pk)
+                        .values_list('pk', 'email', 'full_name', 'exam_marks', 'pool_id')[:chunk_size]
+                    )
+                    if not chunk:
+                        break
+
+                    rows = [(pk, email, full_name, marks, total_for(pool_id))
+                            for pk, email, full_name, marks, pool_id in chunk]
+                    slices = [rows[i::pool_size] for i in range(pool_size)]
+                    sent, failed = [], []
+                    for slice_sent, slice_failed in executor.map(send, slices):
+                        sent.extend(slice_sent)
+                        failed.extend(slice_failed)
+                    for _, email, error in failed:
+                        self.stderr.write(f"Failed to send to {email}: {error}")
+
+                    last_pk = chunk[-1][0]
+                    self.record(campaign, sent, failed, retry, last_pk)
+                    self.stdout.write(
+                        f"{campaign.sent_count} sent, {campaign.failed_count} failed "
+                        f"({time.monotonic() - started:.1f}s)"
+                    )
+        finally:
+            for connection in connections:
+                connection.close()
+
+        if not retry:
+            campaign.finished_at = timezone.now()
+            campaign.save(update_fields=['finished_at', 'updated_at'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Campaign '{campaign}' {'retried' if retry else 'finished'}: "
+            f"{campaign.sent_count} sent, {campaign.failed_count} failed."
+        ))
+
+    def record(self, campaign, sent, failed, retry, last_pk):
+        """
+        Checkpoint one chunk: counters, the failures to retry later and, on
+        the first pass, the last recipient processed.
+        """
+        now = timezone.now()
+        campaign.sent_count += len(sent)
+        if retry:
+            # Already counted as failed by the first pass
+            campaign.failed_count -= len(sent)
+        else:
+            campaign.failed_count += len(failed)
+            campaign.last_user_id = last_pk
+        with transaction.atomic():
+            MailCampaignFailure.objects.bulk_create(
+                [MailCampaignFailure(campaign=campaign, user_id=user_pk, error=error, failed_at=now)
+                 for user_pk, _, error in failed],
+                update_conflicts=True, unique_fields=['campaign', 'user'], update_fields=['error', 'failed_at'],
+            )
+            if retry:
+                campaign.failures.filter(user_id__in=sent).delete()
+            campaign.save(update_fields=['last_user_id', 'sent_count', 'failed_count', 'updated_at'])
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 import re
 from uuid import uuid4
 
@@ -66,7 +67,6 @@ class User(AbstractBaseUser, PermissionsMixin):
     full_name = models.CharField(max_length=100, blank=False, null=False)
     whatsapp_number = models.CharField(max_length=20, blank=False, null=False)
     student_id = models.CharField(max_length=50, blank=False, null=False)
-    otp = models.CharField(max_length=6, blank=True, null=True)
     date_joined = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False) 
@@ -104,4 +104,81 @@ class User(AbstractBaseUser, PermissionsMixin):
             models.Index(fields=['is_active', 'is_email_verified']),
             models.Index(fields=['date_joined']),
             models.Index(fields=['exam_attempted', 'exam_marks']), # Added index for exam stats
-        ]
\ No newline at end of file
+        ]
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email queued by a request and delivered later by the
+    `send_outbox` management command.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    # Earliest time a worker may claim the email: pushed back after a failed
+    # send, and by the claim itself so a crashed worker's emails are retried
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email}"
+
+    class Meta:
+        verbose_name = 'Outgoing email'
+        verbose_name_plural = 'Email outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']), # Worker picks due rows, oldest first
+        ]
+
+
+class MailCampaign(models.Model):
+    """
+    Checkpoint of a bulk mailing run (see the `send_results` command).
+    Recipients are processed in primary-key order, so `last_user_id` is enough
+    to resume after a crash without resending earlier messages.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_user_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MailCampaignFailure(models.Model):
+    """
+    A recipient a MailCampaign could not email. The checkpoint moves past
+    them, so they are only retried by `send_results --retry-failed`.
+    """
+    campaign = models.ForeignKey(MailCampaign, on_delete=models.CASCADE, related_name='failures')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    error = models.TextField(blank=True, default='')
+    failed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.campaign}: {self.user}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'user'], name='unique_failure_per_campaign'),
+        ]
@@ -0,0 +1,151 @@
+"""
+One-time passwords kept in the Django cache.
+
+Each OTP lives under its own key with a native TTL, next to a counter of
+attempts, so issuing or checking one never touches the User row. The cache
+holds the only copy, so it must be shared by every worker
+(core.shared_cache): otherwise an OTP issued by one worker is missing on the
+next.
+
+With Redis (REDIS_URL) an OTP and its attempt counter are one hash, and a
+check is a single Lua script: count the attempt, compare and consume in one
+atomic round trip. Any other cache gets LocalOtpStore, which does the same
+with add/incr/get/delete and is what the tests use.
+"""
+import hashlib
+import hmac
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+
+from core.shared_cache import cache_backend, require_shared_cache
+from .utils import generate_otp
+
+PURPOSE_VERIFY_EMAIL = 'verify'
+PURPOSE_RESET_PASSWORD = 'reset'
+
+OTP_VALID = 'valid'
+OTP_INVALID = 'invalid'
+OTP_EXPIRED = 'expired'
+
+# KEYS: the OTP's hash
+# ARGV: max attempts, digest of the guess
+# Digests are compared, so the comparison time says nothing about the OTP
+CHECK_OTP_LUA = """
+local expected = redis.call('HGET', KEYS[1], 'digest')
+if not expected then
+    return 0
+end
+if redis.call('HINCRBY', KEYS[1], 'attempts', 1) > tonumber(ARGV[1]) then
+    return 0
+end
+if expected ~= ARGV[2] then
+    return 1
+end
+redis.call('DEL', KEYS[1])
+return 2
+"""
+_LUA_RESULTS = (OTP_EXPIRED, OTP_INVALID, OTP_VALID)
+
+
+def _keys(email, purpose):
+    base = f"otp:{purpose}:{email.strip().lower()}"
+    return base, f"{base}:attempts"
+
+
+def _digest(otp):
+    return hashlib.sha256(str(otp).encode()).hexdigest()
+
+
+class RedisOtpStore:
+    def __init__(self, cache):
+        self.cache = cache
+        self._script = None
+
+    def _client(self):
+        return self.cache._cache.get_client(write=True)
+
+    def issue(self, email, purpose, otp):
+        key = self.cache.make_and_validate_key(_keys(email, purpose)[0])
+        pipe = self._client().pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={'digest': _digest(otp), 'attempts': 0})
+        pipe.expire(key, settings.OTP_TTL_SECONDS)
+        pipe.execute()
+
+    def check(self, email, purpose, otp):
+        client = self._client()
+        if self._script is None:
+            self._script = client.register_script(CHECK_OTP_LUA)
+        result = self._script(
+            keys=[self.cache.make_and_validate_key(_keys(email, purpose)[0])],
+            args=[settings.OTP_MAX_ATTEMPTS, _digest(otp)],
+            client=client,
+        )
+        return _LUA_RESULTS[int(result)]
+
+
+class LocalOtpStore:
+    """
+    Same contract on the Django cache API.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def issue(self, email, purpose, otp):
+        otp_key, attempts_key = _keys(email, purpose)
+        self.cache.set_many({otp_key: otp, attempts_key: 0}, settings.OTP_TTL_SECONDS)
+
+    def check(self, email, purpose, otp):
+        # The attempt is counted with an atomic increment before comparing, so
+        # parallel guesses each see their own count and OTP_MAX_ATTEMPTS holds
+        otp_key, attempts_key = _keys(email, purpose)
+        self.cache.add(attempts_key, 0, settings.OTP_TTL_SECONDS)
+        try:
+            attempts = self.cache.incr(attempts_key)
+        except ValueError:
+            # The counter expired between the two calls
+            return OTP_EXPIRED
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            return OTP_EXPIRED
+
+        expected = self.cache.get(otp_key)
+        if expected is None:
+            return OTP_EXPIRED
+        if not hmac.compare_digest(str(expected), str(otp)):
+            return OTP_INVALID
+        # Only one of two parallel correct guesses deletes the OTP
+        if not self.cache.delete(otp_key):
+            return OTP_EXPIRED
+        self.cache.delete(attempts_key)
+        return OTP_VALID
+
+
+_redis_store = RedisOtpStore(cache)
+_local_store = LocalOtpStore(cache)
+
+
+def _store():
+    # `cache` is a proxy: the check needs the backend configured behind it
+    return _redis_store if isinstance(cache_backend(cache), RedisCache) else _local_store
+
+
+def issue_otp(email, purpose):
+    """
+    Generate a new OTP for `email`, replacing any previous one for the same purpose.
+    """
+    require_shared_cache("One-time passwords")
+    otp = generate_otp()
+    _store().issue(email, purpose, otp)
+    return otp
+
+
+def check_otp(email, purpose, otp):
+    """
+    Return OTP_VALID (and consume the OTP), OTP_INVALID, or OTP_EXPIRED when
+    there is no live OTP or it has used up its attempts.
+    """
+    require_shared_cache("One-time passwords")
+    return _store().check(email, purpose, otp)
@@ -0,0 +1,229 @@
+"""
+Exam rankings kept as a Fenwick (binary indexed) tree of mark counts in the cache.
+
+Node i of the tree holds the number of attempted users in a range of mark
+values, so recording a score touches O(log M) counters and any
+"how many users scored at most m" query reads O(log M) counters in a single
+get_many, M being RANKING_MAX_MARKS.
+
+Each build of the tree is a generation: its counters live under their own
+keys and only become live when GENERATION_KEY points at them, so a rebuild
+never overwrites counters that record_score() is incrementing. Builds are
+serialized by a lock, and the live generation expires after
+RANKING_TTL_SECONDS, after which the next read rebuilds it from the
+(exam_attempted, exam_marks) index. That bounds any drift: a worker with a
+local-memory cache only sees its own record_score() calls, and a score
+committed while a build was running may be missing from it, but both are
+corrected by the next build.
+
+`arankings()` reads the tree with the async cache API, for the async views.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import User
+
+GENERATION_KEY = "users:rank:generation"
+BUILDING_KEY = "users:rank:building"
+LOCK_KEY = "users:rank:lock"
+# Longest a build may hold the lock
+LOCK_TIMEOUT = 60
+# Lifetime of a generation that may have missed scores recorded during its build
+DIRTY_TTL = 5
+
+
+def _size():
+    return settings.RANKING_MAX_MARKS + 1
+
+
+def _index(marks):
+    # Marks 0..MAX live at tree positions 1..MAX+1
+    return min(max(int(marks), 0), settings.RANKING_MAX_MARKS) + 1
+
+
+def _node(generation, i):
+    return f"users:rank:{generation}:node:{i}"
+
+
+def _total(generation):
+    return f"users:rank:{generation}:total"
+
+
+def _dirty(generation):
+    return f"users:rank:{generation}:dirty"
+
+
+def _prefix_nodes(i):
+    nodes = []
+    while i > 0:
+        nodes.append(i)
+        i -= i & -i
+    return nodes
+
+
+def build_tree(counts):
+    """
+    Fenwick tree (index 0 unused) and total from (marks, users) pairs.
+    """
+    size = _size()
+    tree = [0] * (size + 1)
+    total = 0
+    for marks, users in counts:
+        tree[_index(marks)] += users
+        total += users
+    # Linear-time Fenwick construction
+    for i in range(1, size + 1):
+        parent = i + (i & -i)
+        if parent <= size:
+            tree[parent] += tree[i]
+    return tree, total
+
+
+def rebuild():
+    """
+    Recompute the tree from the users table and return (tree, total). The
+    result is published as a new generation unless another build holds the
+    lock, in which case it is only returned.
+    """
+    generation = time.time_ns()
+    publish = cache.add(LOCK_KEY, generation, LOCK_TIMEOUT)
+    if publish:
+        # Set before the snapshot below, so record_score() can tell a build is running
+        cache.set(BUILDING_KEY, generation, LOCK_TIMEOUT)
+
+    tree, total = build_tree(
+        User.objects.filter(exam_attempted=True)
+        .values_list('exam_marks')
+        .annotate(users=Count('id'))
+        .order_by()
+    )
+    if not publish:
+        return tree, total
+
+    ttl = settings.RANKING_TTL_SECONDS
+    values = {_node(generation, i): tree[i] for i in range(1, len(tree))}
+    values[_total(generation)] = total
+    # Counters outlive the generation key, so a reader never finds it half expired
+    cache.set_many(values, ttl + LOCK_TIMEOUT)
+    cache.set(GENERATION_KEY, generation, ttl)
+    cache.delete_many([BUILDING_KEY, LOCK_KEY])
+    if cache.get(_dirty(generation)):
+        # A score was recorded during the build and may have been committed
+        # after its snapshot: serve this tree only until a quick rebuild
+        cache.touch(GENERATION_KEY, DIRTY_TTL)
+    return tree, total
+
+
+def record_score(marks):
+    """
+    Count one more attempted user with `marks`. Call after the marks are committed.
+    """
+    state = cache.get_many([GENERATION_KEY, BUILDING_KEY])
+    building = state.get(BUILDING_KEY)
+    if building is not None:
+        cache.set(_dirty(building), 1, LOCK_TIMEOUT)
+    generation = state.get(GENERATION_KEY)
+    if generation is None:
+        # The next read rebuilds from the table, which already has this user
+        return
+    size = _size()
+    i = _index(marks)
+    try:
+        cache.incr(_total(generation))
+        while i <= size:
+            cache.incr(_node(generation, i))
+            i += i & -i
+    except ValueError:
+        # A counter was evicted, the tree can't be trusted any more
+        cache.delete(GENERATION_KEY)
+
+
+def _needed_keys(generation, marks_values):
+    nodes = set()
+    for marks in marks_values:
+        i = _index(marks)
+        nodes.update(_prefix_nodes(i) + _prefix_nodes(i - 1))
+    return [_node(generation, n) for n in nodes] + [_total(generation)]
+
+
+def _read_stored(generation, needed, stored):
+    if len(stored) != len(needed):
+        return None
+
+    def at_most(i):
+        return sum(stored[_node(generation, n)] for n in _prefix_nodes(i))
+
+    return at_most, stored[_total(generation)]
+
+
+def _stored_tree(marks_values):
+    """
+    (at_most, total) read from the live generation, or None when there is
+    none or any counter needed is missing.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        return None
+    needed = _needed_keys(generation, marks_values)
+    return _read_stored(generation, needed, cache.get_many(needed))
+
+
+async def _astored_tree(marks_values):
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        return None
+    needed = _needed_keys(generation, marks_values)
+    return _read_stored(generation, needed, await cache.aget_many(needed))
+
+
+def _rebuilt_tree():
+    tree, total = rebuild()
+
+    def at_most(i):
+        return sum(tree[n] for n in _prefix_nodes(i))
+
+    return at_most, total
+
+
+def rankings(marks_values):
+    """
+    Map each of `marks_values` to {"rank", "percentile", "out_of"}.
+    Rank is 1 + the number of users with strictly more marks; percentile is the
+    share of users below, counting ties as half.
+    """
+    marks_values = set(marks_values)
+    at_most, total = _stored_tree(marks_values) or _rebuilt_tree()
+    return _rank(marks_values, at_most, total)
+
+
+async def arankings(marks_values):
+    marks_values = set(marks_values)
+    # Only a missing tree is rebuilt, from the users table
+    at_most, total = await _astored_tree(marks_values) or await sync_to_async(_rebuilt_tree)()
+    return _rank(marks_values, at_most, total)
+
+
+def _rank(marks_values, at_most, total):
+    result = {}
+    for marks in marks_values:
+        i = _index(marks)
+        at_or_below, below = at_most(i), at_most(i - 1)
+        equal = at_or_below - below
+        result[marks] = {
+            "rank": total - at_or_below + 1,
+            "percentile": round(100 * (below + equal / 2) / total, 2) if total else None,
+            "out_of": total,
+        }
+    return result
+
+
+def ranking(marks):
+    return rankings([marks])[marks]
+
+
+async def aranking(marks):
+    return (await arankings([marks]))[marks]
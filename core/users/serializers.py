@@ -1,4 +1,6 @@
 from .models import User
+from .ranking import ranking
+from results.answers import exam_answers_json
 from rest_framework import serializers
 
 
@@ -22,6 +24,28 @@ class RegisterSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 class UserDetailSerializer(serializers.ModelSerializer):
+    exam_answers = serializers.SerializerMethodField()
+    ranking = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ('id', 'email', 'full_name', 'whatsapp_number', 'student_id', 'exam_attempted', 'exam_answers', 'exam_marks')
+        fields = ('id', 'email', 'full_name', 'whatsapp_number', 'student_id', 'exam_attempted', 'exam_answers', 'exam_marks', 'ranking')
+
+    def get_exam_answers(self, obj):
+        if 'exam_answers' in self.context:
+            # Read ahead by users.async_views
+            return self.context['exam_answers']
+        if not obj.exam_attempted:
+            # Nothing stored yet; skips loading the deferred column of a snapshot user
+            return '[]'
+        # Rebuilt from results.ExamAnswer rows, still as a JSON string for the frontend
+        return exam_answers_json(obj)
+
+    def get_ranking(self, obj):
+        # {"rank", "percentile", "out_of"} from the cached ranking tree, no COUNT query
+        if 'ranking' in self.context:
+            return self.context['ranking']
+        if not obj.exam_attempted:
+            return None
+        return ranking(obj.exam_marks)
+
@@ -0,0 +1,16 @@
+# users/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user_snapshot
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_user_snapshot(sender, instance, **kwargs):
+    # Drop it now and again after commit, so a request racing the transaction
+    # can't re-cache the old row for the whole TTL
+    invalidate_user_snapshot(instance.pk)
+    transaction.on_commit(lambda: invalidate_user_snapshot(instance.pk))
@@ -1,3 +1,716 @@
-from django.test import TestCase
+import csv
+import json
+import re
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.answer_key import CORRECT
+from core.throttling import LocalSlidingWindow, OtpThrottle, RedisSlidingWindow, backend_for
+from questions.models import Question
+from quiz.models import QuizQuestion
+from results.models import BANK_QUESTIONS, BANK_QUIZ, ExamAnswer, ExamAttempt, ItemStat
+from . import exports, ranking
+from . import otp as otp_store
+from .admission import AdmissionGate, Overloaded
+from .authentication import get_user_snapshot
+from .models import EmailOutbox, MailCampaign, User
+from .otp import OTP_EXPIRED, OTP_INVALID, OTP_VALID, PURPOSE_VERIFY_EMAIL, check_otp, issue_otp
+from .tokens import RefreshToken, blacklist_filter
+
+
+@override_settings(CACHE_SHARED=True)
+class EmailOutboxTests(TestCase):
+    """
+    The test runner swaps in Django's locmem email backend, so delivered
+    messages land in mail.outbox.
+    """
+
+    def register(self, email="examinee@diu.edu.bd"):
+        return APIClient().post('/api/users/register/', {
+            "email": email,
+            "password": "s3cret-pass",
+            "full_name": "Examinee",
+            "whatsapp_number": "0100000000",
+            "student_id": "000-00-0000",
+        }, format="json")
+
+    def drain(self):
+        call_command('send_outbox', stdout=StringIO())
+
+    def test_register_queues_otp_without_sending(self):
+        response = self.register()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual(queued.to_email, "examinee@diu.edu.bd")
+        self.assertEqual(queued.status, EmailOutbox.STATUS_PENDING)
+
+    def test_worker_delivers_queued_emails(self):
+        self.register("first@diu.edu.bd")
+        self.register("second@diu.edu.bd")
+
+        self.drain()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["first@diu.edu.bd", "second@diu.edu.bd"])
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.STATUS_SENT).exists())
+
+    def test_sent_emails_are_not_resent(self):
+        self.register()
+        self.drain()
+        self.drain()
+
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_send_backs_off_before_retrying(self):
+        self.register()
+        with mock.patch('users.emails.EmailMultiAlternatives.send', side_effect=OSError("421 try later")) as send:
+            self.drain()
+            self.drain()
+
+        self.assertEqual(send.call_count, 1)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (EmailOutbox.STATUS_PENDING, 1))
+        self.assertGreater(queued.next_attempt_at, timezone.now())
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.drain()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_SENT)
+
+    def test_email_fails_after_max_attempts(self):
+        self.register()
+        with mock.patch('users.emails.EmailMultiAlternatives.send', side_effect=OSError("550 no such user")):
+            for _ in range(2):
+                EmailOutbox.objects.update(next_attempt_at=timezone.now())
+                call_command('send_outbox', max_attempts=2, stdout=StringIO())
+
+        queued = EmailOutbox.objects.get()
+        self.assertEqual((queued.status, queued.attempts), (EmailOutbox.STATUS_FAILED, 2))
+        self.assertEqual(queued.last_error, "550 no such user")
+
+    def test_abandoned_claim_is_retried(self):
+        self.register()
+        # A worker claimed it and died before recording the result
+        EmailOutbox.objects.update(status=EmailOutbox.STATUS_SENDING, attempts=1,
+                                   next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+        self.drain()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.get().attempts, 2)
+
+
+@override_settings(CACHE_SHARED=True)
+class OtpStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_emailed_otp_verifies_the_account(self):
+        APIClient().post('/api/users/register/', {
+            "email": "examinee@diu.edu.bd",
+            "password": "s3cret-pass",
+            "full_name": "Examinee",
+            "whatsapp_number": "0100000000",
+            "student_id": "000-00-0000",
+        }, format="json")
+        call_command('send_outbox', stdout=StringIO())
+        otp = re.search(r"OTP\) is:\s*(\d+)", mail.outbox[0].body).group(1)
+
+        response = APIClient().post('/api/users/verify-otp/', {"email": "examinee@diu.edu.bd", "otp": otp}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(email="examinee@diu.edu.bd").is_email_verified)
+
+    def test_otp_is_single_use(self):
+        otp = issue_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL)
+
+        self.assertEqual(check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, otp), OTP_VALID)
+        self.assertEqual(check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, otp), OTP_EXPIRED)
+
+    def test_otp_expires_after_too_many_attempts(self):
+        otp = issue_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL)
+        wrong = "0000" if otp != "0000" else "1111"
+
+        with self.settings(OTP_MAX_ATTEMPTS=2):
+            self.assertEqual(check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, wrong), OTP_INVALID)
+            self.assertEqual(check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, wrong), OTP_INVALID)
+            self.assertEqual(check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, otp), OTP_EXPIRED)
+
+    def test_parallel_guesses_share_the_attempt_limit(self):
+        otp = issue_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL)
+        guesses = [f"{n:04d}" for n in range(1000, 1050) if f"{n:04d}" != otp]
+
+        with self.settings(OTP_MAX_ATTEMPTS=5), ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(lambda guess: check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, guess),
+                                    guesses))
+
+        self.assertEqual(results.count(OTP_INVALID), 5)
+        self.assertEqual(check_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL, otp), OTP_EXPIRED)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_otps_need_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            issue_otp("examinee@diu.edu.bd", PURPOSE_VERIFY_EMAIL)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_registration_without_a_shared_cache_creates_no_account(self):
+        with self.assertRaises(ImproperlyConfigured):
+            APIClient().post('/api/users/register/', {
+                "email": "examinee@diu.edu.bd", "password": "s3cret-pass", "full_name": "Examinee",
+                "whatsapp_number": "0100000000", "student_id": "000-00-0000",
+            }, format="json")
+
+        self.assertFalse(User.objects.exists())
+
+    def test_failed_otp_rolls_back_the_account(self):
+        with mock.patch('users.views.send_otp_via_email', side_effect=OSError), self.assertRaises(OSError):
+            APIClient().post('/api/users/register/', {
+                "email": "examinee@diu.edu.bd", "password": "s3cret-pass", "full_name": "Examinee",
+                "whatsapp_number": "0100000000", "student_id": "000-00-0000",
+            }, format="json")
+
+        self.assertFalse(User.objects.exists())
+
+    def test_redis_cache_checks_in_one_script(self):
+        redis_caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                    'LOCATION': 'redis://localhost:6379'}}
+
+        self.assertIsInstance(otp_store._store(), otp_store.LocalOtpStore)
+        with self.settings(CACHES=redis_caches):
+            self.assertIsInstance(otp_store._store(), otp_store.RedisOtpStore)
+
+
+class TokenBlacklistFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        blacklist_filter._built_at = 0.0  # Force a rebuild against this test's DB
+        self.user = User.objects.create_user(
+            email="examinee@diu.edu.bd", password="s3cret-pass",
+            full_name="Examinee", whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+
+    def refresh(self, token):
+        return APIClient().post('/api/users/token/refresh/', {"refresh": str(token)}, format="json")
+
+    def test_refresh_skips_blacklist_query(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)  # Builds the filter
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_blacklisted_token_is_rejected_before_and_after_rebuild(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(token)
+        RefreshToken(str(token)).blacklist()
+
+        self.assertEqual(self.refresh(token).status_code, 400)
+        cache.clear()
+        blacklist_filter._built_at = 0.0
+        self.assertEqual(self.refresh(token).status_code, 400)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        live = RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+
+        call_command('prune_tokens', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class LoginAdmissionTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            email="examinee@diu.edu.bd", password="s3cret-pass",
+            full_name="Examinee", whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        self.gate = AdmissionGate(concurrency=1, queue_depth=0, wait_seconds=0.01)
+
+    def login(self):
+        with mock.patch('users.views.login_gate', self.gate):
+            return APIClient().post('/api/users/login/', {
+                "email": "examinee@diu.edu.bd", "password": "s3cret-pass",
+            }, format="json")
+
+    def test_full_gate_answers_429_with_retry_after(self):
+        with self.gate.admit():
+            response = self.login()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.gate.metrics()["rejected"], 1)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_shared_slots_limit_every_instance(self):
+        cache.clear()
+        # Two single-request instances behind one shared cache
+        first, second = (AdmissionGate(concurrency=1, queue_depth=0, wait_seconds=0.01, shared_slots=1)
+                         for _ in range(2))
+
+        with first.admit():
+            with self.assertRaises(Overloaded):
+                with second.admit():
+                    pass
+        with second.admit():
+            pass
+
+        self.assertEqual(second.metrics()["timed_out"], 1)
+        self.assertEqual(second.metrics()["admitted"], 1)
+        self.assertEqual(second.metrics()["running"], 0)
+
+    def test_login_passes_once_a_slot_is_free(self):
+        response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.gate.metrics()["admitted"], 1)
+        self.assertEqual(self.gate.metrics()["running"], 0)
+
+
+class SlidingWindowThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def resend(self, email="examinee@diu.edu.bd"):
+        return APIClient().post('/api/users/resend-otp/', {"email": email}, format="json")
+
+    def test_otp_scope_limits_each_email(self):
+        with mock.patch.object(OtpThrottle, 'THROTTLE_RATES', {'otp': '2/hour'}):
+            self.assertEqual(self.resend().status_code, 404)
+            self.assertEqual(self.resend().status_code, 404)
+            throttled = self.resend()
+            other = self.resend("someone-else@diu.edu.bd")
+
+        self.assertEqual(throttled.status_code, 429)
+        self.assertIn('Retry-After', throttled)
+        self.assertEqual(other.status_code, 404)
+
+    def test_redis_cache_uses_the_atomic_window(self):
+        redis_caches = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                                    'LOCATION': 'redis://localhost:6379'}}
+
+        # The throttle's cache is a proxy to the configured backend
+        self.assertIsInstance(backend_for(OtpThrottle.cache), LocalSlidingWindow)
+        with self.settings(CACHES=redis_caches):
+            self.assertIsInstance(backend_for(OtpThrottle.cache), RedisSlidingWindow)
+
+    def test_previous_window_is_weighted_by_overlap(self):
+        window = LocalSlidingWindow(cache)
+        for _ in range(10):
+            window.hit("k:1", "k:0", limit=10, weight=0.0, ttl=60)
+
+        # Half of the previous window still overlaps: 10 * 0.5 = 5 of 10 used
+        allowed = [window.hit("k:2", "k:1", limit=10, weight=0.5, ttl=60)[0] for _ in range(6)]
+
+        self.assertEqual(allowed, [True] * 5 + [False])
+
+    def test_retry_after_ends_when_a_request_is_allowed_again(self):
+        with mock.patch.object(OtpThrottle, 'THROTTLE_RATES', {'otp': '5/hour'}):
+            throttle = OtpThrottle()
+        throttle.elapsed, throttle.current, throttle.previous = 1800, 5, 0
+        full = throttle.wait()
+        throttle.elapsed, throttle.current, throttle.previous = 1800, 3, 8
+        overlapping = throttle.wait()
+
+        # A full window clears right after the rollover
+        self.assertEqual(full, 1800)
+        window = LocalSlidingWindow(cache)
+        cache.set("k:1", 5)
+        self.assertFalse(window.hit("k:2", "k:1", limit=5, weight=1.0, ttl=60)[0])
+        self.assertTrue(window.hit("k:2", "k:1", limit=5, weight=1 - 1 / 3600, ttl=60)[0])
+        # 8 * (1 - t / 3600) + 3 < 5 once t > 2700
+        self.assertEqual(overlapping, 900)
+
+
+class RegradeExamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.questions = [
+            QuizQuestion.objects.create(text=f"Question {i}", option_a="a", option_b="b",
+                                        option_c="c", option_d="d", correct="A")
+            for i in range(3)
+        ]
+
+    def submit(self, email, answers):
+        user = User.objects.create_user(
+            email=email, password="s3cret-pass", full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get('/api/quiz/questions/')
+        answers = [{"q_id": question.id, "ans": ans} for question, ans in zip(self.questions, answers)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post('/api/quiz/submit/', {"answers": answers}, format="json").status_code, 200)
+        return user
+
+    def test_changed_answer_rescores_attempts(self):
+        first = self.submit("first@diu.edu.bd", "AAA")
+        second = self.submit("second@diu.edu.bd", "ABA")
+        # Corrected without signals, as a bulk fix would be
+        QuizQuestion.objects.filter(pk=self.questions[1].pk).update(correct="B")
+
+        call_command('regrade_exam', stdout=StringIO())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.exam_marks, second.exam_marks), (2, 3))
+        self.assertEqual(dict(ExamAttempt.objects.values_list('user_id', 'marks')), {first.pk: 2, second.pk: 3})
+
+    def test_rerun_recounts_marks_after_an_interrupted_run(self):
+        user = self.submit("first@diu.edu.bd", "AAA")
+        QuizQuestion.objects.filter(pk=self.questions[1].pk).update(correct="B")
+        with mock.patch('users.management.commands.regrade_exam.Command.recount_marks', side_effect=OSError):
+            with self.assertRaises(OSError):
+                call_command('regrade_exam', stdout=StringIO())
+
+        call_command('regrade_exam', stdout=StringIO())
+
+        user.refresh_from_db()
+        self.assertEqual(user.exam_marks, 2)
+
+    def test_answers_to_questions_not_drawn_stay_ungraded(self):
+        with self.settings(EXAM_QUESTION_COUNT=1):
+            user = self.submit("first@diu.edu.bd", "AAA")
+
+        call_command('regrade_exam', stdout=StringIO())
+
+        user.refresh_from_db()
+        self.assertEqual(user.exam_marks, 1)
+        self.assertEqual(ExamAnswer.objects.filter(is_correct=True).count(), 1)
+        self.assertEqual(sum(ItemStat.objects.values_list('responses', flat=True)), 1)
+
+    def test_dry_run_changes_nothing(self):
+        user = self.submit("first@diu.edu.bd", "AAA")
+        QuizQuestion.objects.filter(pk=self.questions[0].pk).update(correct="C")
+        out = StringIO()
+
+        call_command('regrade_exam', '--dry-run', stdout=out)
+
+        user.refresh_from_db()
+        self.assertEqual(user.exam_marks, 3)
+        self.assertIn("1 answers would change", out.getvalue())
+
+
+class SendResultsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(6):
+            QuizQuestion.objects.create(text=f"Question {i}", option_a="a", option_b="b",
+                                        option_c="c", option_d="d", correct="A")
+
+    def examinee(self, email, marks):
+        return User.objects.create_user(
+            email=email, password="s3cret-pass", full_name="Examinee", whatsapp_number="0100000000",
+            student_id="000-00-0000", exam_attempted=True, exam_marks=marks,
+        )
+
+    def send_results(self, *args):
+        err = StringIO()
+        call_command('send_results', 'results', *args, stdout=StringIO(), stderr=err)
+        return err.getvalue()
+
+    def test_total_is_the_number_of_questions_drawn(self):
+        user = self.examinee("drawn@diu.edu.bd", 2)
+        self.examinee("legacy@diu.edu.bd", 4)
+        user.exam_attempted = False  # Only in memory, so the questions view lets it start a session
+        with self.settings(EXAM_QUESTION_COUNT=3):
+            client = APIClient()
+            client.force_authenticate(user)
+            client.get('/api/quiz/questions/')  # Starts a session with 3 questions
+
+        self.send_results()
+
+        bodies = {message.to[0]: message.body for message in mail.outbox}
+        self.assertIn("2 / 3", bodies["drawn@diu.edu.bd"])
+        # No session: graded against the whole bank
+        self.assertIn("4 / 6", bodies["legacy@diu.edu.bd"])
+
+    def test_failed_recipients_are_recorded_and_retried(self):
+        self.examinee("first@diu.edu.bd", 1)
+        bounced = self.examinee("bounced@diu.edu.bd", 2)
+        send = EmailMultiAlternatives.send
+
+        def flaky_send(message, *args, **kwargs):
+            if message.to == ["bounced@diu.edu.bd"]:
+                raise OSError("451 try again later")
+            return send(message, *args, **kwargs)
+
+        with mock.patch.object(EmailMultiAlternatives, 'send', autospec=True, side_effect=flaky_send):
+            errors = self.send_results()
+
+        campaign = MailCampaign.objects.get(name="results")
+        self.assertIn("bounced@diu.edu.bd", errors)
+        self.assertEqual((campaign.sent_count, campaign.failed_count), (1, 1))
+        self.assertEqual(list(campaign.failures.values_list('user_id', 'error')), [(bounced.pk, "451 try again later")])
+
+        # Finished: a plain rerun sends nothing, --retry-failed only the failures
+        self.send_results()
+        self.send_results('--retry-failed')
+
+        campaign.refresh_from_db()
+        self.assertEqual([message.to[0] for message in mail.outbox], ["first@diu.edu.bd", "bounced@diu.edu.bd"])
+        self.assertEqual((campaign.sent_count, campaign.failed_count), (2, 0))
+        self.assertFalse(campaign.failures.exists())
+
+
+class RankingTests(TestCase):
+    MARKS = [5, 3, 3, 8, 0, 3, 10]
+
+    def setUp(self):
+        cache.clear()
+        for marks in self.MARKS:
+            self.attempt(marks)
+
+    def attempt(self, marks):
+        n = User.objects.count()
+        return User.objects.create_user(
+            email=f"examinee{n}@diu.edu.bd", password=None, full_name=f"Examinee {n}",
+            whatsapp_number="0100000000", student_id="000-00-0000", exam_attempted=True, exam_marks=marks,
+        )
+
+    def expected(self, marks, all_marks):
+        above = sum(1 for m in all_marks if m > marks)
+        below = sum(1 for m in all_marks if m < marks)
+        equal = all_marks.count(marks)
+        return {"rank": above + 1, "percentile": round(100 * (below + equal / 2) / len(all_marks), 2),
+                "out_of": len(all_marks)}
+
+    def test_rankings_match_counting(self):
+        values = range(-1, 13)
+
+        result = ranking.rankings(values)
+
+        self.assertEqual(result, {marks: self.expected(min(max(marks, 0), 1000), self.MARKS) for marks in values})
+
+    def test_recorded_score_updates_the_live_tree(self):
+        ranking.rebuild()
+        self.attempt(9)
+        ranking.record_score(9)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ranking.ranking(9), self.expected(9, self.MARKS + [9]))
+
+    def test_score_committed_during_a_build_is_not_lost(self):
+        build_tree = ranking.build_tree
+
+        def build_then_submit(counts):
+            tree = build_tree(counts)
+            # Committed after the snapshot, recorded before the tree goes live
+            self.attempt(9)
+            ranking.record_score(9)
+            return tree
+
+        with mock.patch.object(ranking, 'build_tree', side_effect=build_then_submit), \
+                mock.patch.object(ranking, 'DIRTY_TTL', 0):
+            ranking.rebuild()
+
+        # The build was marked dirty, so the next read rebuilds with the new score
+        self.assertEqual(ranking.ranking(9), self.expected(9, self.MARKS + [9]))
+
+    def test_tree_expires_and_is_rebuilt(self):
+        with self.settings(RANKING_TTL_SECONDS=0):
+            ranking.rebuild()
+        # Missed by this worker's tree, e.g. recorded by another worker
+        self.attempt(9)
+
+        self.assertEqual(ranking.ranking(9)["out_of"], len(self.MARKS) + 1)
+
+    def test_leaderboard_pages_through_ties(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.first())
+        pages, cursor = [], None
+        while True:
+            response = client.get('/api/users/leaderboard/', {"limit": 2, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data["results"])
+            cursor = response.data["next_cursor"]
+            if cursor is None:
+                break
+
+        rows = [row for page in pages for row in page]
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual([row["marks"] for row in rows], sorted(self.MARKS, reverse=True))
+        self.assertEqual([row["rank"] for row in rows], [1, 2, 3, 4, 4, 4, 7])
+        self.assertEqual(len({row["full_name"] for row in rows}), len(self.MARKS))
+
+
+class ResultsExportTests(TestCase):
+    URL = '/api/users/admin/export/'
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email="admin@diu.edu.bd", password=None)
+        self.graded = User.objects.create_user(
+            email="graded@diu.edu.bd", password=None, full_name="Graded, Examinee", whatsapp_number="0100000000",
+            student_id="000-00-0001", exam_attempted=True, exam_marks=1,
+        )
+        attempt = ExamAttempt.objects.create(user=self.graded, bank=BANK_QUIZ, marks=1)
+        ExamAnswer.objects.create(attempt=attempt, bank=BANK_QUIZ, question_id=7, choice=2,
+                                  outcome=CORRECT, is_correct=True)
+        # Graded before the normalized tables: answers only in the legacy blob
+        self.legacy = User.objects.create_user(
+            email="legacy@diu.edu.bd", password=None, full_name="Legacy", whatsapp_number="0100000000",
+            student_id="000-00-0002", exam_attempted=True, exam_marks=3,
+            exam_answers=json.dumps([{"q_id": 1, "ans": "A"}]),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(self.export(output="csv", attempted=1).splitlines()))
+
+        self.assertEqual([row["email"] for row in rows], ["graded@diu.edu.bd", "legacy@diu.edu.bd"])
+        self.assertEqual(rows[0]["full_name"], "Graded, Examinee")
+        self.assertEqual(json.loads(rows[0]["exam_answers"]),
+                         [{"q_id": 7, "ans": "C", "valid": True, "is_correct": True}])
+        self.assertEqual(json.loads(rows[1]["exam_answers"]), [{"q_id": 1, "ans": "A"}])
+
+    def test_ndjson_includes_everyone_by_default(self):
+        rows = [json.loads(line) for line in self.export(output="ndjson").splitlines()]
+
+        self.assertEqual([row["id"] for row in rows], [self.admin.pk, self.graded.pk, self.legacy.pk])
+        self.assertEqual(rows[1]["exam_marks"], 1)
+        self.assertEqual(rows[1]["exam_answers"][0]["q_id"], 7)
+        self.assertEqual(rows[0]["exam_answers"], [])
+
+    def test_report_map_is_read_once_per_chunk(self):
+        question = Question.objects.create(text="Question", options=["a", "b"], correct_answer_index=1)
+        for n in range(3):
+            user = User.objects.create_user(
+                email=f"examinee{n}@diu.edu.bd", password=None, full_name="Examinee", whatsapp_number="0100000000",
+                student_id="000-00-0000", exam_attempted=True, exam_marks=1,
+            )
+            attempt = ExamAttempt.objects.create(user=user, bank=BANK_QUESTIONS, marks=1)
+            ExamAnswer.objects.create(attempt=attempt, bank=BANK_QUESTIONS, question_id=question.pk, choice=1,
+                                      outcome=CORRECT, is_correct=True)
+
+        with mock.patch.object(exports, 'get_report_map', wraps=exports.get_report_map) as get_report_map, \
+                mock.patch('results.answers.get_report_map') as per_user:
+            rows = list(exports.export_rows(chunk_size=2))
+
+        # Chunks: [admin, graded], [legacy, examinee0], [examinee1, examinee2]
+        self.assertEqual(get_report_map.call_count, 2)
+        self.assertFalse(per_user.called)
+        self.assertEqual([row["exam_answers"][0]["question"]["id"] for row in rows[3:]], [question.pk] * 3)
+
+    def test_unknown_output_is_rejected(self):
+        self.assertEqual(self.client.get(self.URL, {"output": "xlsx"}).status_code, 400)
+
+    def test_examinees_are_forbidden(self):
+        client = APIClient()
+        client.force_authenticate(self.graded)
+
+        self.assertEqual(client.get(self.URL).status_code, 403)
+
+
+class UserSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = QuizQuestion.objects.create(text="Question", option_a="a", option_b="b",
+                                                    option_c="c", option_d="d", correct="A")
+        self.user = User.objects.create_user(
+            email="examinee@diu.edu.bd", password=None, full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000",
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    @override_settings(CACHE_SHARED=True)
+    def test_hot_endpoints_read_no_user_row(self):
+        # Warm the snapshot, the bank and the exam session
+        self.client.get('/api/quiz/questions/')
+
+        with CaptureQueriesContext(connection) as ctx:
+            responses = [
+                self.client.get('/api/users/me/'),
+                self.client.get('/api/quiz/questions/'),
+                self.client.post('/api/quiz/autosave/', {"answers": [{"q_id": self.question.id, "ans": "A"}]},
+                                 format="json"),
+            ]
+
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+        self.assertEqual([query["sql"] for query in ctx.captured_queries if User._meta.db_table in query["sql"]], [])
+
+    def test_result_submit_locks_the_row_behind_a_stale_snapshot(self):
+        def worker(name):
+            return self.settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': name,
+            }})
+
+        with worker("worker-a"):
+            self.assertFalse(get_user_snapshot(self.user.pk).exam_attempted)
+        with worker("worker-b"):
+            first = self.client.post('/api/questions/v2/exam/submit/', {"exam_mark": 7}, format="json")
+        # Worker A never saw the invalidation and still trusts exam_attempted=False
+        with worker("worker-a"):
+            self.assertFalse(get_user_snapshot(self.user.pk).exam_attempted)
+            second = self.client.post('/api/questions/v2/exam/submit/', {"exam_mark": 30}, format="json")
+
+        self.assertEqual((first.status_code, second.status_code), (200, 400))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.exam_marks, 7)
+
+
+class AsyncUserDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = Question.objects.create(text="Question", options=["a", "b"], correct_answer_index=1)
+
+    def examinee(self, n, **fields):
+        user = User.objects.create_user(
+            email=f"examinee{n}@diu.edu.bd", password=None, full_name="Examinee",
+            whatsapp_number="0100000000", student_id="000-00-0000", **fields,
+        )
+        return user, {"authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+    async def assert_same_as_sync(self, auth):
+        async_response = await self.async_client.get('/api/users/async/me/', headers=auth)
+        sync_response = await sync_to_async(self.client.get)('/api/users/me/', headers=auth)
+
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response.json()
+
+    async def test_graded_answers_and_ranking(self):
+        user, auth = await sync_to_async(self.examinee)(0, exam_attempted=True, exam_marks=1)
+        attempt = await ExamAttempt.objects.acreate(user=user, bank=BANK_QUESTIONS, marks=1)
+        await ExamAnswer.objects.acreate(attempt=attempt, bank=BANK_QUESTIONS, question_id=self.question.pk,
+                                         choice=1, outcome=CORRECT, is_correct=True)
+
+        data = await self.assert_same_as_sync(auth)
+
+        self.assertEqual(json.loads(data["exam_answers"])[0]["question"]["id"], self.question.pk)
+        self.assertEqual(data["ranking"]["rank"], 1)
+
+    async def test_legacy_blob_and_not_attempted(self):
+        _, legacy = await sync_to_async(self.examinee)(0, exam_attempted=True, exam_answers='[{"q_id": 1}]')
+        _, fresh = await sync_to_async(self.examinee)(1)
+
+        self.assertEqual((await self.assert_same_as_sync(legacy))["exam_answers"], '[{"q_id": 1}]')
+        self.assertIsNone((await self.assert_same_as_sync(fresh))["ranking"])
 
-# Create your tests here.
@@ -0,0 +1,87 @@
+# users/tokens.py
+"""
+Refresh tokens whose blacklist check usually skips the database.
+
+Each process keeps a Bloom filter (core.bloom) of the jtis of every unexpired
+blacklisted token and rebuilds it from the DB every
+TOKEN_BLACKLIST_FILTER_SECONDS. A token that is not in the filter is not
+blacklisted, so only filter hits, about 0.1% false positives plus the tokens
+that really are blacklisted, still run simplejwt's blacklist query.
+
+A token blacklisted after the last rebuild is covered by a marker that
+blacklist() writes to the shared cache. With a per-process cache (no
+REDIS_URL), another worker can miss that marker until its next rebuild.
+Set TOKEN_BLACKLIST_FILTER_SECONDS=0 to always query the DB.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from core.bloom import BloomFilter
+
+
+def _marker_key(jti):
+    return f"users:blacklisted:{jti}"
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+
+    def _rebuild(self):
+        jtis = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            .values_list('token__jti', flat=True)
+        )
+        # Headroom for the tokens added between rebuilds
+        bloom = BloomFilter(capacity=max(len(jtis) * 2, 1024))
+        bloom.update(jtis)
+        self._bloom, self._built_at = bloom, time.monotonic()
+
+    def _current(self):
+        if time.monotonic() - self._built_at >= settings.TOKEN_BLACKLIST_FILTER_SECONDS:
+            with self._lock:
+                if time.monotonic() - self._built_at >= settings.TOKEN_BLACKLIST_FILTER_SECONDS:
+                    self._rebuild()
+        return self._bloom
+
+    def may_contain(self, jti):
+        """
+        False only when `jti` is certainly not blacklisted.
+        """
+        if not settings.TOKEN_BLACKLIST_FILTER_SECONDS:
+            return True
+        return jti in self._current() or cache.get(_marker_key(jti)) is not None
+
+    def add(self, jti, exp):
+        if self._bloom is not None:
+            self._bloom.add(jti)
+        remaining = int(exp - time.time())
+        if remaining > 0:
+            cache.set(_marker_key(jti), 1, remaining)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    simplejwt's RefreshToken with the blacklist check behind blacklist_filter.
+    """
+
+    def check_blacklist(self):
+        if blacklist_filter.may_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        return result
@@ -1,14 +1,20 @@
 from django.urls import path
+from . import async_views
 from .views import (
     RegisterView, LoginView, VerifyOtpView,
     ForgotPasswordView, ResetPasswordView, ResendOtpView,
-    LogoutView, RefreshTokenView, UserDetailView
+    LogoutView, RefreshTokenView, UserDetailView, LeaderboardView,
+    ResultsExportView, LoginGateMetricsView,
 )
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('me/', UserDetailView.as_view(), name='user_detail'),
+    path('async/me/', async_views.user_detail, name='user_detail_async'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('admin/export/', ResultsExportView.as_view(), name='results_export'),
+    path('admin/login-gate/', LoginGateMetricsView.as_view(), name='login_gate_metrics'),
     path('verify-otp/', VerifyOtpView.as_view(), name='verify_otp'),
     path('forgot-password/', ForgotPasswordView.as_view(), name='forgot_password'),
     path('reset-password/', ResetPasswordView.as_view(), name='reset_password'),
@@ -6,9 +6,20 @@ from rest_framework import status, permissions
 from .serializers import RegisterSerializer, UserDetailSerializer
 from .models import User
 from .emails import send_otp_via_email, send_otp_via_email_forgot_password
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from .otp import OTP_EXPIRED, OTP_VALID, PURPOSE_RESET_PASSWORD, PURPOSE_VERIFY_EMAIL, check_otp
+from rest_framework_simplejwt.tokens import AccessToken
+from .tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import IsAdminUser
+from .exports import CONTENT_TYPES, FORMATS, stream_export
+from .ranking import rankings
+from .admission import Overloaded, login_gate
+from core.shared_cache import require_shared_cache
+from core.throttling import AnonSlidingThrottle, OtpThrottle, UserSlidingThrottle
 
 
 class UserDetailView(APIView):
@@ -19,6 +30,74 @@ class UserDetailView(APIView):
         return Response(serializer.data)
 
 
+class LeaderboardView(APIView):
+    """
+    Attempted users ordered by marks, with keyset pagination.
+    GET ?limit=50&cursor=<next_cursor from the previous page>
+    Pages are read straight off the (exam_attempted, exam_marks) index, so a
+    deep page costs the same as the first one.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_LIMIT = 200
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        users = User.objects.filter(exam_attempted=True).order_by('-exam_marks', 'id')
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                marks, user_id = (int(part) for part in cursor.split('.', 1))
+            except ValueError:
+                return Response({"error": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+            users = users.filter(Q(exam_marks__lt=marks) | Q(exam_marks=marks, id__gt=user_id))
+
+        rows = list(users.values_list('id', 'full_name', 'exam_marks')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        ranks = rankings(marks for _, _, marks in rows)
+
+        return Response({
+            "results": [
+                {"rank": ranks[marks]["rank"], "full_name": full_name, "marks": marks}
+                for _, full_name, marks in rows
+            ],
+            "next_cursor": f"{rows[-1][2]}.{rows[-1][0]}" if has_more else None,
+        }, status=status.HTTP_200_OK)
+
+
+class LoginGateMetricsView(APIView):
+    """
+    Admission metrics of the login hashing gate in the worker that serves the request.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(login_gate.metrics())
+
+
+class ResultsExportView(APIView):
+    """
+    Admin-only streaming export of users, marks and decoded answers.
+    GET ?output=csv|ndjson&attempted=1
+    (`output` rather than `format`, which DRF reserves for content negotiation)
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'csv')
+        if output not in FORMATS:
+            return Response({"error": f"output must be one of {', '.join(FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        attempted_only = request.query_params.get('attempted') in ('1', 'true')
+
+        response = StreamingHttpResponse(stream_export(output, attempted_only), content_type=CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="exam-results.{output}"'
+        return response
+
+
 class RegisterView(APIView):
     """
     API endpoint for user registration.
@@ -30,10 +109,14 @@ class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]    
 
     def post(self, request):
+        # Refused before any account exists that could never be verified
+        require_shared_cache("One-time passwords")
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            send_otp_via_email(user.email)
+            # An OTP that can't be issued or queued leaves no account behind
+            with transaction.atomic():
+                user = serializer.save()
+                send_otp_via_email(user.email)
             return Response({"message": f"otp sent to {user.email}"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -56,10 +139,10 @@ class VerifyOtpView(APIView):
 
         try:
             user = User.objects.get(email=email)
-            if user.otp == otp:
+            result = check_otp(email, PURPOSE_VERIFY_EMAIL, otp)  # A valid OTP is consumed
+            if result == OTP_VALID:
                 user.is_email_verified = True
-                user.otp = None  # Clear OTP after successful verification
-                user.save()
+                user.save(update_fields=['is_email_verified'])
 
                 refresh = RefreshToken.for_user(user)
                 access = refresh.access_token
@@ -68,6 +151,8 @@ class VerifyOtpView(APIView):
                     "refresh": str(refresh),
                     "access": str(access)
                 }, status=status.HTTP_200_OK)
+            elif result == OTP_EXPIRED:
+                return Response({"error": "OTP expired. Please request a new one."}, status=status.HTTP_400_BAD_REQUEST)
             else:
                 return Response({"error": "Invalid OTP."}, status=status.HTTP_400_BAD_REQUEST)
         except User.DoesNotExist:
@@ -79,6 +164,8 @@ class VerifyOtpView(APIView):
 class LoginView(APIView):
     """
     API endpoint for user login.
+    The password check runs behind users.admission.login_gate, so a login burst
+    gets 429 + Retry-After instead of tying up every worker.
     """
     permission_classes = [permissions.AllowAny]
 
@@ -89,7 +176,16 @@ class LoginView(APIView):
         if not email or not password:
             return Response({"error": "Email and password are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        user = authenticate(request=request, email=email, password=password)
+        try:
+            with login_gate.admit():
+                user = authenticate(request=request, email=email, password=password)
+        except Overloaded as e:
+            response = Response(
+                {"error": "Too many logins in progress. Please retry shortly."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            response['Retry-After'] = str(e.retry_after)
+            return response
 
         if user is not None:
             refresh = RefreshToken.for_user(user)
@@ -120,6 +216,7 @@ class ForgotPasswordView(APIView):
     API endpoint to request a password reset OTP.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AnonSlidingThrottle, UserSlidingThrottle, OtpThrottle]
 
     def post(self, request):
         email = request.data.get('email')
@@ -158,11 +255,13 @@ class ResetPasswordView(APIView):
 
         try:
             user = User.objects.get(email=email)
-            if user.otp == otp:
+            result = check_otp(email, PURPOSE_RESET_PASSWORD, otp)  # A valid OTP is consumed
+            if result == OTP_VALID:
                 user.set_password(password)
-                user.otp = None  # Clear OTP after successful reset
-                user.save()
+                user.save(update_fields=['password'])
                 return Response({"message": "Password reset successfully."}, status=status.HTTP_200_OK)
+            elif result == OTP_EXPIRED:
+                return Response({"error": "OTP expired. Please request a new one."}, status=status.HTTP_400_BAD_REQUEST)
             else:
                 return Response({"error": "Invalid OTP."}, status=status.HTTP_400_BAD_REQUEST)
         except User.DoesNotExist:
@@ -175,6 +274,7 @@ class ResendOtpView(APIView):
     API endpoint to resend OTP for email verification.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [AnonSlidingThrottle, UserSlidingThrottle, OtpThrottle]
 
     def post(self, request):
         email = request.data.get('email')